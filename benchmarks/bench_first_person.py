@@ -0,0 +1,41 @@
+"""
+Benchmark: convert_to_first_person against the replace chain it replaced, on long storyboards.
+
+Run from the repository root:
+    python benchmarks/bench_first_person.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.first_person import convert_to_first_person  # noqa: E402
+from tests.test_first_person import legacy_convert_to_first_person  # noqa: E402
+
+SCENE = (
+    "Scene {n}: The person stands at the top of the stairs, her phone in her hand. "
+    "She is rushing to meet them before their train leaves, and he calls out to her. "
+    "In that moment the main character loses her footing; they're all watching as she falls. "
+    "Afterwards he helps her up, and she finds herself thinking about whether there is "
+    "something these moments are trying to teach her.\n"
+)
+
+
+def storyboard(scenes):
+    return ''.join(SCENE.format(n=n) for n in range(1, scenes + 1))
+
+
+def main():
+    print(f"{'storyboard':<22} {'legacy (us)':>12} {'new (us)':>10} {'speedup':>8}")
+    for scenes in (8, 40, 200):
+        text = storyboard(scenes)
+        number = max(20, 4000 // scenes)
+        legacy = timeit.timeit(lambda: legacy_convert_to_first_person(text), number=number) / number * 1e6
+        new = timeit.timeit(lambda: convert_to_first_person(text), number=number) / number * 1e6
+        label = f"{scenes} scenes, {len(text) // 1024} KB"
+        print(f"{label:<22} {legacy:>12.0f} {new:>10.0f} {legacy / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark: KeywordClassifier against the substring if/elif chains it replaced.
+
+Per session the old code classified the first answer four times (feedback
+for answer 1, then questions 2-4) plus answers 2 and 3 once each; the new
+code classifies the first answer once and keeps the category on the session.
+
+Run from the repository root:
+    python benchmarks/bench_keyword_classifier.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.keyword_classifier import AFTERMATH_CATEGORIES, LEAD_UP_CATEGORIES, STORY_CATEGORIES  # noqa: E402
+from tests.test_keyword_classifier import (  # noqa: E402
+    legacy_aftermath_category,
+    legacy_lead_up_category,
+    legacy_story_category,
+)
+
+ITERATIONS = 20000
+
+CASES = {
+    'short answer': (
+        "I fell down the stairs at home.",
+        "I was on my phone.",
+        "Someone helped me up."
+    ),
+    '600-char answer': (
+        ("It was a grey morning in November and I had been up since five, going over the "
+         "same numbers again and again for a presentation nobody would remember. ") * 4
+        + "On the way out I fell down the stairs.",
+        ("Nothing about the day felt unusual. I made coffee, fed the cat, checked the "
+         "weather and left the house at the same time I always do. ") * 4,
+        ("For a while I just lay there listening to the traffic outside. After a few "
+         "minutes my neighbour came out and sat with me until I could stand. ") * 4
+    ),
+    'no keyword match': (
+        "The day my daughter was born.",
+        "I can't remember anything before it.",
+        "I just sat there in silence."
+    ),
+}
+
+
+def legacy_session(first, second, third):
+    for _ in range(4):
+        legacy_story_category(first)
+    legacy_lead_up_category(second)
+    legacy_aftermath_category(third)
+
+
+def classifier_session(first, second, third):
+    STORY_CATEGORIES.classify(first)
+    LEAD_UP_CATEGORIES.classify(second)
+    AFTERMATH_CATEGORIES.classify(third)
+
+
+def per_call_us(fn, *args):
+    return timeit.timeit(lambda: fn(*args), number=ITERATIONS) / ITERATIONS * 1e6
+
+
+def main():
+    print(f"{'case':<18} {'classify (old/new us)':>24} {'per session (old/new us)':>28}")
+    for name, answers in CASES.items():
+        old_one = per_call_us(legacy_story_category, answers[0])
+        new_one = per_call_us(STORY_CATEGORIES.classify, answers[0])
+        old_session = per_call_us(legacy_session, *answers)
+        new_session = per_call_us(classifier_session, *answers)
+        print(f"{name:<18} {old_one:>11.1f} / {new_one:<10.1f} {old_session:>13.1f} / {new_session:<10.1f}")
+
+
+if __name__ == '__main__':
+    main()
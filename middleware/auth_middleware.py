@@ -1,6 +1,6 @@
 from functools import wraps
 from flask import request, jsonify
-from services.auth_service import SupabaseAuthService
+from services.auth_service import get_auth_service
 
 def require_auth(f):
     """
@@ -20,7 +20,7 @@ def require_auth(f):
             # Extract token from "Bearer <token>" format
             token = auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else auth_header
             
-            auth_service = SupabaseAuthService()
+            auth_service = get_auth_service()
             user_data = auth_service.verify_token(token)
             
             if not user_data.get('is_authenticated'):
@@ -59,7 +59,7 @@ def require_admin(f):
             # Extract token from "Bearer <token>" format
             token = auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else auth_header
             
-            auth_service = SupabaseAuthService()
+            auth_service = get_auth_service()
             user_data = auth_service.verify_token(token)
             
             if not user_data.get('is_authenticated'):
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import time
+from functools import wraps
+from flask import request, jsonify, make_response
+from services.idempotency_store import create_idempotency_store
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# First response per (caller, route, key), kept in the session store's backend so every
+# worker sees it; replayed for retries until the TTL runs out
+_store = create_idempotency_store()
+TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+# How long a key stays claimed by a request that never finishes (e.g. its worker died)
+IN_FLIGHT_LEASE_SECONDS = float(os.getenv('IDEMPOTENCY_IN_FLIGHT_LEASE_SECONDS', '300'))
+IN_FLIGHT_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_IN_FLIGHT_WAIT_SECONDS', '30'))
+IN_FLIGHT_POLL_SECONDS = 0.2
+
+def _caller_identity():
+    """Who the key belongs to: the auth subject, else the session, else the bearer token or client address"""
+    user = getattr(request, 'user', None) or {}
+    if user.get('user_id'):
+        return f"user:{user['user_id']}"
+    data = request.get_json(silent=True) or {}
+    if isinstance(data, dict) and data.get('session_id'):
+        return f"session:{data['session_id']}"
+    auth_header = request.headers.get('Authorization')
+    if auth_header:
+        return f"token:{hashlib.sha256(auth_header.encode('utf-8')).hexdigest()}"
+    return f"addr:{request.remote_addr}"
+
+def idempotent(f):
+    """
+    Decorator that makes a POST route safe to retry with an Idempotency-Key header
+
+    The first response for a key is stored and replayed for later requests
+    with the same key from the same caller, so a retried answer isn't saved
+    twice and a retried generate call doesn't start another render, whichever
+    worker the retry lands on. Requests without the header run as before.
+    5xx responses aren't stored, so those can be retried.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return f(*args, **kwargs)
+
+        scope = hashlib.sha256(f"{_caller_identity()}:{request.method}:{request.path}:{key}".encode('utf-8')).hexdigest()
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+        deadline = time.monotonic() + IN_FLIGHT_WAIT_SECONDS
+        while True:
+            stored = _store.get(scope)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            if _store.claim(scope, IN_FLIGHT_LEASE_SECONDS):
+                break
+            # Same key while the first request is still being handled, possibly on another worker
+            if time.monotonic() >= deadline:
+                return jsonify({
+                    'success': False,
+                    'error': 'A request with this Idempotency-Key is still in progress'
+                }), 409
+            time.sleep(IN_FLIGHT_POLL_SECONDS)
+
+        stored_response = False
+        try:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code < 500 and not response.is_streamed:
+                _store.complete(scope, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'body': response.get_data(),
+                    'mimetype': response.mimetype
+                }, TTL_SECONDS)
+                stored_response = True
+            return response
+        finally:
+            if not stored_response:
+                # The attempt failed without a stored response; let a retry run it
+                _store.release(scope)
+
+    return decorated_function
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return jsonify({
+            'success': False,
+            'error': 'Idempotency-Key was already used with a different request body'
+        }), 422
+
+    response = make_response(stored['body'], stored['status'])
+    response.mimetype = stored['mimetype']
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def get_idempotency_stats():
+    return _store.stats()
@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+import time
+
+# Job lifecycle states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+@dataclass
+class Job:
+    """Represents a unit of background work (e.g. a storyboard generation)"""
+    job_id: str
+    kind: str
+    payload: Dict
+    key: Optional[str] = None
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    max_attempts: Optional[int] = None  # Overrides the queue's limit (1: never re-run, e.g. paid renders)
+    
+    @property
+    def wait_time(self) -> float:
+        """Seconds spent queued before a worker picked the job up (so far, if still queued)"""
+        end = self.started_at if self.started_at is not None else time.time()
+        return max(0.0, end - self.created_at)
+    
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'key': self.key,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'attempts': self.attempts,
+            'wait_time': round(self.wait_time, 3),
+            'error': self.error
+        }
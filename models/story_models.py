@@ -1,11 +1,18 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import List, Dict, Optional
 from datetime import datetime
 import uuid
+from models.storyboard_models import Storyboard
 
-@dataclass
+def _parse_datetime(value):
+    """Accept either a datetime or its ISO-8601 string form"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+@dataclass(frozen=True)
 class Question:
-    """Represents a story question"""
+    """Represents a story question (shared by all sessions, so immutable)"""
     id: int
     text: str
     category: str
@@ -28,6 +35,10 @@ class StorySession:
     is_complete: bool
     generated_story: Optional[str] = None
     user_email: Optional[str] = None
+    story_category: Optional[str] = None  # Keyword category of the first answer, set once it's saved
+    rendered_questions: Dict[int, str] = field(default_factory=dict)  # Contextual question text by question id
+    parsed_storyboard: Optional[Storyboard] = None  # Structured storyboard (generated_story only holds text ones)
+    version: int = 0  # Bumped by every session store write, used to reject writes based on a stale read
     
     def to_dict(self):
         return {
@@ -37,8 +48,37 @@ class StorySession:
             'current_question': self.current_question,
             'is_complete': self.is_complete,
             'generated_story': self.generated_story,
-            'user_email': self.user_email
+            'user_email': self.user_email,
+            'story_category': self.story_category,
+            'rendered_questions': self.rendered_questions,
+            'parsed_storyboard': self.parsed_storyboard.to_dict() if self.parsed_storyboard else None,
+            'version': self.version
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StorySession':
+        """Rebuild a session from its to_dict() form (e.g. when loaded from a session store)"""
+        return cls(
+            session_id=data['session_id'],
+            created_at=_parse_datetime(data['created_at']),
+            answers=[
+                Answer(
+                    question_id=answer['question_id'],
+                    answer_text=answer['answer_text'],
+                    timestamp=_parse_datetime(answer['timestamp'])
+                )
+                for answer in data.get('answers', [])
+            ],
+            current_question=data['current_question'],
+            is_complete=data['is_complete'],
+            generated_story=data.get('generated_story'),
+            user_email=data.get('user_email'),
+            story_category=data.get('story_category'),
+            # JSON turns the int keys into strings
+            rendered_questions={int(k): v for k, v in (data.get('rendered_questions') or {}).items()},
+            parsed_storyboard=Storyboard.from_dict(data['parsed_storyboard']) if data.get('parsed_storyboard') else None,
+            version=data.get('version', 0)
+        )
 
 @dataclass
 class StoryResponse:
@@ -0,0 +1,67 @@
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Optional
+
+# Bullet fields a scene can carry, in the order the storyboard prompt asks for them
+SCENE_FIELDS = ('visual', 'setting', 'action', 'mood', 'sound', 'transition')
+
+@dataclass
+class Scene:
+    """One scene of a storyboard; fields missing from the storyboard are empty strings"""
+    number: str = ''
+    name: str = ''
+    visual: str = ''
+    setting: str = ''
+    action: str = ''
+    mood: str = ''
+    sound: str = ''
+    transition: str = ''
+
+    def to_markdown(self) -> str:
+        lines = [f'**Scene {self.number}: "{self.name}"**']
+        for name in SCENE_FIELDS:
+            value = getattr(self, name)
+            if value:
+                lines.append(f'• **{name.capitalize()}**: {value}')
+        return '\n'.join(lines)
+
+@dataclass
+class Storyboard:
+    """A storyboard as title, subtitle and scenes"""
+    title: Optional[str] = None
+    subtitle: Optional[str] = None
+    scenes: List[Scene] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)  # Free-text lines outside the scene structure
+
+    @property
+    def heading(self) -> Optional[str]:
+        """Title and subtitle as one line, e.g. for the voiceover"""
+        if self.title and self.subtitle:
+            return f'{self.title} – {self.subtitle}'
+        return self.title
+
+    def to_markdown(self) -> str:
+        """Render in the markdown format the UI displays"""
+        blocks = []
+        if self.title:
+            heading = f'"{self.title}" – {self.subtitle}' if self.subtitle else f'"{self.title}"'
+            blocks.append(f'**Storyboard: {heading}**')
+        blocks.extend(self.notes)
+        blocks.extend(scene.to_markdown() for scene in self.scenes)
+        return '\n\n'.join(blocks)
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'subtitle': self.subtitle,
+            'scenes': [asdict(scene) for scene in self.scenes],
+            'notes': self.notes
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Storyboard':
+        return cls(
+            title=data.get('title'),
+            subtitle=data.get('subtitle'),
+            scenes=[Scene(**scene) for scene in data.get('scenes', [])],
+            notes=list(data.get('notes', []))
+        )
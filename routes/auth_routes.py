@@ -1,11 +1,11 @@
 from flask import Blueprint, request, jsonify
-from services.auth_service import SupabaseAuthService
+from services.auth_service import get_auth_service
 from middleware.auth_middleware import require_auth, require_admin
 
 auth_bp = Blueprint('auth', __name__)
 
 # Initialize auth service
-auth_service = SupabaseAuthService()
+auth_service = get_auth_service()
 
 @auth_bp.route('/auth/verify', methods=['POST'])
 def verify_token():
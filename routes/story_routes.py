@@ -1,9 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from services.story_service import StoryService
 from services.openai_service import OpenAIService
 from services.videogen_service import VideoGenService
+from services.supabase_client import get_supabase_client
+from services.video_watcher import create_video_watcher
+from services.job_service import JobQueueFullError
+from services.circuit_breaker import CircuitOpenError, get_circuit_breaker_stats
+from services.rate_limiter import get_rate_limit_stats
+from services.storyboard_parser import storyboard_from_json
+from middleware.auth_middleware import require_admin
+from middleware.idempotency import idempotent, get_idempotency_stats
 from models.story_models import StorySession, Question, StoryResponse
+from models.job_models import JOB_RUNNING, JOB_DONE, JOB_FAILED
+from models.storyboard_models import Storyboard
 import json
+import os
 
 story_bp = Blueprint('story', __name__)
 
@@ -11,6 +22,26 @@ story_bp = Blueprint('story', __name__)
 story_service = StoryService()
 openai_service = OpenAIService()
 videogen_service = VideoGenService()
+video_watcher = create_video_watcher(videogen_service, story_service)
+
+# Upper bound for the opt-in synchronous /video/generate
+VIDEO_SYNC_MAX_WAIT_SECONDS = int(os.getenv('VIDEO_SYNC_MAX_WAIT_SECONDS', '60'))
+
+# How long /video/save-to-supabase waits for the watcher's in-flight save of the same session
+VIDEO_SAVE_WAIT_SECONDS = float(os.getenv('SUPABASE_TIMEOUT_SECONDS', '10'))
+
+# Upper bound for /storyboard/status?wait=N long polls
+STORYBOARD_LONG_POLL_MAX_SECONDS = float(os.getenv('STORYBOARD_LONG_POLL_MAX_SECONDS', '30'))
+
+def videogen_unavailable(error: CircuitOpenError):
+    """503 for requests rejected because VideoGen's circuit breaker is open"""
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'retry_after': round(error.retry_after)
+    })
+    response.headers['Retry-After'] = str(int(error.retry_after) + 1)
+    return response, 503
 
 @story_bp.route('/story/start', methods=['POST'])
 def start_story_session():
@@ -48,6 +79,7 @@ def start_story_session():
         }), 500
 
 @story_bp.route('/story/answer', methods=['POST'])
+@idempotent
 def submit_answer():
     """
     Submit an answer to a story question
@@ -65,7 +97,7 @@ def submit_answer():
             }), 400
         
         # Save the answer
-        story_service.save_answer(session_id, question_number, answer)
+        session = story_service.save_answer(session_id, question_number, answer)
         
         # Check if all questions are answered
         if question_number >= 4:
@@ -92,11 +124,16 @@ def submit_answer():
             else:
                 # Store the generated storyboard in the session for later video generation
                 story_service.save_generated_storyboard(session_id, generated_story)
+                storyboard_data = None
+                if isinstance(generated_story, Storyboard):
+                    storyboard_data = generated_story.to_dict()
+                    generated_story = generated_story.to_markdown()
                 
                 return jsonify({
                     'success': True,
                     'message': 'That\'s such a powerful takeaway — simple but truly life-changing. Sometimes it takes a sudden moment like that to remind us how fragile a second of distraction can be. Your story holds a quiet strength — a lesson in awareness, presence, and taking care of ourselves, even during everyday moments.\n\nI\'m honored that you\'ve shared this journey with me. Now that we have your four answers, I\'m going to help you transform them into a visual storyboard — something that could be used for a short video, animated clip, or even a slideshow. This will include suggested scenes, visuals, mood, and transitions to bring your experience to life with meaning and impact.\n\nWe\'ll create this together, honoring your story and the courage it took to share it.',
                     'storyboard': generated_story,
+                    'storyboard_data': storyboard_data,
                     'session_complete': True,
                     'question_number': question_number,
                     'total_questions': 4
@@ -106,7 +143,8 @@ def submit_answer():
             next_question = story_service.get_next_question(session_id)
             
             # Provide contextual feedback based on the answer content
-            feedback = story_service._generate_contextual_feedback(question_number, answer)
+            category = session.story_category if question_number == 1 else None
+            feedback = story_service._generate_contextual_feedback(question_number, answer, category)
             
             return jsonify({
                 'success': True,
@@ -193,13 +231,18 @@ def get_session_status(session_id):
         }), 500
 
 @story_bp.route('/video/generate', methods=['POST'])
+@idempotent
 def generate_video():
     """
     Generate a video from a text script using VideoGen API
+    
+    Returns a job ID immediately; poll /video/jobs/<job_id> for the final URL.
+    Pass "wait": true to block for the result instead (bounded by VIDEO_SYNC_MAX_WAIT_SECONDS).
     """
     try:
         data = request.get_json()
         script = data.get('script')
+        wait = data.get('wait') is True or request.args.get('wait') in ('1', 'true')
         
         if not script:
             return jsonify({
@@ -207,14 +250,84 @@ def generate_video():
                 'message': 'Script is required'
             }), 400
         
-        # Generate video using VideoGen
-        video_url = openai_service.generate_video_from_script(script)
+        videogen_service.circuit_breaker.check()
+        
+        if wait:
+            # Opt-in legacy behaviour, with a hard deadline so a worker can't be held for minutes
+            video_url = openai_service.generate_video_from_script(script, max_wait_time=VIDEO_SYNC_MAX_WAIT_SECONDS)
+            
+            return jsonify({
+                'success': True,
+                'video_url': video_url,
+                'message': 'Video generated successfully'
+            })
+        
+        job = openai_service.start_video_from_script(script)
         
         return jsonify({
             'success': True,
-            'video_url': video_url,
-            'message': 'Video generated successfully'
-        })
+            'job_id': job.job_id,
+            'status': 'queued',
+            'status_url': f"/api/video/jobs/{job.job_id}",
+            'message': 'Video generation started'
+        }), 202
+    
+    except CircuitOpenError as e:
+        return videogen_unavailable(e)
+    except JobQueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@story_bp.route('/video/jobs/<job_id>', methods=['GET'])
+def get_video_job_status(job_id):
+    """
+    Get the status of a video job started by /video/generate
+    """
+    try:
+        job = openai_service.jobs.get_job(job_id)
+        if job is None or job.kind != 'video':
+            return jsonify({
+                'success': False,
+                'message': 'Job not found'
+            }), 404
+        
+        response = {
+            'success': True,
+            'job_id': job.job_id,
+            'status': 'queued',
+            'video_url': None,
+            'api_file_id': None
+        }
+        
+        if job.status == JOB_FAILED or (job.status == JOB_DONE and not job.result.get('api_file_id')):
+            response['status'] = 'failed'
+            response['error'] = job.error or job.result.get('error')
+        elif job.status == JOB_DONE:
+            api_file_id = job.result['api_file_id']
+            response['api_file_id'] = api_file_id
+            state = video_watcher.track(api_file_id)
+            if state['loading_state'] == 'FULFILLED':
+                response['status'] = 'completed'
+                response['video_url'] = state['result'].get('apiFileSignedUrl')
+            elif state['loading_state'] == 'REJECTED':
+                response['status'] = 'failed'
+                response['error'] = 'Video generation was rejected'
+            else:
+                response['status'] = 'rendering'
+                response['eta_seconds'] = video_watcher.get_status(api_file_id)['eta_seconds']
+                if state['error']:
+                    response['error'] = state['error']
+        elif job.status == JOB_RUNNING:
+            response['status'] = 'submitting'
+        
+        return jsonify(response)
     
     except Exception as e:
         return jsonify({
@@ -223,6 +336,7 @@ def generate_video():
         }), 500
 
 @story_bp.route('/video/generate-from-session', methods=['POST'])
+@idempotent
 def generate_video_from_session():
     """
     Generate a video from a completed story session
@@ -238,20 +352,24 @@ def generate_video_from_session():
                 'message': 'Session ID is required'
             }), 400
         
-        # Get the stored storyboard from the session
-        storyboard = story_service.get_generated_storyboard(session_id)
+        # Get the stored storyboard from the session, parsed when it was saved
+        storyboard = story_service.get_parsed_storyboard(session_id)
         if not storyboard:
             return jsonify({
                 'success': False,
                 'message': 'No storyboard found for this session'
             }), 404
         
+        videogen_service.circuit_breaker.check()
+        
         # Generate video from storyboard
         video_url = None
         try:
             print(f"Generating video for session {session_id}")
-            video_url = openai_service.generate_video_from_storyboard(storyboard)
+            video_url = openai_service.generate_video_from_storyboard(storyboard, session_id)
             print(f"Video generation initiated: {video_url}")
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Video generation failed: {e}")
             import traceback
@@ -264,8 +382,8 @@ def generate_video_from_session():
         
         # Save to Supabase when video is ready
         if video_url and video_url.startswith('videogen://'):
-            # Video is still processing, will save when ready
-            pass
+            # Video is still processing, the watcher saves it once it's ready
+            video_watcher.track(video_url[len('videogen://'):], session_id)
         elif video_url:
             # Video is ready, save to Supabase
             story_service.save_to_supabase(session_id, video_url)
@@ -276,6 +394,8 @@ def generate_video_from_session():
             'message': 'Video generation started'
         })
     
+    except CircuitOpenError as e:
+        return videogen_unavailable(e)
     except Exception as e:
         print(f"Error in generate_video_from_session: {str(e)}")
         import traceback
@@ -286,9 +406,13 @@ def generate_video_from_session():
         }), 500
 
 @story_bp.route('/video/generate-from-storyboard', methods=['POST'])
+@idempotent
 def generate_video_from_storyboard():
     """
     Generate a video from a storyboard using VideoGen API
+    
+    The storyboard can be markdown text or structured storyboard data
+    (title, subtitle, scenes) as returned in storyboard_data.
     """
     try:
         data = request.get_json()
@@ -302,8 +426,19 @@ def generate_video_from_storyboard():
                 'message': 'Storyboard is required'
             }), 400
         
+        if isinstance(storyboard, dict):
+            try:
+                storyboard = storyboard_from_json(storyboard)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'Invalid storyboard: {str(e)}'
+                }), 400
+        
+        videogen_service.circuit_breaker.check()
+        
         # Generate video using VideoGen
-        video_url = openai_service.generate_video_from_storyboard(storyboard)
+        video_url = openai_service.generate_video_from_storyboard(storyboard, session_id or None)
         
         # Store email temporarily in session (don't save to Supabase yet)
         if email and session_id:
@@ -318,12 +453,18 @@ def generate_video_from_storyboard():
             except Exception as e:
                 print(f"Failed to store email or save to Supabase: {e}")
         
+        # Watch the render server-side; with a session it is saved to Supabase when ready
+        if video_url and video_url.startswith('videogen://'):
+            video_watcher.track(video_url[len('videogen://'):], session_id or None)
+        
         return jsonify({
             'success': True,
             'video_url': video_url,
             'message': 'Video generated successfully from storyboard'
         })
     
+    except CircuitOpenError as e:
+        return videogen_unavailable(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -347,6 +488,13 @@ def save_video_to_supabase():
                 'message': 'Session ID and video URL are required'
             }), 400
         
+        # The video watcher may already have saved this session's video, or be saving it now
+        if video_watcher.wait_for_save(session_id, VIDEO_SAVE_WAIT_SECONDS, video_url):
+            return jsonify({
+                'success': True,
+                'message': 'Video saved to Supabase successfully'
+            })
+        
         # Save to Supabase
         try:
             print(f"Saving final video {video_url} to Supabase for session {session_id}")
@@ -384,7 +532,6 @@ def test_supabase():
     """
     try:
         import os
-        from supabase import create_client
         
         # Get Supabase client
         supabase_url = os.getenv('SUPABASE_URL')
@@ -398,7 +545,7 @@ def test_supabase():
                 'key': 'None' if not supabase_key else f'{supabase_key[:10]}...'
             }), 500
         
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client()
         
         # Test table access
         response = supabase.table('story_submissions').select('*').limit(1).execute()
@@ -430,12 +577,27 @@ def get_video_status(api_file_id):
                 'message': 'API file ID is required'
             }), 400
         
-        # Get video status from VideoGen
-        result = videogen_service.get_video_file(api_file_id)
+        # Answer from the watcher's shared polling state; only unseen ids hit VideoGen directly
+        state = video_watcher.get_status(api_file_id)
+        if state is None:
+            state = video_watcher.refresh(api_file_id)
+        if state['result'] is None:
+            # VideoGen is still setting the render up; the watcher keeps polling it
+            return jsonify({
+                'success': True,
+                'result': {'loadingState': 'PENDING'},
+                'last_checked': state['last_checked'],
+                'eta_seconds': state['eta_seconds'],
+                'saved': state['saved'],
+                'error': state['error']
+            })
         
         return jsonify({
             'success': True,
-            'result': result
+            'result': state['result'],
+            'last_checked': state['last_checked'],
+            'eta_seconds': state['eta_seconds'],
+            'saved': state['saved']
         })
     
     except Exception as e:
@@ -448,19 +610,29 @@ def get_video_status(api_file_id):
 def get_storyboard_status(session_id):
     """
     Get the status of storyboard generation for a session
+    
+    With ?wait=N the request is held (up to N seconds, capped) until the
+    storyboard finishes instead of returning 'generating' straight away.
     """
     try:
-        status = openai_service.get_storyboard_status(session_id)
+        wait = min(request.args.get('wait', default=0, type=float) or 0, STORYBOARD_LONG_POLL_MAX_SECONDS)
+        if wait > 0:
+            status = openai_service.wait_for_storyboard_status(session_id, wait)
+        else:
+            status = openai_service.get_storyboard_status(session_id)
         
-        if status['status'] == 'completed':
+        if status['status'] == 'completed' and status.get('storyboard_data'):
             # Store the completed storyboard in the session
-            story_service.save_generated_storyboard(session_id, status['storyboard'])
+            story_service.save_generated_storyboard(session_id, Storyboard.from_dict(status['storyboard_data']))
         
         return jsonify({
             'success': True,
             'status': status['status'],
             'storyboard': status.get('storyboard'),
-            'timestamp': status.get('timestamp')
+            'storyboard_data': status.get('storyboard_data'),
+            'timestamp': status.get('timestamp'),
+            'job': status.get('job'),
+            'error': status.get('error')
         })
     
     except Exception as e:
@@ -470,6 +642,67 @@ def get_storyboard_status(session_id):
             'error': str(e)
         }), 500
 
+@story_bp.route('/storyboard/stream/<session_id>', methods=['GET'])
+def stream_storyboard(session_id):
+    """
+    Stream storyboard generation for a completed session as Server-Sent Events
+    
+    Events: 'scene' (each scene as soon as the model has finished it, as
+    markdown text and fields) and 'done' (the full storyboard as markdown
+    and structured data, already saved to the session).
+    """
+    try:
+        formatted_answers = story_service.get_all_answers_for_story_generation(session_id)
+        if not formatted_answers or len(formatted_answers) < 4:
+            return jsonify({
+                'success': False,
+                'message': 'Session not found or interview not complete'
+            }), 404
+        
+        def event_stream():
+            for event, data in openai_service.stream_storyboard(formatted_answers):
+                if event == 'done':
+                    # Persist before telling the client it's done
+                    story_service.save_generated_storyboard(session_id, Storyboard.from_dict(data['storyboard_data']))
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        
+        return Response(
+            stream_with_context(event_stream()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+    
+    except Exception as e:
+        print(f"Error starting storyboard stream: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@story_bp.route('/metrics', methods=['GET'])
+@require_admin
+def get_metrics():
+    """
+    In-process cache and queue metrics for this worker (Admin only)
+    """
+    caches = [openai_service._storyboard_cache.stats(), openai_service._storyboard_results.stats(), get_idempotency_stats()]
+    if hasattr(story_service.store, 'stats'):
+        caches.append(story_service.store.stats())
+    
+    return jsonify({
+        'success': True,
+        'caches': caches,
+        'jobs': openai_service.jobs.stats(),
+        'video_watcher': video_watcher.stats(),
+        'videogen_http': VideoGenService.get_http_stats(),
+        'single_flight': openai_service.single_flight.stats(),
+        'rate_limits': get_rate_limit_stats(),
+        'circuit_breakers': get_circuit_breaker_stats()
+    })
+
 @story_bp.route('/health', methods=['GET'])
 def health_check():
     """
@@ -1,14 +1,9 @@
 from flask import Blueprint, request, jsonify
-from services.auth_service import SupabaseAuthService
+from services.supabase_client import get_supabase_client
 from middleware.auth_middleware import require_admin
-import os
-from supabase import create_client
 
 submissions_bp = Blueprint('submissions', __name__)
 
-# Initialize auth service
-auth_service = SupabaseAuthService()
-
 @submissions_bp.route('/submissions', methods=['GET'])
 @require_admin
 def get_submissions():
@@ -17,9 +12,7 @@ def get_submissions():
     """
     try:
         # Get Supabase client
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client()
         
         # Query submissions
         response = supabase.table('story_submissions').select('*').order('created_at', desc=True).execute()
@@ -52,9 +45,7 @@ def delete_submission(submission_id):
     """
     try:
         # Get Supabase client
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = get_supabase_client()
         
         # Delete submission
         response = supabase.table('story_submissions').delete().eq('id', submission_id).execute()
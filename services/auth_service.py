@@ -1,19 +1,173 @@
+import hashlib
 import os
-from supabase import create_client, Client
+import threading
+import time
+from supabase import Client
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 import requests
+from .bounded_cache import BoundedCache
+from .supabase_client import get_supabase_client
 
 class SupabaseAuthService:
+    # Signing keys fetched from the project's JWKS endpoint, shared by all instances
+    _jwks_keys = {}
+    _jwks_fetched_at = 0.0
+    _jwks_lock = threading.Lock()
+    
+    # Verification results keyed by SHA-256 of the token, shared by all instances
+    _token_cache = BoundedCache(
+        max_entries=int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '10000')),
+        name='verified_tokens'
+    )
+    
     def __init__(self):
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.supabase: Client = get_supabase_client()
+        self.jwt_secret = os.getenv('SUPABASE_JWT_SECRET')
+        self.jwt_audience = os.getenv('SUPABASE_JWT_AUDIENCE', 'authenticated')
+        self.jwt_issuer = f"{self.supabase_url.rstrip('/')}/auth/v1" if self.supabase_url else None
+        self.jwks_url = f"{self.jwt_issuer}/.well-known/jwks.json" if self.jwt_issuer else None
+        self.jwks_ttl = int(os.getenv('SUPABASE_JWKS_TTL_SECONDS', '600'))
+        # Minimum gap between refetches triggered by an unknown key id
+        self.jwks_refresh_cooldown = int(os.getenv('SUPABASE_JWKS_REFRESH_COOLDOWN_SECONDS', '30'))
+        self.token_cache_max_ttl = int(os.getenv('TOKEN_CACHE_MAX_TTL_SECONDS', '300'))
+        self.token_cache_negative_ttl = int(os.getenv('TOKEN_CACHE_NEGATIVE_TTL_SECONDS', '10'))
         
     def verify_token(self, token: str) -> dict:
         """
         Verify JWT token and return user data
+        
+        The signature, expiry, audience and issuer are checked locally, using
+        SUPABASE_JWT_SECRET for HS256 tokens or the project's JWKS for
+        asymmetric ones. Supabase is only asked when no local key is available.
+        Results are cached per token until its expiry (capped), and rejections
+        for a few seconds, so bursts with the same bearer token verify once.
+        """
+        cache_key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        cached = self._token_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        user_data = self._verify_token_uncached(token)
+        
+        ttl = self._token_cache_ttl(token, user_data)
+        if ttl > 0:
+            self._token_cache.set(cache_key, dict(user_data), ttl_seconds=ttl)
+        return user_data
+    
+    def _token_cache_ttl(self, token: str, user_data: dict) -> float:
+        """Cache accepted tokens no longer than their own exp claim, rejected ones briefly"""
+        if not user_data.get('is_authenticated'):
+            return self.token_cache_negative_ttl
+        
+        try:
+            expires_at = jwt.get_unverified_claims(token).get('exp')
+        except JWTError:
+            expires_at = None
+        if expires_at is None:
+            return self.token_cache_max_ttl
+        return min(self.token_cache_max_ttl, float(expires_at) - time.time())
+    
+    def _verify_token_uncached(self, token: str) -> dict:
+        try:
+            claims = self._verify_token_locally(token)
+        except JWTError as e:
+            print(f"Token verification error: {e}")
+            return {'is_authenticated': False}
+        
+        if claims is not None:
+            return {
+                'user_id': claims.get('sub'),
+                'email': claims.get('email'),
+                'is_authenticated': True
+            }
+        
+        return self._verify_token_remotely(token)
+    
+    def _verify_token_locally(self, token: str):
+        """
+        Decode and validate the token without a network round trip.
+        
+        Returns:
+            dict: The verified claims, or None when no key is available to check the token locally
+        
+        Raises:
+            JWTError: If the token is malformed, expired, or fails signature/claim checks
         """
+        header = jwt.get_unverified_header(token)
+        
+        # The header's alg is attacker-controlled, so it only picks the key path;
+        # the accepted algorithm always comes from our side
+        if header.get('alg') == 'HS256':
+            if not self.jwt_secret:
+                return None
+            key = self.jwt_secret
+            algorithms = ['HS256']
+        else:
+            key = self._get_signing_key(header.get('kid'))
+            if key is None:
+                return None
+            algorithm = self._jwk_algorithm(key)
+            if algorithm is None:
+                raise JWTError("Signing key has no supported algorithm")
+            algorithms = [algorithm]
+        
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=algorithms,
+            audience=self.jwt_audience,
+            issuer=self.jwt_issuer
+        )
+        if not claims.get('sub'):
+            raise JWTError("Token has no subject")
+        return claims
+    
+    @staticmethod
+    def _jwk_algorithm(jwk: dict):
+        """The algorithm a JWKS key is published for, limited to RS256/ES256"""
+        algorithm = jwk.get('alg') or {'RSA': 'RS256', 'EC': 'ES256'}.get(jwk.get('kty'))
+        return algorithm if algorithm in ('RS256', 'ES256') else None
+    
+    def _get_signing_key(self, kid: str):
+        """Look up a JWKS key by id, refetching the key set when it is stale or the id is unknown (key rotation)"""
+        if not self.jwks_url or not kid:
+            return None
+        
+        cls = SupabaseAuthService
+        now = time.time()
+        key = cls._jwks_keys.get(kid)
+        age = now - cls._jwks_fetched_at
+        
+        if key is not None and age < self.jwks_ttl:
+            return key
+        if key is None and age < self.jwks_refresh_cooldown:
+            return None
+        
+        with cls._jwks_lock:
+            # Another thread may have refreshed while we waited
+            if time.time() - cls._jwks_fetched_at >= min(age, self.jwks_refresh_cooldown):
+                self._refresh_jwks()
+            return cls._jwks_keys.get(kid)
+    
+    def _refresh_jwks(self):
+        cls = SupabaseAuthService
+        try:
+            response = requests.get(self.jwks_url, headers={'apikey': self.supabase_key or ''}, timeout=5)
+            response.raise_for_status()
+            keys = {k['kid']: k for k in response.json().get('keys', []) if k.get('kid')}
+            cls._jwks_keys = keys
+            print(f"Loaded {len(keys)} JWKS signing keys")
+        except Exception as e:
+            # Keep serving the keys we already have; unknown ids fall back to Supabase
+            print(f"JWKS fetch error: {e}")
+        finally:
+            cls._jwks_fetched_at = time.time()
+    
+    def _verify_token_remotely(self, token: str) -> dict:
+        """Fallback: ask Supabase to verify the token"""
         try:
             # Verify token with Supabase
             response = self.supabase.auth.get_user(token)
@@ -96,3 +250,17 @@ class SupabaseAuthService:
         except Exception as e:
             print(f"List users error: {e}")
             return {'success': False, 'error': str(e)}
+
+
+_auth_service = None
+_auth_service_lock = threading.Lock()
+
+
+def get_auth_service() -> SupabaseAuthService:
+    """Return the shared SupabaseAuthService, creating it on first use"""
+    global _auth_service
+    if _auth_service is None:
+        with _auth_service_lock:
+            if _auth_service is None:
+                _auth_service = SupabaseAuthService()
+    return _auth_service
@@ -0,0 +1,174 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Rough recursive size of a value in bytes.
+
+    Follows containers, dataclasses and plain objects so that cached sessions and
+    storyboard dicts are charged for their contents, not just the outer object.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _seen) + estimate_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _seen)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache bounded by entry count and approximate byte size,
+    with a per-entry TTL and hit/miss/eviction counters.
+
+    Args:
+        max_entries (int): Maximum number of entries, 0 for unlimited
+        max_bytes (int): Maximum total estimated size in bytes, 0 for unlimited
+        ttl_seconds (float): Default time-to-live per entry, 0 for no expiry
+        sizeof (Callable): Function used to estimate the size of a value
+        name (str): Label used in stats output
+    """
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 0, ttl_seconds: float = 0,
+                 sizeof: Callable[[Any], int] = estimate_size, name: str = 'cache'):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self.name = name
+
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.RLock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, _, expires_at = entry
+            if expires_at and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value; ttl_seconds overrides the cache default for this entry
+
+        A value larger than max_bytes is not stored and leaves any existing
+        entry for the key in place.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else 0
+        size = self.sizeof(value)
+
+        with self._lock:
+            if self.max_bytes and size > self.max_bytes:
+                # Would evict everything else and still not fit; an existing entry is kept
+                self.evictions += 1
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry[2] and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return False
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        """When over bounds, drop expired entries first, then least recently used ones"""
+        if not self._over_bounds():
+            return
+
+        now = time.monotonic()
+        for key in [k for k, (_, _, expires_at) in self._entries.items() if expires_at and expires_at <= now]:
+            self._remove(key)
+            self.expirations += 1
+
+        while self._entries and self._over_bounds():
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _over_bounds(self) -> bool:
+        return bool(
+            (self.max_entries and len(self._entries) > self.max_entries) or
+            (self.max_bytes and self._bytes > self.max_bytes)
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
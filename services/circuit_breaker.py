@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for one upstream service.
+
+    Outcomes of the last `window_size` calls are kept. Once at least
+    `min_calls` are recorded, the breaker opens when the share of failures
+    reaches failure_rate_threshold or the share of calls slower than
+    slow_call_seconds reaches slow_call_rate_threshold. While open every
+    call fails immediately with CircuitOpenError. After open_seconds one
+    trial call is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 10.0,
+                 slow_call_rate_threshold: float = 0.8, window_size: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+
+        self._outcomes = deque(maxlen=window_size)  # (failed, slow) per call
+        self._state = CIRCUIT_CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == CIRCUIT_OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def _retry_after(self, now: float) -> float:
+        return max(1.0, self.open_seconds - (now - self._opened_at))
+
+    def check(self) -> None:
+        """
+        Fail fast if calls are currently being rejected, without using up the half-open trial
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CIRCUIT_OPEN or (state == CIRCUIT_HALF_OPEN and self._trial_in_flight):
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._retry_after(now))
+
+    def before_call(self) -> None:
+        """
+        Reserve permission for one call; pair with record_success/record_failure
+
+        Raises:
+            CircuitOpenError: If the breaker is open or its half-open trial is already running
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CIRCUIT_CLOSED:
+                return
+            if state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self._retry_after(now))
+
+    def cancel(self) -> None:
+        """Give back a reservation from before_call without recording an outcome (e.g. the client went away)"""
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self, duration: float) -> None:
+        self._record(False, duration)
+
+    def record_failure(self, duration: float) -> None:
+        self._record(True, duration)
+
+    def _record(self, failed: bool, duration: float):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._trial_in_flight = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    print(f"Circuit '{self.name}' closed after successful trial call")
+                    self._state = CIRCUIT_CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append((failed, slow))
+            if self._state != CIRCUIT_CLOSED or len(self._outcomes) < self.min_calls:
+                return
+            total = len(self._outcomes)
+            failure_rate = sum(1 for f, _ in self._outcomes if f) / total
+            slow_rate = sum(1 for _, s in self._outcomes if s) / total
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._open(now)
+
+    def _open(self, now: float):
+        print(f"Circuit '{self.name}' opened for {self.open_seconds}s")
+        self._state = CIRCUIT_OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def call(self, fn: Callable[[], Any], is_failure: Optional[Callable[[Exception], bool]] = None) -> Any:
+        """
+        Run fn through the breaker
+
+        Exceptions count as failures unless is_failure says otherwise
+        (e.g. a 400 caused by our own request says nothing about the upstream).
+        """
+        self.before_call()
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.record_failure(time.monotonic() - start)
+            else:
+                self.record_success(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            total = len(self._outcomes)
+            return {
+                'name': self.name,
+                'state': state,
+                'calls_in_window': total,
+                'failure_rate': round(sum(1 for f, _ in self._outcomes if f) / total, 3) if total else 0.0,
+                'slow_call_rate': round(sum(1 for _, s in self._outcomes if s) / total, 3) if total else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_after_seconds': round(self._retry_after(now), 1) if state == CIRCUIT_OPEN else None
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, slow_call_seconds: float) -> CircuitBreaker:
+    """Return the process-wide breaker for an upstream, creating it on first use"""
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_rate_threshold=float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5')),
+                slow_call_seconds=slow_call_seconds,
+                slow_call_rate_threshold=float(os.getenv('CIRCUIT_SLOW_CALL_RATE', '0.8')),
+                window_size=int(os.getenv('CIRCUIT_WINDOW_SIZE', '20')),
+                min_calls=int(os.getenv('CIRCUIT_MIN_CALLS', '5')),
+                open_seconds=float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+            )
+            _breakers[name] = breaker
+    return breaker
+
+
+def get_circuit_breaker_stats():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.stats() for breaker in breakers]
@@ -0,0 +1,56 @@
+import re
+
+# Third person references rewritten for the first-person voiceover
+FIRST_PERSON = {
+    'he': 'I',
+    'she': 'I',
+    'they': 'I',
+    'him': 'me',
+    'them': 'me',
+    'her': 'my',
+    'his': 'my',
+    'their': 'my',
+    'himself': 'myself',
+    'herself': 'myself',
+    'themselves': 'myself',
+    'the person': 'I',
+    'the individual': 'I',
+    'the protagonist': 'I',
+    'the main character': 'I'
+}
+
+# Any FIRST_PERSON key as a whole word, longest alternatives first. The lookahead
+# skips words that can't start a match before the alternation is tried, and
+# contractions ("they're", "he's") are left alone, as the old replace chain did.
+_THIRD_PERSON = re.compile(
+    r'\b(?=[hst])(' + '|'.join(
+        re.escape(word).replace(r'\ ', r'\s+') for word in sorted(FIRST_PERSON, key=len, reverse=True)
+    ) + r")\b(?!['’]\w)",
+    re.IGNORECASE
+)
+
+# A run of the same first-person word ("I I", "my my"), from the text or from
+# converting adjacent pronouns ("he she" -> "I I"); collapsed to the first one
+_REPEATED_FIRST_PERSON = re.compile(r'\b(?=[im])(I|me|my)(?:\s+\1\b)+', re.IGNORECASE)
+
+
+def _first_person_replacement(match) -> str:
+    word = match.group(1)
+    replacement = FIRST_PERSON[' '.join(word.lower().split())]
+    if word.isupper() and len(word) > 1:
+        return replacement.upper()
+    if word[0].isupper():
+        return replacement[0].upper() + replacement[1:]
+    return replacement
+
+
+def convert_to_first_person(text: str) -> str:
+    """
+    Convert third person references to first person
+
+    One pass of a precompiled whole-word pattern over FIRST_PERSON, so 'the'
+    or 'these' are never touched and the case of the original word is kept,
+    then one pass collapsing repeated 'I'/'me'/'my'. Converting converted
+    text changes nothing.
+    """
+    return _REPEATED_FIRST_PERSON.sub(r'\1', _THIRD_PERSON.sub(_first_person_replacement, text))
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from .bounded_cache import BoundedCache
+
+
+class IdempotencyStore(ABC):
+    """
+    Storage for Idempotency-Key records, shared by every worker that uses the same backend.
+
+    A key is first claimed (set-if-absent, with a lease so a crashed worker
+    doesn't hold it forever), then either completed with the response to
+    replay or released so a retry can run the request again.
+    """
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """The stored response for a completed key, or None"""
+        pass
+
+    @abstractmethod
+    def claim(self, key: str, lease_seconds: float) -> bool:
+        """Mark the key in flight; False if it is already in flight or completed"""
+        pass
+
+    @abstractmethod
+    def complete(self, key: str, record: Dict, ttl_seconds: float) -> None:
+        pass
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Drop an in-flight claim without storing a response"""
+        pass
+
+    def stats(self) -> Dict:
+        return {'name': 'idempotency', 'backend': type(self).__name__}
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Process-local records, only correct with a single worker"""
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 16 * 1024 * 1024):
+        self._responses = BoundedCache(max_entries=max_entries, max_bytes=max_bytes, name='idempotency')
+        self._in_flight = {}  # key -> lease expiry
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._responses.get(key)
+
+    def claim(self, key: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._responses.get(key) is not None or self._in_flight.get(key, 0) > now:
+                return False
+            self._in_flight[key] = now + lease_seconds
+            return True
+
+    def complete(self, key: str, record: Dict, ttl_seconds: float) -> None:
+        with self._lock:
+            self._responses.set(key, record, ttl_seconds=ttl_seconds)
+            self._in_flight.pop(key, None)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict:
+        stats = self._responses.stats()
+        with self._lock:
+            stats['in_flight'] = len(self._in_flight)
+        return stats
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """Records in Redis; the in-flight claim is SET NX with the lease as its expiry"""
+    def __init__(self, url: str, key_prefix: str = 'storycatcher:idempotency:'):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("SESSION_STORE=redis requires the 'redis' package to be installed")
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        raw = self.client.get(self._key(key))
+        if raw is None or raw == b'in_flight':
+            return None
+        record = json.loads(raw)
+        record['body'] = record['body'].encode('latin-1')
+        return record
+
+    def claim(self, key: str, lease_seconds: float) -> bool:
+        # One key holds the claim and then the response, so a completed key can't be claimed again
+        return bool(self.client.set(self._key(key), 'in_flight', nx=True, px=int(lease_seconds * 1000)))
+
+    def complete(self, key: str, record: Dict, ttl_seconds: float) -> None:
+        raw = json.dumps(dict(record, body=record['body'].decode('latin-1')))
+        self.client.set(self._key(key), raw, ex=int(ttl_seconds))
+
+    def release(self, key: str) -> None:
+        # Only drop our own claim, never a stored response
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self._key(key))
+                if pipe.get(self._key(key)) == b'in_flight':
+                    pipe.multi()
+                    pipe.delete(self._key(key))
+                    pipe.execute()
+            except Exception as e:
+                print(f"Idempotency release failed for {key}: {e}")
+
+
+class SqliteIdempotencyStore(IdempotencyStore):
+    """Records in a table next to the SQLite session store, shared by the workers on one host"""
+    def __init__(self, path: str, sweep_interval: float = 60):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS idempotency_records ('
+                'key TEXT PRIMARY KEY, '
+                'record TEXT, '  # NULL while the first request is in flight
+                'expires_at REAL NOT NULL)'
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            'SELECT record FROM idempotency_records WHERE key = ? AND record IS NOT NULL AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        record['body'] = record['body'].encode('latin-1')
+        return record
+
+    def claim(self, key: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._conn() as conn:
+            # Insert, or take over a row whose lease or TTL has run out
+            cursor = conn.execute(
+                'INSERT INTO idempotency_records (key, record, expires_at) VALUES (?, NULL, ?) '
+                'ON CONFLICT(key) DO UPDATE SET record = NULL, expires_at = excluded.expires_at '
+                'WHERE idempotency_records.expires_at <= ?',
+                (key, now + lease_seconds, now)
+            )
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                conn.execute('DELETE FROM idempotency_records WHERE expires_at <= ?', (now,))
+        return cursor.rowcount == 1
+
+    def complete(self, key: str, record: Dict, ttl_seconds: float) -> None:
+        raw = json.dumps(dict(record, body=record['body'].decode('latin-1')))
+        with self._conn() as conn:
+            conn.execute(
+                'UPDATE idempotency_records SET record = ?, expires_at = ? WHERE key = ?',
+                (raw, time.time() + ttl_seconds, key)
+            )
+
+    def release(self, key: str) -> None:
+        with self._conn() as conn:
+            conn.execute('DELETE FROM idempotency_records WHERE key = ? AND record IS NULL', (key,))
+
+    def stats(self) -> Dict:
+        in_flight, stored = self._conn().execute(
+            'SELECT COUNT(*) - COUNT(record), COUNT(record) FROM idempotency_records WHERE expires_at > ?',
+            (time.time(),)
+        ).fetchone()
+        return {'name': 'idempotency', 'backend': 'sqlite', 'entries': stored, 'in_flight': in_flight}
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    """Keep Idempotency-Key records in the same backend as sessions (SESSION_STORE)"""
+    backend = os.getenv('SESSION_STORE', 'sqlite').lower()
+    if backend == 'sqlite':
+        return SqliteIdempotencyStore(os.getenv('SESSION_DB_PATH', 'story_sessions.db'))
+    if backend == 'redis':
+        return RedisIdempotencyStore(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    return MemoryIdempotencyStore(
+        max_entries=int(os.getenv('IDEMPOTENCY_CACHE_MAX_ENTRIES', '5000')),
+        max_bytes=int(os.getenv('IDEMPOTENCY_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+    )
@@ -0,0 +1,447 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+from models.job_models import Job, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from .bounded_cache import BoundedCache
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class MemoryJobQueue:
+    """
+    Bounded in-process job queue.
+
+    Holds pending job ids in a FIFO with a fixed capacity and keeps recent
+    jobs (queued, running and finished) addressable by id and by key.
+    """
+    def __init__(self, max_size: int = 100, max_jobs: int = 5000, job_ttl_seconds: int = 3600):
+        self.max_size = max_size
+        self._pending = deque()  # (job_id, kind) in submission order
+        self._cond = threading.Condition()
+        self._jobs = BoundedCache(max_entries=max_jobs, ttl_seconds=job_ttl_seconds, name='jobs')
+        self._by_key = BoundedCache(max_entries=max_jobs, ttl_seconds=job_ttl_seconds, name='job_keys')
+
+    def put(self, job: Job) -> None:
+        with self._cond:
+            if len(self._pending) >= self.max_size:
+                raise JobQueueFullError(f"Job queue is full ({self.max_size} pending jobs)")
+            self._jobs.set(job.job_id, job)
+            self._pending.append((job.job_id, job.kind))
+            self._cond.notify_all()
+        if job.key:
+            self._by_key.set(job.key, job.job_id)
+
+    def claim(self, timeout: float, kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+        """Block up to timeout seconds for the oldest queued job of one of the given kinds and mark it running"""
+        kinds = set(kinds or [])
+        if not kinds:
+            return None
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                entry = next((entry for entry in self._pending if entry[1] in kinds), None)
+                if entry is not None:
+                    self._pending.remove(entry)
+                    job_id = entry[0]
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        job.attempts += 1
+        return job
+
+    def complete(self, job: Job, result: Any) -> None:
+        job.result = result
+        job.status = JOB_DONE
+        job.finished_at = time.time()
+
+    def fail(self, job: Job, error: str) -> None:
+        job.error = error
+        job.status = JOB_FAILED
+        job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def find_by_key(self, key: str) -> Optional[Job]:
+        """Most recently submitted job for a key (e.g. a session)"""
+        job_id = self._by_key.get(key)
+        return self._jobs.get(job_id) if job_id else None
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+
+class SqliteJobQueue:
+    """
+    Durable job queue in a WAL-mode SQLite file, shared by every worker process on the host.
+
+    Claiming a job leases it for visibility_timeout seconds. A job whose
+    worker dies (deploy, OOM kill) becomes claimable again once the lease
+    runs out, so jobs are executed at least once and resume after a restart.
+    Failed attempts are retried with backoff until max_attempts is reached.
+    Jobs that must not run twice (e.g. a paid render submission) are
+    submitted with their own max_attempts=1, so an expired lease fails
+    them instead of running them again.
+    """
+    def __init__(self, path: str, max_size: int = 100, visibility_timeout: int = 120,
+                 max_attempts: int = 3, retry_delay: float = 5.0, poll_interval: float = 0.5,
+                 retention_seconds: int = 86400):
+        self.path = path
+        self.max_size = max_size
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+
+        self._local = threading.local()
+        # Wakes local workers immediately on put(); other processes find jobs by polling
+        self._wakeup = threading.Condition()
+        self._next_purge = 0.0
+
+        self._initialize_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _initialize_schema(self):
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'job_id TEXT PRIMARY KEY, '
+            'kind TEXT NOT NULL, '
+            'job_key TEXT, '
+            'payload TEXT NOT NULL, '
+            'status TEXT NOT NULL, '
+            'created_at REAL NOT NULL, '
+            'started_at REAL, '
+            'finished_at REAL, '
+            'visible_at REAL NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'result TEXT, '
+            'error TEXT, '
+            'max_attempts INTEGER)'
+        )
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        if 'max_attempts' not in columns:
+            # Queues created before jobs carried their own attempt limit
+            conn.execute('ALTER TABLE jobs ADD COLUMN max_attempts INTEGER')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_visible_at ON jobs (status, visible_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (job_key, created_at)')
+
+    def _row_to_job(self, row) -> Job:
+        return Job(
+            job_id=row[0],
+            kind=row[1],
+            key=row[2],
+            payload=json.loads(row[3]),
+            status=row[4],
+            created_at=row[5],
+            started_at=row[6],
+            finished_at=row[7],
+            attempts=row[9],
+            result=json.loads(row[10]) if row[10] is not None else None,
+            error=row[11],
+            max_attempts=row[12]
+        )
+
+    def put(self, job: Job) -> None:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            queued = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (JOB_QUEUED,)).fetchone()[0]
+            if queued >= self.max_size:
+                raise JobQueueFullError(f"Job queue is full ({self.max_size} pending jobs)")
+            conn.execute(
+                'INSERT INTO jobs (job_id, kind, job_key, payload, status, created_at, visible_at, attempts, max_attempts) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)',
+                (job.job_id, job.kind, job.key, json.dumps(job.payload), JOB_QUEUED, job.created_at, job.created_at,
+                 job.max_attempts)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def claim(self, timeout: float, kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+        """Lease the oldest visible job of one of the given kinds, waiting up to timeout seconds"""
+        kinds = list(kinds or [])
+        deadline = time.time() + timeout
+        while True:
+            job = self._try_claim(kinds)
+            if job is not None:
+                return job
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            with self._wakeup:
+                self._wakeup.wait(min(self.poll_interval, remaining))
+
+    def _try_claim(self, kinds) -> Optional[Job]:
+        if not kinds:
+            return None
+        now = time.time()
+        self._purge(now)
+
+        conn = self._conn()
+        placeholders = ','.join('?' * len(kinds))
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            while True:
+                row = conn.execute(
+                    f'SELECT * FROM jobs WHERE status IN (?, ?) AND visible_at <= ? AND kind IN ({placeholders}) '
+                    'ORDER BY created_at LIMIT 1',
+                    (JOB_QUEUED, JOB_RUNNING, now, *kinds)
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+
+                job = self._row_to_job(row)
+                if job.attempts >= self._max_attempts(job):
+                    # Lease expired on the last allowed attempt (worker died mid-job)
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE job_id = ?',
+                        (JOB_FAILED, now, 'Worker lost while running job', job.job_id)
+                    )
+                    continue
+
+                if job.status == JOB_RUNNING:
+                    print(f"Resuming job {job.job_id} ({job.kind}) after expired lease")
+                job.status = JOB_RUNNING
+                job.started_at = now
+                job.attempts += 1
+                conn.execute(
+                    'UPDATE jobs SET status = ?, started_at = ?, attempts = ?, visible_at = ? WHERE job_id = ?',
+                    (JOB_RUNNING, now, job.attempts, now + self.visibility_timeout, job.job_id)
+                )
+                conn.execute('COMMIT')
+                return job
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def complete(self, job: Job, result: Any) -> None:
+        job.result = result
+        job.status = JOB_DONE
+        job.finished_at = time.time()
+        self._conn().execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = NULL WHERE job_id = ?',
+            (JOB_DONE, job.finished_at, json.dumps(result), job.job_id)
+        )
+
+    def fail(self, job: Job, error: str) -> None:
+        job.error = error
+        now = time.time()
+        if job.attempts < self._max_attempts(job):
+            # Put it back with a delay; another attempt will pick it up
+            job.status = JOB_QUEUED
+            self._conn().execute(
+                'UPDATE jobs SET status = ?, visible_at = ?, error = ? WHERE job_id = ?',
+                (JOB_QUEUED, now + self.retry_delay * job.attempts, error, job.job_id)
+            )
+            return
+        job.status = JOB_FAILED
+        job.finished_at = now
+        self._conn().execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE job_id = ?',
+            (JOB_FAILED, now, error, job.job_id)
+        )
+
+    def _max_attempts(self, job: Job) -> int:
+        return job.max_attempts or self.max_attempts
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._conn().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def find_by_key(self, key: str) -> Optional[Job]:
+        """Most recently submitted job for a key (e.g. a session)"""
+        row = self._conn().execute(
+            'SELECT * FROM jobs WHERE job_key = ? ORDER BY created_at DESC LIMIT 1', (key,)
+        ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def depth(self) -> int:
+        return self._conn().execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (JOB_QUEUED,)).fetchone()[0]
+
+    def _purge(self, now: float):
+        """Occasionally drop finished jobs past the retention window"""
+        if now < self._next_purge:
+            return
+        self._next_purge = now + 300
+        try:
+            self._conn().execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                (JOB_DONE, JOB_FAILED, now - self.retention_seconds)
+            )
+        except Exception as e:
+            print(f"Job queue purge failed: {e}")
+
+
+class JobExecutor:
+    """
+    Fixed-size pool of worker threads draining a bounded job queue.
+
+    Work is described by a kind and a JSON-friendly payload; each kind has a
+    handler registered with register(). Submitting to a full queue raises
+    JobQueueFullError instead of spawning more threads.
+    """
+    def __init__(self, job_queue, num_workers: int = 4, poll_timeout: float = 1.0):
+        self.queue = job_queue
+        self.num_workers = num_workers
+        self.poll_timeout = poll_timeout
+        self._handlers: Dict[str, Callable[[Dict], Any]] = {}
+        self._max_attempts: Dict[str, Optional[int]] = {}
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._recent_waits = deque(maxlen=200)
+
+    def register(self, kind: str, handler: Callable[[Dict], Any], max_attempts: Optional[int] = None) -> None:
+        """
+        Register the handler for a job kind and start the workers, resuming any durable backlog
+
+        max_attempts overrides the queue's attempt limit for this kind; pass 1
+        for handlers with side effects that must not be repeated.
+        """
+        self._handlers[kind] = handler
+        self._max_attempts[kind] = max_attempts
+        self._ensure_started()
+
+    def submit(self, kind: str, payload: Dict, key: Optional[str] = None) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self._ensure_started()
+
+        job = Job(job_id=str(uuid.uuid4()), kind=kind, payload=payload, key=key,
+                  max_attempts=self._max_attempts.get(kind))
+        self.queue.put(job)
+        print(f"Queued {kind} job {job.job_id} (queue depth {self.queue.depth()})")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.queue.get(job_id)
+
+    def get_job_for_key(self, key: str) -> Optional[Job]:
+        return self.queue.find_by_key(key)
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        with self._start_lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self.queue.claim(self.poll_timeout, kinds=list(self._handlers))
+            except Exception as e:
+                print(f"Job queue claim error: {e}")
+                time.sleep(self.poll_timeout)
+                continue
+            if job is not None:
+                self._run(job)
+
+    def _run(self, job: Job):
+        with self._stats_lock:
+            self._running += 1
+            self._recent_waits.append(job.wait_time)
+
+        try:
+            result = self._handlers[job.kind](job.payload)
+            self.queue.complete(job, result)
+            with self._stats_lock:
+                self._completed += 1
+            print(f"Job {job.job_id} ({job.kind}) done in {time.time() - job.started_at:.2f}s")
+        except Exception as e:
+            print(f"Job {job.job_id} ({job.kind}) failed: {e}")
+            traceback.print_exc()
+            self.queue.fail(job, str(e))
+            with self._stats_lock:
+                self._failed += 1
+        finally:
+            with self._stats_lock:
+                self._running -= 1
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            waits = list(self._recent_waits)
+            return {
+                'workers': self.num_workers,
+                'queue_depth': self.queue.depth(),
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_wait_seconds': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                'max_wait_seconds': round(max(waits), 3) if waits else 0.0
+            }
+
+
+def create_job_queue():
+    """Build the job queue selected by the JOB_QUEUE_BACKEND environment variable"""
+    backend = os.getenv('JOB_QUEUE_BACKEND', 'sqlite').lower()
+    max_size = int(os.getenv('JOB_QUEUE_MAX_SIZE', '100'))
+
+    if backend == 'sqlite':
+        db_path = os.getenv('JOB_DB_PATH', 'story_jobs.db')
+        print(f"Using SQLite job queue at {db_path}")
+        return SqliteJobQueue(
+            db_path,
+            max_size=max_size,
+            visibility_timeout=int(os.getenv('JOB_VISIBILITY_TIMEOUT_SECONDS', '120')),
+            max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        )
+    if backend != 'memory':
+        raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {backend}")
+
+    return MemoryJobQueue(max_size=max_size)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> JobExecutor:
+    """Return the process-wide job executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                job_queue = create_job_queue()
+                _executor = JobExecutor(job_queue, num_workers=int(os.getenv('JOB_WORKERS', '4')))
+    return _executor
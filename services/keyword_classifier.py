@@ -0,0 +1,123 @@
+import string
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Everything but letters, digits and apostrophes separates words. ASCII punctuation
+# is blanked with a bytes table (much faster than str.translate with a dict); the
+# few non-ASCII separators common in typed answers only cost extra when present.
+_ASCII_PUNCTUATION = string.punctuation.replace("'", '')
+_ASCII_SEPARATORS = bytes.maketrans(_ASCII_PUNCTUATION.encode('ascii'), b' ' * len(_ASCII_PUNCTUATION))
+_UNICODE_SEPARATORS = str.maketrans({char: ' ' for char in '\u2018\u2019\u201c\u201d\u2013\u2014\u2026'})
+
+# Endings added to every single-word keyword, so inflected forms the old substring
+# chains caught ('marriages', 'lover', 'normally', 'helpful') still match
+_SUFFIXES = ('s', 'es', 'd', 'ed', 'ing', 'ings', 'er', 'ers', 'ly', 'ful')
+# The ones that drop a final 'e' ('moving') or double a final consonant ('quitting')
+_VOWEL_SUFFIXES = ('es', 'ed', 'ing', 'ings', 'er', 'ers')
+
+
+def _words(text: str) -> List[str]:
+    text = text.lower()
+    if not text.isascii():
+        text = text.translate(_UNICODE_SEPARATORS)
+    return text.encode('utf-8').translate(_ASCII_SEPARATORS).decode('utf-8').split()
+
+
+def _inflections(keyword: str) -> List[str]:
+    """Regular inflected forms of a single-word keyword"""
+    forms = [keyword + suffix for suffix in _SUFFIXES]
+    if len(keyword) >= 4 and keyword.endswith('e'):
+        forms.extend(keyword[:-1] + suffix for suffix in _VOWEL_SUFFIXES)
+    if keyword[-1] not in 'aeiouwy' and keyword[-2] in 'aeiou':
+        forms.extend(keyword + keyword[-1] + suffix for suffix in _VOWEL_SUFFIXES)
+    return forms
+
+
+class KeywordClassifier:
+    """
+    Classifies free text into one of a fixed set of categories by keyword.
+
+    Keywords are matched as whole words (or whole phrases), so 'fall' no
+    longer fires on 'fallacy'. Every keyword of every category, plus its
+    regular inflections ('moving', 'quitting', 'marriages'), goes into one
+    word-level index built up front. An answer is split into words once
+    and intersected with the index as sets, so the per-answer work is a
+    few C-level passes (lowercase, translate, split, set intersection)
+    instead of a Python loop per word. Multi-word phrases are checked as
+    substrings of the normalized, space-joined words. Categories are listed
+    in priority order: when keywords of several categories occur, the
+    earliest listed category wins, as in the if/elif chains this replaces.
+    """
+    def __init__(self, categories: Iterable[Tuple[str, List[str]]]):
+        self.categories = []
+        self._words: Dict[str, int] = {}
+        self._phrases: List[Tuple[str, int]] = []  # (' passed away ', index)
+        inflected: Dict[str, int] = {}
+        for index, (category, keywords) in enumerate(categories):
+            self.categories.append(category)
+            for keyword in keywords:
+                words = _words(keyword)
+                if len(words) == 1:
+                    self._words.setdefault(words[0], index)
+                    for form in _inflections(words[0]):
+                        inflected.setdefault(form, index)
+                else:
+                    self._phrases.append((f" {' '.join(words)} ", index))
+        # A word that is itself a keyword keeps that keyword's category
+        for form, index in inflected.items():
+            self._words.setdefault(form, index)
+        self._vocabulary = frozenset(self._words)
+
+    def classify(self, text: str) -> Optional[str]:
+        """Highest-priority category with a keyword in text, or None"""
+        if not text:
+            return None
+        words = _words(text)
+        indexes = [self._words[word] for word in self._vocabulary.intersection(words)]
+        if self._phrases:
+            joined = f" {' '.join(words)} "
+            indexes.extend(index for phrase, index in self._phrases if phrase in joined)
+        return self.categories[min(indexes)] if indexes else None
+
+
+def _inflect(*stems: str) -> List[str]:
+    """Expand 'crash' style stems with their common -s/-es/-ed/-ing forms"""
+    forms = []
+    for stem in stems:
+        forms.extend([stem, f'{stem}s', f'{stem}es', f'{stem}ed', f'{stem}ing'])
+    return forms
+
+
+# What the life-changing moment (answer 1) was about
+STORY_CATEGORIES = KeywordClassifier([
+    ('accident', ['fell', 'fall', 'falls', 'falling', 'fallen', 'accident', 'accidents', 'collision',
+                  'collisions', 'collided'] + _inflect('crash')),
+    ('loss', ['lost', 'lose', 'losing', 'loss', 'death', 'deaths', 'die', 'died', 'dying',
+              'passed away', 'pass away', 'passing away']),
+    ('career', ['job', 'jobs', 'career', 'careers', 'fired', 'quit', 'quitting', 'resign', 'resigned',
+                'resigning', 'resignation'] + _inflect('work')),
+    ('relationship', ['relationship', 'relationships', 'breakup', 'break up', 'broke up', 'divorce',
+                      'divorced', 'marriage', 'married', 'love', 'loved', 'loving']),
+    ('move', ['move', 'moved', 'moving', 'relocate', 'relocated', 'relocation', 'journey', 'journeys']
+     + _inflect('travel') + ['travelled', 'travelling'])
+])
+
+# What led up to the moment (answer 2)
+LEAD_UP_CATEGORIES = KeywordClassifier([
+    ('distracted', ['phone', 'phones', 'distracted', 'distraction', 'rushing', 'rushed', 'hurried',
+                    'hurrying']),
+    ('ordinary', ['ordinary', 'normal', 'regular', 'typical'])
+])
+
+# What happened right after (answer 3)
+AFTERMATH_CATEGORIES = KeywordClassifier([
+    ('injury', ['hurt', 'hurting', 'pain', 'painful', 'injured', 'injury', 'injuries', 'bruised', 'bruises']),
+    ('support', ['help', 'helped', 'helping', 'someone', 'people'])
+])
+
+# Classifier for each answer position that has category-specific feedback
+ANSWER_CLASSIFIERS: Dict[int, KeywordClassifier] = {
+    1: STORY_CATEGORIES,
+    2: LEAD_UP_CATEGORIES,
+    3: AFTERMATH_CATEGORIES
+}
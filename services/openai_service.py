@@ -1,17 +1,121 @@
+import hashlib
+import json
 import openai
 import os
-import re
+import threading
 import time
 import requests
 import base64
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import List, Dict, Iterator, Optional, Tuple, Union
+from models.job_models import JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from models.storyboard_models import Scene, Storyboard
+from .bounded_cache import BoundedCache
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker
+from .job_service import get_job_executor
+from .rate_limiter import get_rate_limiter
+from .single_flight import SingleFlight
+from .storyboard_parser import STORYBOARD_JSON_SCHEMA, JsonSceneScanner, parse_storyboard, parse_storyboard_json
 from .videogen_service import VideoGenService
 
+STORYBOARD_SYSTEM_PROMPT = """You are an empathetic interviewer and creative assistant. Your role is to:
+
+1. Create a safe, supportive space for users to share personal stories
+2. Ask thoughtful questions that encourage emotional depth
+3. Validate and acknowledge the user's experience throughout
+4. Collaborate on creative decisions rather than making them alone
+5. Maintain a compassionate, encouraging tone at all times
+
+Your tone should be:
+- Warm and understanding
+- Patient and non-judgmental  
+- Encouraging and supportive
+- Collaborative rather than directive
+
+When creating storyboards, honor the user's emotional journey and create visuals that respect their experience. Use ONLY their specific details and collaborate with them on creative decisions.
+
+Return storyboards as JSON: a title, a subtitle and a list of scenes. Each scene has a name and a visual, setting, action, mood, sound and transition description; leave setting or action empty when the scene doesn't need it.
+
+Create 4-5 scenes total that honor their emotional journey."""
+
+STORYBOARD_MODEL = 'gpt-4o-mini'
+
+# Storyboards come back as JSON matching the scene schema (structured outputs)
+STORYBOARD_RESPONSE_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {
+        'name': 'storyboard',
+        'strict': True,
+        'schema': STORYBOARD_JSON_SCHEMA
+    }
+}
+
+# Truncated JSON can't be used at all, so leave room for the keys and quoting
+STORYBOARD_MAX_TOKENS = 1000
+
+# Bump whenever STORYBOARD_SYSTEM_PROMPT or _create_storyboard_prompt changes,
+# so storyboards cached for the old prompt are no longer served
+STORYBOARD_PROMPT_VERSION = '2'
+
+# How long a stream waits on a generation already running for the same answers before using the fallback
+STORYBOARD_STREAM_JOIN_SECONDS = float(os.getenv('STORYBOARD_STREAM_JOIN_SECONDS', '60'))
+
+def _is_openai_outage(error: Exception) -> bool:
+    """Whether an error says something about OpenAI's health (a rejected request of ours doesn't)"""
+    return not isinstance(error, openai.BadRequestError)
+
 class OpenAIService:
     def __init__(self):
         self.client = None
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.videogen_service = VideoGenService()
+        # Per-session storyboard generation status, bounded so finished entries are evicted
+        self._storyboard_cache = BoundedCache(
+            max_entries=int(os.getenv('STORYBOARD_CACHE_MAX_ENTRIES', '2000')),
+            max_bytes=int(os.getenv('STORYBOARD_CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+            ttl_seconds=int(os.getenv('STORYBOARD_CACHE_TTL_SECONDS', '3600')),
+            name='storyboard_status'
+        )
+        # Finished storyboards by content hash of the answers, so resubmitting
+        # the same answers doesn't pay for another completion
+        self._storyboard_results = BoundedCache(
+            max_entries=int(os.getenv('STORYBOARD_RESULT_CACHE_MAX_ENTRIES', '1000')),
+            max_bytes=int(os.getenv('STORYBOARD_RESULT_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+            ttl_seconds=int(os.getenv('STORYBOARD_RESULT_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+            name='storyboard_results'
+        )
+        # Long-poll waiters for /storyboard/status, one condition per session
+        self._storyboard_waiters = {}
+        self._storyboard_waiters_lock = threading.Lock()
+        # Serializes deciding who generates a session's storyboard (a queued job or a stream)
+        self._storyboard_start_lock = threading.Lock()
+        # Coalesces concurrent generation requests for the same session and content
+        self.single_flight = SingleFlight(name='generation')
+        self.video_share_seconds = float(os.getenv('VIDEO_SINGLE_FLIGHT_SHARE_SECONDS', '30'))
+        # DALL-E scene images render concurrently, paced to the images-per-minute quota
+        self._image_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('OPENAI_IMAGE_CONCURRENCY', '4')),
+            thread_name_prefix='scene-image'
+        )
+        images_per_minute = float(os.getenv('OPENAI_IMAGES_PER_MINUTE', '7'))
+        self._image_limiter = get_rate_limiter(
+            'openai_images',
+            images_per_minute,
+            capacity=float(os.getenv('OPENAI_IMAGE_BURST', str(min(images_per_minute, 4))))
+        )
+        self.image_rate_wait = float(os.getenv('OPENAI_IMAGE_RATE_WAIT_SECONDS', '60'))
+        # Chat completion quota, shared by every worker on the host
+        self._request_limiter = get_rate_limiter('openai_requests', float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '500')))
+        self._token_limiter = get_rate_limiter('openai_tokens', float(os.getenv('OPENAI_TOKENS_PER_MINUTE', '200000')))
+        self.completion_rate_wait = float(os.getenv('OPENAI_RATE_WAIT_SECONDS', '30'))
+        # Trips on OpenAI errors or slow completions so callers get the fallback without waiting
+        self._openai_breaker = get_circuit_breaker('openai', float(os.getenv('OPENAI_SLOW_CALL_SECONDS', '10')))
+        # Storyboard generation runs on the shared, bounded job executor
+        self.jobs = get_job_executor()
+        self.jobs.register('storyboard', self._run_storyboard_job)
+        # One attempt only: re-running after an expired lease would submit a second paid render
+        self.jobs.register('video', self._run_video_job, max_attempts=1)
     
     def _get_client(self):
         """Lazy initialization of OpenAI client"""
@@ -21,7 +125,7 @@ class OpenAIService:
             self.client = openai.OpenAI(api_key=self.api_key)
         return self.client
     
-    def generate_story(self, session_data: Dict) -> str:
+    def generate_story(self, session_data: Dict) -> Union[str, Storyboard]:
         """
         Generate a visual storyboard based on user's answers (legacy method)
         """
@@ -47,119 +151,121 @@ class OpenAIService:
                 prompt = prompt[:3000] + "\n\n[Content truncated for faster processing]"
                 print(f"Prompt truncated to {len(prompt)} characters")
             
-            # Start asynchronous storyboard generation
-            print("Starting asynchronous storyboard generation")
-            import threading
-            import time
-            
-            # Store the session ID for background processing
-            session_id = formatted_answers[0].get('session_id', 'unknown')
-            
-            # Start background thread for OpenAI API call
-            def generate_storyboard_async():
-                try:
-                    print(f"Background thread: Starting OpenAI API call for session {session_id}")
-                    response = self._get_client().chat.completions.create(
-                        model="gpt-4o-mini",  # Faster model
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": """You are an empathetic interviewer and creative assistant. Your role is to:
-
-1. Create a safe, supportive space for users to share personal stories
-2. Ask thoughtful questions that encourage emotional depth
-3. Validate and acknowledge the user's experience throughout
-4. Collaborate on creative decisions rather than making them alone
-5. Maintain a compassionate, encouraging tone at all times
-
-Your tone should be:
-- Warm and understanding
-- Patient and non-judgmental  
-- Encouraging and supportive
-- Collaborative rather than directive
-
-When creating storyboards, honor the user's emotional journey and create visuals that respect their experience. Use ONLY their specific details and collaborate with them on creative decisions.
-
-Format storyboards as:
-
-**Storyboard: "[Title]" – [Subtitle]**
-
-**Scene 1: "[Scene Name]"**
-• **Visual**: [description]
-• **Setting**: [description]
-• **Mood**: [description]
-• **Sound**: [description]
-• **Transition**: [description]
-
-Create 4-5 scenes total that honor their emotional journey."""
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt[:2000]  # Truncate for speed
-                            }
-                        ],
-                        max_tokens=800,
-                        temperature=0.7,
-                        timeout=20
-                    )
-                    
-                    result = response.choices[0].message.content.strip()
-                    print(f"Background thread: OpenAI API completed for session {session_id}")
-                    
-                    # Store the result in a global cache (in production, use Redis or database)
-                    if not hasattr(self, '_storyboard_cache'):
-                        self._storyboard_cache = {}
-                    self._storyboard_cache[session_id] = {
-                        'status': 'completed',
-                        'storyboard': result,
-                        'timestamp': time.time()
-                    }
-                    
-                except Exception as e:
-                    print(f"Background thread: OpenAI API failed for session {session_id}: {str(e)}")
-                    # Store fallback result
-                    if not hasattr(self, '_storyboard_cache'):
-                        self._storyboard_cache = {}
-                    self._storyboard_cache[session_id] = {
-                        'status': 'completed',
-                        'storyboard': self._create_fallback_storyboard(formatted_answers),
-                        'timestamp': time.time()
-                    }
-            
-            # Start the background thread
-            thread = threading.Thread(target=generate_storyboard_async)
-            thread.daemon = True
-            thread.start()
-            
-            # Initialize cache entry
-            if not hasattr(self, '_storyboard_cache'):
-                self._storyboard_cache = {}
-            self._storyboard_cache[session_id] = {
-                'status': 'generating',
-                'storyboard': None,
-                'timestamp': time.time()
-            }
-            
-            # Return immediately with generating status
-            return "STORYBOARD_GENERATING"
+            session_id = session_data.get('session_id', 'unknown')
+            cache_key = self._storyboard_cache_key(formatted_answers)
+            cached = self._get_cached_storyboard(session_id, cache_key)
+            if cached:
+                return cached
+            return self._start_storyboard_generation(session_id, prompt, [], cache_key)
             
         except Exception as e:
-            print(f"Error in generate_story_from_formatted_answers: {str(e)}")
-            return self._create_fallback_storyboard(formatted_answers)
+            print(f"Error in generate_story: {str(e)}")
+            return self._fallback_storyboard([])
     
     def get_storyboard_status(self, session_id: str) -> dict:
-        """Get the status of storyboard generation for a session"""
-        if not hasattr(self, '_storyboard_cache'):
-            return {'status': 'not_found'}
+        """
+        Get the status of storyboard generation for a session
         
-        if session_id not in self._storyboard_cache:
-            return {'status': 'not_found'}
+        The durable job record is authoritative: it covers jobs that were
+        queued by another worker or before a restart. While a job is pending
+        the entry carries its queue state and wait time.
+        """
+        entry = self._storyboard_cache.get(session_id)
+        if entry is not None and entry['status'] != 'generating':
+            return self._with_markdown(entry)
         
-        return self._storyboard_cache[session_id]
+        job_id = entry.get('job_id') if entry else None
+        job = self.jobs.get_job(job_id) if job_id else self.jobs.get_job_for_key(f"storyboard:{session_id}")
+        if (job is not None and not job_id and entry is not None and entry.get('cache_key')
+                and job.payload.get('cache_key') != entry['cache_key']):
+            # A job for earlier answers; this generation (a stream) isn't in the queue
+            job = None
+        if job is None:
+            return entry or {'status': 'not_found'}
+        
+        if job.status == JOB_DONE and job.result:
+            data = job.result.get('storyboard')
+            if isinstance(data, str):
+                # Finished before storyboards were stored structured
+                data = parse_storyboard(data).to_dict()
+            entry = {
+                'status': 'completed',
+                'storyboard_data': data,
+                'timestamp': job.finished_at
+            }
+            self._set_storyboard_status(session_id, entry)
+            return self._with_markdown(entry)
+        
+        status = {
+            'status': 'failed' if job.status == JOB_FAILED else 'generating',
+            'storyboard': None,
+            'timestamp': entry['timestamp'] if entry else job.created_at,
+            'job': job.to_dict()
+        }
+        if job.status == JOB_FAILED:
+            status['error'] = job.error
+        return status
+    
+    def _with_markdown(self, entry: Dict) -> Dict:
+        """Status entries hold the structured storyboard; add its markdown rendering for the UI"""
+        data = entry.get('storyboard_data')
+        if not data:
+            return entry
+        return dict(entry, storyboard=Storyboard.from_dict(data).to_markdown())
+    
+    def _set_storyboard_status(self, session_id: str, entry: Dict):
+        """Update a session's storyboard status and wake any long-poll waiters"""
+        self._storyboard_cache.set(session_id, entry)
+        with self._storyboard_waiters_lock:
+            waiter = self._storyboard_waiters.get(session_id)
+        if waiter is not None:
+            condition = waiter[0]
+            with condition:
+                condition.notify_all()
     
-    def generate_story_from_formatted_answers(self, formatted_answers: List[Dict]) -> str:
+    def wait_for_storyboard_status(self, session_id: str, timeout: float, recheck_interval: float = 1.0) -> dict:
+        """
+        Long-poll variant of get_storyboard_status
+        
+        Returns as soon as the session's status leaves 'generating' or the
+        timeout expires. Waiters park on a per-session condition that is
+        notified when this process updates the status; they also re-check
+        every recheck_interval seconds to catch jobs finished by another worker.
+        """
+        status = self.get_storyboard_status(session_id)
+        if status['status'] != 'generating' or timeout <= 0:
+            return status
+        
+        with self._storyboard_waiters_lock:
+            waiter = self._storyboard_waiters.setdefault(session_id, [threading.Condition(), 0])
+            waiter[1] += 1
+        
+        try:
+            deadline = time.time() + timeout
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                with waiter[0]:
+                    waiter[0].wait(min(remaining, recheck_interval))
+                status = self.get_storyboard_status(session_id)
+                if status['status'] != 'generating':
+                    break
+        finally:
+            with self._storyboard_waiters_lock:
+                waiter[1] -= 1
+                if waiter[1] == 0:
+                    self._storyboard_waiters.pop(session_id, None)
+        
+        return status
+    
+    def generate_story_from_formatted_answers(self, formatted_answers: List[Dict]) -> Union[str, Storyboard]:
         """
         Generate a visual storyboard based on properly formatted answers
+        
+        Returns the Storyboard when one is ready straight away (cached for
+        the same answers, or the fallback), otherwise "STORYBOARD_GENERATING"
+        while the job runs, or a message asking for the missing answers.
         """
         try:
             print(f"Starting story generation with {len(formatted_answers)} answers")
@@ -181,101 +287,12 @@ Create 4-5 scenes total that honor their emotional journey."""
             prompt = self._create_storyboard_prompt(formatted_text)
             print(f"Prompt length: {len(prompt)} characters")
             
-            # Start asynchronous storyboard generation
-            print("Starting asynchronous storyboard generation")
-            import threading
-            import time
-            
-            # Store the session ID for background processing
             session_id = formatted_answers[0].get('session_id', 'unknown')
-            
-            # Start background thread for OpenAI API call
-            def generate_storyboard_async():
-                try:
-                    print(f"Background thread: Starting OpenAI API call for session {session_id}")
-                    response = self._get_client().chat.completions.create(
-                        model="gpt-4o-mini",  # Faster model
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": """You are an empathetic interviewer and creative assistant. Your role is to:
-
-1. Create a safe, supportive space for users to share personal stories
-2. Ask thoughtful questions that encourage emotional depth
-3. Validate and acknowledge the user's experience throughout
-4. Collaborate on creative decisions rather than making them alone
-5. Maintain a compassionate, encouraging tone at all times
-
-Your tone should be:
-- Warm and understanding
-- Patient and non-judgmental  
-- Encouraging and supportive
-- Collaborative rather than directive
-
-When creating storyboards, honor the user's emotional journey and create visuals that respect their experience. Use ONLY their specific details and collaborate with them on creative decisions.
-
-Format storyboards as:
-
-**Storyboard: "[Title]" – [Subtitle]**
-
-**Scene 1: "[Scene Name]"**
-• **Visual**: [description]
-• **Setting**: [description]
-• **Mood**: [description]
-• **Sound**: [description]
-• **Transition**: [description]
-
-Create 4-5 scenes total that honor their emotional journey."""
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt[:2000]  # Truncate for speed
-                            }
-                        ],
-                        max_tokens=800,
-                        temperature=0.7,
-                        timeout=20
-                    )
-                    
-                    result = response.choices[0].message.content.strip()
-                    print(f"Background thread: OpenAI API completed for session {session_id}")
-                    
-                    # Store the result in a global cache (in production, use Redis or database)
-                    if not hasattr(self, '_storyboard_cache'):
-                        self._storyboard_cache = {}
-                    self._storyboard_cache[session_id] = {
-                        'status': 'completed',
-                        'storyboard': result,
-                        'timestamp': time.time()
-                    }
-                    
-                except Exception as e:
-                    print(f"Background thread: OpenAI API failed for session {session_id}: {str(e)}")
-                    # Store fallback result
-                    if not hasattr(self, '_storyboard_cache'):
-                        self._storyboard_cache = {}
-                    self._storyboard_cache[session_id] = {
-                        'status': 'completed',
-                        'storyboard': self._create_fallback_storyboard(formatted_answers),
-                        'timestamp': time.time()
-                    }
-            
-            # Start the background thread
-            thread = threading.Thread(target=generate_storyboard_async)
-            thread.daemon = True
-            thread.start()
-            
-            # Initialize cache entry
-            if not hasattr(self, '_storyboard_cache'):
-                self._storyboard_cache = {}
-            self._storyboard_cache[session_id] = {
-                'status': 'generating',
-                'storyboard': None,
-                'timestamp': time.time()
-            }
-            
-            # Return immediately with generating status
-            return "STORYBOARD_GENERATING"
+            cache_key = self._storyboard_cache_key(formatted_text)
+            cached = self._get_cached_storyboard(session_id, cache_key)
+            if cached:
+                return cached
+            return self._start_storyboard_generation(session_id, prompt, formatted_answers, cache_key)
             
         except Exception as e:
             error_msg = f"I apologize, but I encountered an error while generating your storyboard: {str(e)}"
@@ -284,7 +301,340 @@ Create 4-5 scenes total that honor their emotional journey."""
             import traceback
             traceback.print_exc()
             # Return fallback storyboard instead of error message
-            return self._create_fallback_storyboard(formatted_answers)
+            return self._fallback_storyboard(formatted_answers)
+    
+    def _storyboard_cache_key(self, formatted_text: str) -> str:
+        """Content hash of the answers text (whitespace-normalized), prompt version and model"""
+        normalized = ' '.join(formatted_text.split())
+        material = f"{STORYBOARD_PROMPT_VERSION}\n{STORYBOARD_MODEL}\n{normalized}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def _get_cached_storyboard(self, session_id: str, cache_key: str) -> Optional[Storyboard]:
+        """Return a previously generated storyboard for the same answers and mark the session completed"""
+        data = self._storyboard_results.get(cache_key)
+        if data is None:
+            return None
+        print(f"Storyboard cache hit for session {session_id}")
+        self._set_storyboard_status(session_id, {
+            'status': 'completed',
+            'storyboard_data': data,
+            'timestamp': time.time()
+        })
+        return Storyboard.from_dict(data)
+    
+    def _start_storyboard_generation(self, session_id: str, prompt: str, formatted_answers: List[Dict],
+                                     cache_key: str = None) -> Union[str, Storyboard]:
+        """
+        Queue a storyboard job on the shared executor and return immediately
+        
+        Requests for the same session and answers join the queued or running
+        job for them (found by its job key in the shared queue, so this holds
+        across workers and for the whole generation) instead of queueing
+        another.
+        While the OpenAI circuit breaker is open the fallback storyboard is
+        returned right away instead.
+        
+        Raises:
+            JobQueueFullError: If the job queue is at capacity
+        """
+        try:
+            self._openai_breaker.check()
+        except CircuitOpenError as e:
+            print(f"{str(e)}; using fallback storyboard for session {session_id}")
+            storyboard = self._fallback_storyboard(formatted_answers)
+            self._set_storyboard_status(session_id, {
+                'status': 'completed',
+                'storyboard_data': storyboard.to_dict(),
+                'timestamp': time.time()
+            })
+            return storyboard
+        
+        # Only closes the window between looking up the job and submitting it in this process
+        return self.single_flight.do(
+            f"storyboard:{session_id}:{cache_key}",
+            lambda: self._submit_storyboard_job(session_id, prompt, formatted_answers, cache_key)
+        )
+    
+    def _submit_storyboard_job(self, session_id: str, prompt: str, formatted_answers: List[Dict],
+                               cache_key: str = None) -> str:
+        job_key = f"storyboard:{session_id}"
+        # Mark as generating before the job is queued so a fast worker can't be overwritten
+        entry = {
+            'status': 'generating',
+            'storyboard_data': None,
+            'timestamp': time.time(),
+            'cache_key': cache_key
+        }
+        if not self._claim_storyboard_generation(session_id, cache_key, entry):
+            return "STORYBOARD_GENERATING"
+        
+        print("Starting asynchronous storyboard generation")
+        
+        try:
+            job = self.jobs.submit(
+                'storyboard',
+                {
+                    'session_id': session_id,
+                    'prompt': prompt,
+                    'formatted_answers': formatted_answers,
+                    'cache_key': cache_key
+                },
+                key=job_key
+            )
+        except Exception:
+            self._storyboard_cache.pop(session_id)
+            raise
+        
+        entry['job_id'] = job.job_id
+        
+        # Return immediately with generating status
+        return "STORYBOARD_GENERATING"
+    
+    def _claim_storyboard_generation(self, session_id: str, cache_key: str, entry: Dict) -> bool:
+        """
+        Record entry as the session's generation unless one is already running for the same answers
+        
+        A generation is running when a storyboard job for the session and
+        answers is queued or running in the shared queue, or when this
+        process is streaming or submitting one. Returns False (and tracks a
+        job queued by another worker, so status reads follow it) when the
+        caller should join that generation instead of calling OpenAI again.
+        """
+        with self._storyboard_start_lock:
+            current = self._storyboard_cache.get(session_id)
+            # Entries with a job_id are settled by the job's own status below
+            if (current is not None and current['status'] == 'generating'
+                    and current.get('cache_key') == cache_key and not current.get('job_id')):
+                print(f"Storyboard for session {session_id} already generating, joining it")
+                return False
+            
+            pending = self.jobs.get_job_for_key(f"storyboard:{session_id}")
+            if (pending is not None and pending.status in (JOB_QUEUED, JOB_RUNNING)
+                    and pending.payload.get('cache_key') == cache_key):
+                print(f"Storyboard for session {session_id} already generating, joining job {pending.job_id}")
+                self._set_storyboard_status(session_id, {
+                    'status': 'generating',
+                    'storyboard_data': None,
+                    'timestamp': pending.created_at,
+                    'cache_key': cache_key,
+                    'job_id': pending.job_id
+                })
+                return False
+            
+            self._set_storyboard_status(session_id, entry)
+            return True
+    
+    def _wait_for_completion_quota(self, prompt: str, max_tokens: int):
+        """
+        Block until the request and token budgets allow one more completion
+        
+        Tokens are estimated up front (about 4 characters per token, plus
+        the full max_tokens for the reply) since usage is only known afterwards.
+        
+        Raises:
+            RateLimitTimeout: If no slot frees up within OPENAI_RATE_WAIT_SECONDS
+        """
+        estimated_tokens = (len(STORYBOARD_SYSTEM_PROMPT) + len(prompt)) // 4 + max_tokens
+        self._request_limiter.acquire(timeout=self.completion_rate_wait)
+        self._token_limiter.acquire(estimated_tokens, timeout=self.completion_rate_wait)
+    
+    def _run_storyboard_job(self, payload: Dict) -> Dict:
+        """Job handler: call OpenAI for the storyboard, falling back to a template on failure"""
+        session_id = payload['session_id']
+        formatted_answers = payload.get('formatted_answers') or []
+        fallback = False
+        
+        try:
+            self._openai_breaker.check()
+            self._wait_for_completion_quota(payload['prompt'][:2000], STORYBOARD_MAX_TOKENS)
+            print(f"Storyboard job: Starting OpenAI API call for session {session_id}")
+            response = self._openai_breaker.call(
+                lambda: self._get_client().chat.completions.create(
+                    model=STORYBOARD_MODEL,  # Faster model
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": STORYBOARD_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": payload['prompt'][:2000]  # Truncate for speed
+                        }
+                    ],
+                    response_format=STORYBOARD_RESPONSE_FORMAT,
+                    max_tokens=STORYBOARD_MAX_TOKENS,
+                    temperature=0.7,
+                    timeout=20
+                ),
+                is_failure=_is_openai_outage
+            )
+            
+            storyboard = parse_storyboard_json(response.choices[0].message.content or '')
+            print(f"Storyboard job: OpenAI API completed for session {session_id}")
+            if payload.get('cache_key'):
+                self._storyboard_results.set(payload['cache_key'], storyboard.to_dict())
+            
+        except Exception as e:
+            print(f"Storyboard job: OpenAI API failed for session {session_id}: {str(e)}")
+            storyboard = self._fallback_storyboard(formatted_answers)
+            fallback = True
+        
+        # Store the result in the bounded status cache
+        data = storyboard.to_dict()
+        self._set_storyboard_status(session_id, {
+            'status': 'completed',
+            'storyboard_data': data,
+            'timestamp': time.time()
+        })
+        return {'storyboard': data, 'fallback': fallback}
+    
+    def stream_storyboard(self, formatted_answers: List[Dict]) -> Iterator[Tuple[str, Dict]]:
+        """
+        Generate a storyboard with a streamed completion
+        
+        Yields (event, data) pairs: 'scene' as soon as the model has
+        finished each scene object of the JSON storyboard, and a final
+        'done' with the whole storyboard (the fallback one on failure).
+        Scenes carry their fields and their markdown rendering.
+        """
+        session_id = formatted_answers[0].get('session_id', 'unknown')
+        formatted_text = self._format_formatted_answers_for_prompt(formatted_answers)
+        cache_key = self._storyboard_cache_key(formatted_text)
+        
+        cached = self._get_cached_storyboard(session_id, cache_key)
+        if cached:
+            # Same answers as before: replay the stored scenes without calling OpenAI
+            for index, scene in enumerate(cached.scenes, 1):
+                yield 'scene', self._scene_event(index, scene)
+            yield 'done', self._done_event(cached, False)
+            return
+        
+        prompt = self._create_storyboard_prompt(formatted_text)
+        
+        entry = {
+            'status': 'generating',
+            'storyboard_data': None,
+            'timestamp': time.time(),
+            'cache_key': cache_key
+        }
+        if not self._claim_storyboard_generation(session_id, cache_key, entry):
+            # A job or another stream is already generating these answers; don't pay twice
+            yield from self._replay_storyboard_generation(session_id, formatted_answers)
+            return
+        
+        completed = False
+        try:
+            yield from self._stream_storyboard_completion(session_id, prompt, formatted_answers, cache_key)
+            completed = True
+        finally:
+            if not completed:
+                self._abandon_storyboard_stream(session_id, entry)
+    
+    def _stream_storyboard_completion(self, session_id: str, prompt: str, formatted_answers: List[Dict],
+                                      cache_key: str) -> Iterator[Tuple[str, Dict]]:
+        scanner = JsonSceneScanner()
+        fallback = False
+        # Breaker outcome is decided by the time to the first token, or the error before it
+        call_started = None
+        outcome_recorded = False
+        
+        try:
+            self._openai_breaker.check()
+            self._wait_for_completion_quota(prompt[:2000], STORYBOARD_MAX_TOKENS)
+            print(f"Streaming storyboard for session {session_id}")
+            self._openai_breaker.before_call()
+            call_started = time.monotonic()
+            stream = self._get_client().chat.completions.create(
+                model=STORYBOARD_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": STORYBOARD_SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt[:2000]
+                    }
+                ],
+                response_format=STORYBOARD_RESPONSE_FORMAT,
+                max_tokens=STORYBOARD_MAX_TOKENS,
+                temperature=0.7,
+                timeout=20,
+                stream=True
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                
+                if not outcome_recorded:
+                    self._openai_breaker.record_success(time.monotonic() - call_started)
+                    outcome_recorded = True
+                
+                for scene in scanner.feed(delta):
+                    yield 'scene', self._scene_event(len(scanner.scenes), scene)
+            
+            storyboard = parse_storyboard_json(scanner.text)
+            self._storyboard_results.set(cache_key, storyboard.to_dict())
+            
+        except Exception as e:
+            print(f"Storyboard stream failed for session {session_id}: {str(e)}")
+            if call_started is not None and not outcome_recorded:
+                if _is_openai_outage(e):
+                    self._openai_breaker.record_failure(time.monotonic() - call_started)
+                else:
+                    self._openai_breaker.cancel()
+                outcome_recorded = True
+            storyboard = self._fallback_storyboard(formatted_answers)
+            fallback = True
+        finally:
+            if call_started is not None and not outcome_recorded:
+                # Client disconnected before the first token
+                self._openai_breaker.cancel()
+        
+        self._set_storyboard_status(session_id, {
+            'status': 'completed',
+            'storyboard_data': storyboard.to_dict(),
+            'timestamp': time.time()
+        })
+        yield 'done', self._done_event(storyboard, fallback)
+    
+    def _replay_storyboard_generation(self, session_id: str,
+                                      formatted_answers: List[Dict]) -> Iterator[Tuple[str, Dict]]:
+        """Wait for the generation already running for the session and stream its scenes"""
+        status = self.wait_for_storyboard_status(session_id, STORYBOARD_STREAM_JOIN_SECONDS)
+        if status['status'] == 'completed' and status.get('storyboard_data'):
+            storyboard = Storyboard.from_dict(status['storyboard_data'])
+            fallback = False
+        else:
+            print(f"Storyboard for session {session_id} not ready after joining it; using fallback")
+            storyboard = self._fallback_storyboard(formatted_answers)
+            fallback = True
+        for index, scene in enumerate(storyboard.scenes, 1):
+            yield 'scene', self._scene_event(index, scene)
+        yield 'done', self._done_event(storyboard, fallback)
+    
+    def _abandon_storyboard_stream(self, session_id: str, entry: Dict):
+        """Mark a stream closed before it finished as failed, so status waiters stop waiting on it"""
+        with self._storyboard_start_lock:
+            if self._storyboard_cache.get(session_id) is not entry:
+                return
+            print(f"Storyboard stream for session {session_id} closed before it finished")
+            self._set_storyboard_status(session_id, {
+                'status': 'failed',
+                'storyboard_data': None,
+                'error': 'Storyboard stream closed before it finished',
+                'timestamp': time.time()
+            })
+    
+    def _scene_event(self, index: int, scene: Scene) -> Dict:
+        return {'index': index, 'text': scene.to_markdown(), 'scene': asdict(scene)}
+    
+    def _done_event(self, storyboard: Storyboard, fallback: bool) -> Dict:
+        return {'storyboard': storyboard.to_markdown(), 'storyboard_data': storyboard.to_dict(), 'fallback': fallback}
     
     def _format_answers_for_prompt(self, answers: List[Dict]) -> str:
         """Format answers for the story generation prompt"""
@@ -350,53 +700,19 @@ I will create a storyboard that:
 - Honor both the difficulty and the growth in their journey
 
 **Format Requirements:**
-
-**Storyboard: "[Title]" – [Subtitle]**
-
-**Scene 1: "[Scene Name]"**
-• **Visual**: [Detailed visual description based on their answer]
-• **Setting**: [Location and environment details from their story]
-• **Mood**: [Emotional tone and atmosphere from their experience]
-• **Sound**: [Audio suggestions relevant to their scene]
-• **Transition**: [How this scene connects to the next]
-
-**Scene 2: "[Scene Name]"**
-• **Visual**: [Detailed visual description based on their answer]
-• **Action**: [Key actions and movements from their story]
-• **Mood**: [Emotional tone and atmosphere from their experience]
-• **Sound**: [Audio suggestions relevant to their scene]
-• **Transition**: [How this scene connects to the next]
-
-**Scene 3: "[Scene Name]"**
-• **Visual**: [Detailed visual description based on their answer]
-• **Setting**: [Location and environment details from their story]
-• **Mood**: [Emotional tone and atmosphere from their experience]
-• **Sound**: [Audio suggestions relevant to their scene]
-• **Transition**: [How this scene connects to the next]
-
-**Scene 4: "[Scene Name]"**
-• **Visual**: [Detailed visual description based on their answer]
-• **Action**: [Key actions and movements from their story]
-• **Mood**: [Emotional tone and atmosphere from their experience]
-• **Sound**: [Audio suggestions relevant to their scene]
-• **Transition**: [How this scene connects to the next]
-
-**Scene 5: "[Scene Name]"**
-• **Visual**: [Detailed visual description based on their answer]
-• **Setting**: [Location and environment details from their story]
-• **Mood**: [Emotional tone and atmosphere from their experience]
-• **Sound**: [Audio suggestions relevant to their scene]
-• **Transition**: [How this scene connects to the next]
-
-**Scene 6: "[Scene Name]"**
-• **Visual**: [Detailed visual description based on their answer]
-• **Action**: [Key actions and movements from their story]
-• **Mood**: [Emotional tone and atmosphere from their experience]
-• **Sound**: [Audio suggestions relevant to their scene]
-• **Transition**: [Conclusion or final transition]
+Return a JSON object with:
+- "title": A short title for their story
+- "subtitle": A few words on what the story is about
+- "scenes": 4-6 scenes in story order, each with:
+  - "name": The scene name
+  - "visual": Detailed visual description based on their answer
+  - "setting": Location and environment details from their story ("" if the scene focuses on action)
+  - "action": Key actions and movements from their story ("" if the scene focuses on setting)
+  - "mood": Emotional tone and atmosphere from their experience
+  - "sound": Audio suggestions relevant to their scene
+  - "transition": How this scene connects to the next (the last scene's is the conclusion)
 
 **Creative Collaboration Approach:**
-- Use bullet points (•) for each element
 - Keep descriptions vivid but respectful
 - Focus on visual storytelling that honors their specific experience
 - Include authentic details from their story
@@ -409,89 +725,75 @@ I will create a storyboard that:
 - Each scene should have Visual, Setting/Action, Mood, Sound, and Transition
 - Use ONLY the person's specific experience details from their answers
 - Make it visually compelling and emotionally resonant based on their real story
-- Format exactly as shown above with proper spacing and bullet points
+- Fill in every field exactly as described above
 - Honor their courage in sharing this story by creating something beautiful and meaningful
 """
 
-    def generate_scene_images(self, storyboard: str) -> List[str]:
-        """Generate images for each scene in the storyboard using DALL-E 3"""
+    def generate_scene_images(self, storyboard: Union[str, Storyboard]) -> List[Optional[str]]:
+        """
+        Generate images for each scene in the storyboard using DALL-E 3
+        
+        Pass the session's parsed Storyboard where there is one; raw text is
+        parsed here.
+        
+        Scenes render concurrently on a bounded pool, each waiting for a slot
+        in the images-per-minute token bucket. URLs come back in scene order;
+        a scene whose image failed is None so the others are kept.
+        """
         try:
-            scenes = self._extract_scenes_from_storyboard(storyboard)
+            if not isinstance(storyboard, Storyboard):
+                storyboard = parse_storyboard(storyboard)
+            scenes = storyboard.scenes
+            futures = [self._image_pool.submit(self._generate_scene_image, scene) for scene in scenes]
+            
             image_urls = []
+            errors = []
+            for index, future in enumerate(futures, 1):
+                try:
+                    image_urls.append(future.result())
+                except Exception as e:
+                    print(f"DALL-E 3 image for scene {index} failed: {str(e)}")
+                    errors.append(e)
+                    image_urls.append(None)
             
-            for scene in scenes:
-                image_prompt = self._create_image_prompt(scene)
-                
-                response = self._get_client().images.generate(
-                    model="dall-e-3",
-                    prompt=image_prompt,
-                    size="1024x1024",
-                    quality="standard",
-                    n=1
-                )
-                
-                image_url = response.data[0].url
-                image_urls.append(image_url)
-                
-                # Small delay to avoid rate limiting
-                time.sleep(1)
+            if scenes and len(errors) == len(scenes):
+                raise errors[0]
             
             return image_urls
             
         except Exception as e:
             raise Exception(f"DALL-E 3 image generation error: {str(e)}")
-
-    def _extract_scenes_from_storyboard(self, storyboard: str) -> List[Dict[str, str]]:
-        """Extract scene information from storyboard text"""
-        scenes = []
-        
-        # Split by scene markers
-        scene_parts = storyboard.split('**Scene ')
+    
+    def _generate_scene_image(self, scene: Scene) -> str:
+        image_prompt = self._create_image_prompt(scene)
+        self._image_limiter.acquire(timeout=self.image_rate_wait)
         
-        for part in scene_parts[1:]:  # Skip the first part (title)
-            scene_info = {}
-            
-            # Extract scene name
-            scene_name_match = re.search(r'(\d+): "([^"]+)"', part)
-            if scene_name_match:
-                scene_info['number'] = scene_name_match.group(1)
-                scene_info['name'] = scene_name_match.group(2)
-            
-            # Extract visual description
-            visual_match = re.search(r'• \*\*Visual\*\*: ([^\n]+)', part)
-            if visual_match:
-                scene_info['visual'] = visual_match.group(1)
-            
-            # Extract setting
-            setting_match = re.search(r'• \*\*Setting\*\*: ([^\n]+)', part)
-            if setting_match:
-                scene_info['setting'] = setting_match.group(1)
-            
-            # Extract mood
-            mood_match = re.search(r'• \*\*Mood\*\*: ([^\n]+)', part)
-            if mood_match:
-                scene_info['mood'] = mood_match.group(1)
-            
-            if scene_info:
-                scenes.append(scene_info)
+        response = self._get_client().images.generate(
+            model="dall-e-3",
+            prompt=image_prompt,
+            size="1024x1024",
+            quality="standard",
+            n=1,
+            timeout=60
+        )
         
-        return scenes
+        return response.data[0].url
 
-    def _create_image_prompt(self, scene: Dict[str, str]) -> str:
+    def _create_image_prompt(self, scene: Scene) -> str:
         """Create a detailed prompt for DALL-E 3 image generation"""
         prompt_parts = []
         
         # Base visual description
-        if 'visual' in scene:
-            prompt_parts.append(scene['visual'])
+        if scene.visual:
+            prompt_parts.append(scene.visual)
         
         # Add setting context
-        if 'setting' in scene:
-            prompt_parts.append(f"Setting: {scene['setting']}")
+        if scene.setting:
+            prompt_parts.append(f"Setting: {scene.setting}")
         
         # Add mood and atmosphere
-        if 'mood' in scene:
-            prompt_parts.append(f"Mood: {scene['mood']}")
+        if scene.mood:
+            prompt_parts.append(f"Mood: {scene.mood}")
         
         # Add cinematic style
         prompt_parts.append("Cinematic style, high quality, detailed, professional photography")
@@ -501,27 +803,49 @@ I will create a storyboard that:
         
         return full_prompt
 
-    def generate_video_from_storyboard(self, storyboard: str) -> str:
-        """Generate a video from a storyboard using VideoGen API"""
+    def generate_video_from_storyboard(self, storyboard: Union[str, Storyboard], session_id: str = None) -> str:
+        """
+        Generate a video from a storyboard using VideoGen API
+        
+        Concurrent calls for the same session and storyboard (double-clicks,
+        parallel tabs) share one render, as do calls arriving within
+        VIDEO_SINGLE_FLIGHT_SHARE_SECONDS after it was submitted.
+        """
         try:
             if not storyboard:
                 raise Exception("No storyboard provided for video generation")
             
             print(f"Starting video generation from storyboard...")
-            print(f"Storyboard length: {len(storyboard)} characters")
+            if isinstance(storyboard, Storyboard):
+                print(f"Storyboard has {len(storyboard.scenes)} scenes")
+                fingerprint = json.dumps(storyboard.to_dict(), sort_keys=True)
+            else:
+                print(f"Storyboard length: {len(storyboard)} characters")
+                fingerprint = storyboard
             
             # Use VideoGen service to generate video from storyboard
-            video_url = self.videogen_service.generate_video_from_storyboard(storyboard)
+            storyboard_hash = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+            video_url = self.single_flight.do(
+                f"video:{session_id or ''}:{storyboard_hash}",
+                lambda: self.videogen_service.generate_video_from_storyboard(storyboard),
+                share_for=self.video_share_seconds
+            )
             
             print(f"Video generation completed successfully: {video_url}")
             return video_url
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Video generation error in OpenAI service: {str(e)}")
             raise Exception(f"Video generation error: {str(e)}")
     
-    def generate_video_from_script(self, script: str) -> str:
-        """Generate a video from a text script using VideoGen API"""
+    def generate_video_from_script(self, script: str, max_wait_time: int = 300) -> str:
+        """
+        Generate a video from a text script using VideoGen API and block until it is rendered
+        
+        Prefer start_video_from_script(), which doesn't hold a worker for the whole render.
+        """
         try:
             if not script:
                 raise Exception("No script provided for video generation")
@@ -530,13 +854,34 @@ I will create a storyboard that:
             api_file_id = self.videogen_service.generate_video_from_script(script)
             
             # Wait for completion and get the final video URL
-            result = self.videogen_service.wait_for_video_completion(api_file_id)
+            result = self.videogen_service.wait_for_video_completion(api_file_id, max_wait_time=max_wait_time)
             
             return result.get('apiFileSignedUrl')
             
         except Exception as e:
             raise Exception(f"Video generation error: {str(e)}")
     
+    def start_video_from_script(self, script: str):
+        """
+        Queue a script-to-video render and return its job immediately
+        
+        The job only submits the render; completion is tracked by polling
+        the returned apiFileId, so no worker waits on the render itself.
+        """
+        if not script:
+            raise Exception("No script provided for video generation")
+        return self.jobs.submit('video', {'script': script})
+    
+    def _run_video_job(self, payload: Dict) -> Dict:
+        """Job handler: submit the render to VideoGen"""
+        try:
+            api_file_id = self.videogen_service.generate_video_from_script(payload['script'])
+            return {'api_file_id': api_file_id}
+        except Exception as e:
+            # Not retried: a repeated script-to-video call would start a second paid render
+            print(f"Video job failed: {str(e)}")
+            return {'api_file_id': None, 'error': str(e)}
+    
     def generate_video_from_images(self, image_urls: List[str]) -> str:
         """Generate a video from DALL-E 3 images using free AI video generation"""
         try:
@@ -612,6 +957,10 @@ I will create a storyboard that:
         except Exception as e:
             raise Exception(f"Pika Labs error: {str(e)}")
     
+    def _fallback_storyboard(self, formatted_answers: List[Dict]) -> Storyboard:
+        """The fallback storyboard in structured form"""
+        return parse_storyboard(self._create_fallback_storyboard(formatted_answers))
+    
     def _create_fallback_storyboard(self, formatted_answers: List[Dict]) -> str:
         """Create a simple fallback storyboard when OpenAI fails"""
         try:
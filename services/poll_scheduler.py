@@ -0,0 +1,180 @@
+import bisect
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from .bounded_cache import BoundedCache
+
+
+class RenderTimeEstimator:
+    """
+    Learns how long VideoGen renders take, per script-length bucket.
+
+    A render is registered when it is submitted and its duration recorded
+    when it is seen FULFILLED. The last `window` durations of each bucket
+    give a rolling p50/p90, which is the window in which polling is worth
+    doing densely. Buckets with too few samples fall back to all samples.
+    """
+    def __init__(self, bucket_edges=(50, 100, 150), window: int = 50, min_samples: int = 3,
+                 max_tracked: int = 5000):
+        self.bucket_edges = tuple(bucket_edges)
+        self.window = window
+        self.min_samples = min_samples
+        self._durations = {bucket: deque(maxlen=window) for bucket in range(len(self.bucket_edges) + 1)}
+        self._renders = BoundedCache(max_entries=max_tracked, ttl_seconds=3600, name='render_starts')
+        self._lock = threading.Lock()
+
+    def _bucket(self, script_words: Optional[int]) -> Optional[int]:
+        if script_words is None:
+            return None
+        return bisect.bisect_left(self.bucket_edges, script_words)
+
+    def started(self, api_file_id: str, script_words: int, started_at: Optional[float] = None) -> None:
+        """Remember when a render was submitted and how long its script was"""
+        self._renders.set(api_file_id, (started_at or time.time(), script_words))
+
+    def started_at(self, api_file_id: str) -> Optional[float]:
+        render = self._renders.get(api_file_id)
+        return render[0] if render else None
+
+    def finished(self, api_file_id: str, finished_at: Optional[float] = None) -> Optional[float]:
+        """Record the duration of a fulfilled render; unknown or already-recorded ids are ignored"""
+        render = self._renders.pop(api_file_id)
+        if render is None:
+            return None
+        started_at, script_words = render
+        duration = (finished_at or time.time()) - started_at
+        with self._lock:
+            self._durations[self._bucket(script_words)].append(duration)
+        return duration
+
+    def expected_window(self, api_file_id: str) -> Optional[Tuple[float, float]]:
+        """(p50, p90) render duration in seconds for this render's bucket, or None until enough samples exist"""
+        render = self._renders.get(api_file_id)
+        bucket = self._bucket(render[1]) if render else None
+        with self._lock:
+            samples = list(self._durations[bucket]) if bucket is not None else []
+            if len(samples) < self.min_samples:
+                samples = [d for durations in self._durations.values() for d in durations]
+        if len(samples) < self.min_samples:
+            return None
+        samples.sort()
+        return _percentile(samples, 0.5), _percentile(samples, 0.9)
+
+    def eta(self, api_file_id: str, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the render is expected to finish (p50, then p90 once p50 has passed)"""
+        started_at = self.started_at(api_file_id)
+        window = self.expected_window(api_file_id)
+        if started_at is None or window is None:
+            return None
+        elapsed = (now or time.time()) - started_at
+        p50, p90 = window
+        remaining = p50 - elapsed if elapsed < p50 else p90 - elapsed
+        return round(max(0.0, remaining), 1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            buckets = {}
+            lower = 0
+            for bucket, durations in self._durations.items():
+                upper = self.bucket_edges[bucket] if bucket < len(self.bucket_edges) else None
+                label = f"{lower}-{upper}" if upper is not None else f"{lower}+"
+                samples = sorted(durations)
+                buckets[label] = {
+                    'samples': len(samples),
+                    'p50_seconds': round(_percentile(samples, 0.5), 1) if samples else None,
+                    'p90_seconds': round(_percentile(samples, 0.9), 1) if samples else None
+                }
+                lower = (upper or 0) + 1
+        return {'tracked': len(self._renders), 'buckets': buckets}
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class PollScheduler:
+    """
+    Decides how long to wait before the next status poll of a render.
+
+    Without a duration estimate it starts fast and backs off exponentially.
+    With one it sleeps until shortly before the expected p50 and polls every
+    dense_interval until the p90 has passed, then backs off again. Every
+    delay gets +/- jitter so renders submitted together don't poll in step,
+    and a Retry-After from the API is never undercut.
+    """
+    def __init__(self, initial_interval: float = 1.0, max_interval: float = 15.0,
+                 backoff_factor: float = 1.6, dense_interval: float = 2.0, jitter: float = 0.2):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.dense_interval = dense_interval
+        self.jitter = jitter
+
+    def next_delay(self, elapsed: float, attempt: int, expected: Optional[Tuple[float, float]] = None,
+                   retry_after: Optional[float] = None) -> float:
+        """
+        Args:
+            elapsed (float): Seconds since the render was submitted
+            attempt (int): Number of polls made so far
+            expected (tuple): (p50, p90) render duration, if known
+            retry_after (float): Retry-After sent with the last response, if any
+
+        Returns:
+            float: Seconds to wait before polling again
+        """
+        delay = min(self.max_interval, self.initial_interval * (self.backoff_factor ** attempt))
+        if expected and attempt > 0:
+            p50, p90 = expected
+            window_start = p50 - self.dense_interval
+            if elapsed < window_start:
+                delay = min(self.max_interval, max(self.dense_interval, window_start - elapsed))
+            elif elapsed <= p90:
+                delay = self.dense_interval
+            else:
+                # Overdue: back off from the dense interval
+                overdue_polls = (elapsed - p90) / self.dense_interval
+                delay = min(self.max_interval, self.dense_interval * (self.backoff_factor ** overdue_polls))
+
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def stats(self) -> Dict:
+        return {
+            'initial_interval_seconds': self.initial_interval,
+            'max_interval_seconds': self.max_interval,
+            'dense_interval_seconds': self.dense_interval,
+            'backoff_factor': self.backoff_factor,
+            'jitter': self.jitter
+        }
+
+
+def create_poll_scheduler() -> PollScheduler:
+    return PollScheduler(
+        initial_interval=float(os.getenv('VIDEO_POLL_INITIAL_SECONDS', '1')),
+        max_interval=float(os.getenv('VIDEO_POLL_MAX_SECONDS', '15')),
+        backoff_factor=float(os.getenv('VIDEO_POLL_BACKOFF_FACTOR', '1.6')),
+        dense_interval=float(os.getenv('VIDEO_POLL_DENSE_SECONDS', '2')),
+        jitter=float(os.getenv('VIDEO_POLL_JITTER', '0.2'))
+    )
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_render_time_estimator() -> RenderTimeEstimator:
+    """Return the process-wide render duration estimator, creating it on first use"""
+    global _estimator
+    if _estimator is None:
+        with _estimator_lock:
+            if _estimator is None:
+                _estimator = RenderTimeEstimator(window=int(os.getenv('VIDEO_ETA_WINDOW', '50')))
+    return _estimator
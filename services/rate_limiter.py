@@ -0,0 +1,192 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, buckets stay per process
+    fcntl = None
+
+# Shared bucket state: available tokens and the wall-clock time of the last refill
+_SHARED_STATE = struct.Struct('dd')
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a rate limiter slot doesn't free up within the caller's timeout"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for an upstream quota such as images per minute.
+
+    The bucket refills continuously at rate_per_minute / 60 tokens per second
+    up to `capacity` (the allowed burst). acquire() blocks until a token is
+    available, so callers queue for quota instead of getting 429s upstream.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, name: str = 'bucket'):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.timeouts = 0
+
+    def _take(self, tokens: float) -> float:
+        """Take tokens if available; otherwise return how long until they will be"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _available(self) -> float:
+        with self._lock:
+            return min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> None:
+        """
+        Take tokens from the bucket, waiting for a refill if needed
+
+        Requests larger than the bucket are clamped to its capacity.
+
+        Raises:
+            RateLimitTimeout: If the tokens aren't available within timeout seconds
+        """
+        tokens = min(tokens, self.capacity)
+        start = time.monotonic()
+        while True:
+            wait = self._take(tokens)
+            now = time.monotonic()
+            if wait <= 0:
+                with self._lock:
+                    self.acquired += 1
+                    self.waited_seconds += now - start
+                return
+            if timeout is not None and now + wait > start + timeout:
+                with self._lock:
+                    self.timeouts += 1
+                raise RateLimitTimeout(f"Rate limit '{self.name}' has no capacity within {timeout} seconds")
+            time.sleep(wait)
+
+    def stats(self) -> Dict:
+        available = self._available()
+        with self._lock:
+            return {
+                'name': self.name,
+                'shared': False,
+                'rate_per_minute': round(self.rate * 60, 2),
+                'capacity': self.capacity,
+                'available': round(available, 2),
+                'acquired': self.acquired,
+                'waited_seconds': round(self.waited_seconds, 2),
+                'timeouts': self.timeouts
+            }
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a small memory-mapped file.
+
+    Every worker process on the host maps the same file (in /dev/shm where
+    available) and updates it under an flock, so gunicorn workers draw on
+    one quota instead of each assuming it has the whole of it. The thread
+    lock is still needed: flock doesn't exclude threads sharing a descriptor.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, name: str = 'bucket',
+                 directory: Optional[str] = None):
+        super().__init__(rate_per_minute, capacity, name)
+        self.path = os.path.join(directory or _default_directory(), f"storycatcher-ratelimit-{name}")
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < _SHARED_STATE.size:
+            os.ftruncate(self._fd, _SHARED_STATE.size)
+        self._map = mmap.mmap(self._fd, _SHARED_STATE.size)
+
+    def _locked_refill(self, now: float) -> float:
+        tokens, updated = _SHARED_STATE.unpack_from(self._map, 0)
+        if updated == 0:
+            # First user of a fresh file starts with a full bucket
+            return self.capacity
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def _take(self, tokens: float) -> float:
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                available = self._locked_refill(now)
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+                _SHARED_STATE.pack_into(self._map, 0, available, now)
+                return wait
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _available(self) -> float:
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                return self._locked_refill(time.time())
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats['shared'] = True
+        return stats
+
+
+def _default_directory() -> str:
+    configured = os.getenv('RATE_LIMIT_DIR')
+    if configured:
+        return configured
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate_per_minute: float, capacity: Optional[float] = None) -> TokenBucket:
+    """
+    Return the process-wide bucket for a named quota, creating it on first use
+
+    RATE_LIMIT_BACKEND=shared (the default) shares each bucket between the
+    worker processes on this host; 'memory' keeps one bucket per process.
+    """
+    bucket = _buckets.get(name)
+    if bucket is not None:
+        return bucket
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            backend = os.getenv('RATE_LIMIT_BACKEND', 'shared').lower()
+            if backend == 'shared' and fcntl is not None:
+                try:
+                    bucket = SharedTokenBucket(rate_per_minute, capacity, name)
+                except OSError as e:
+                    print(f"Shared rate limiter '{name}' unavailable ({e}), using a per-process bucket")
+            elif backend not in ('shared', 'memory'):
+                raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+            if bucket is None:
+                bucket = TokenBucket(rate_per_minute, capacity, name)
+            _buckets[name] = bucket
+    return bucket
+
+
+def get_rate_limit_stats():
+    with _buckets_lock:
+        buckets = list(_buckets.values())
+    return [bucket.stats() for bucket in buckets]
@@ -0,0 +1,78 @@
+import threading
+from typing import Any, Callable, Dict
+from .bounded_cache import BoundedCache
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block until it finishes and get the same result (or the
+    same exception). With share_for > 0 a successful result is also handed
+    to callers arriving within that many seconds after it finished, which
+    covers double-clicks that land just after the first request returned.
+    """
+    def __init__(self, name: str = 'single_flight', max_recent: int = 1000):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._recent = BoundedCache(max_entries=max_recent, name=f'{name}_recent')
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any], share_for: float = 0) -> Any:
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None:
+                self.shared += 1
+                return recent[0]
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            if share_for > 0:
+                self._recent.set(key, (call.result,), ttl_seconds=share_for)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            if call.waiters:
+                print(f"{self.name}: {call.waiters} concurrent call(s) shared the result for {key}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            'name': self.name,
+            'in_flight': in_flight,
+            'executions': self.executions,
+            'shared': self.shared
+        }
@@ -1,42 +1,508 @@
 from models.story_models import StorySession, Question, Answer
+from models.storyboard_models import Storyboard
+from .bounded_cache import BoundedCache
+from .keyword_classifier import ANSWER_CLASSIFIERS, STORY_CATEGORIES
+from .storyboard_parser import parse_storyboard
+from .supabase_client import get_supabase_client
+from abc import ABC, abstractmethod
 from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
 import uuid
 
-class StoryService:
+# PostgREST errors for a story_submissions table without the unique session_id
+# column: unknown column (schema cache / Postgres) and no unique key for ON CONFLICT
+SUPABASE_SCHEMA_ERROR_CODES = ('PGRST204', '42703', '42P10')
+
+
+def _json_default(value):
+    """JSON encoder hook for the datetimes inside StorySession.to_dict()"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def serialize_session(session: StorySession) -> str:
+    return json.dumps(session.to_dict(), default=_json_default)
+
+
+def deserialize_session(raw) -> StorySession:
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    return StorySession.from_dict(json.loads(raw))
+
+
+class SessionConflictError(Exception):
+    """Raised when a session was changed by someone else since it was read"""
+    pass
+
+
+def _may_overwrite(stored_version: Optional[int], expected_version: int) -> bool:
+    """Compare-and-set check: stored_version is None when nothing is stored under the id"""
+    if stored_version is None:
+        return expected_version == 0
+    return stored_version == expected_version
+
+
+class SessionStore(ABC):
+    """
+    Storage backend interface for story sessions.
+
+    StoryService only talks to this interface, so sessions can live outside
+    the worker process and any gunicorn worker can serve any request.
+
+    save() is a compare-and-set on StorySession.version: it only writes when
+    the stored copy still has the version the session was read with, bumps
+    the version, and raises SessionConflictError otherwise. A session with
+    version 0 is new and is only written if nothing is stored under its id.
+    """
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[StorySession]:
+        pass
+    
+    @abstractmethod
+    def save(self, session: StorySession) -> None:
+        pass
+    
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        pass
+    
+    def exists(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local stand-in, only suitable for a single worker or local development.
+    Sessions are held in a BoundedCache so idle sessions are evicted instead of
+    growing the worker's memory forever. They are stored serialized, so every
+    get() returns a private copy and concurrent writers are caught by save().
+    """
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: int = 86400):
+        self._sessions = BoundedCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl_seconds=ttl_seconds,
+            name='sessions'
+        )
+        self._lock = threading.Lock()
+    
+    def get(self, session_id: str) -> Optional[StorySession]:
+        raw = self._sessions.get(session_id)
+        if raw is None:
+            return None
+        return deserialize_session(raw)
+    
+    def save(self, session: StorySession) -> None:
+        with self._lock:
+            raw = self._sessions.get(session.session_id)
+            stored_version = deserialize_session(raw).version if raw is not None else None
+            if not _may_overwrite(stored_version, session.version):
+                raise SessionConflictError(f"Session {session.session_id} was modified concurrently")
+            session.version += 1
+            self._sessions.set(session.session_id, serialize_session(session))
+    
+    def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id)
+    
+    def exists(self, session_id: str) -> bool:
+        return session_id in self._sessions
+    
+    def stats(self) -> dict:
+        return self._sessions.stats()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store backed by any Redis-protocol server (Redis, Valkey, KeyDB, ...).
+    Sessions are stored as JSON and expire after ttl_seconds of inactivity.
+    Saves use WATCH/MULTI so a write based on a stale read is rejected.
+    """
+    def __init__(self, url: str, ttl_seconds: int = 86400, key_prefix: str = 'storycatcher:session:'):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("SESSION_STORE=redis requires the 'redis' package to be installed")
+        self.client = redis.Redis.from_url(url)
+        self.watch_error = redis.WatchError
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+    
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+    
+    def get(self, session_id: str) -> Optional[StorySession]:
+        raw = self.client.get(self._key(session_id))
+        if raw is None:
+            return None
+        return deserialize_session(raw)
+    
+    def save(self, session: StorySession) -> None:
+        key = self._key(session.session_id)
+        expected_version = session.version
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                raw = pipe.get(key)
+                stored_version = deserialize_session(raw).version if raw is not None else None
+                if not _may_overwrite(stored_version, expected_version):
+                    raise SessionConflictError(f"Session {session.session_id} was modified concurrently")
+                session.version = expected_version + 1
+                pipe.multi()
+                pipe.set(key, serialize_session(session), ex=self.ttl_seconds)
+                pipe.execute()
+            except self.watch_error:
+                session.version = expected_version
+                raise SessionConflictError(f"Session {session.session_id} was modified concurrently")
+    
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+    
+    def exists(self, session_id: str) -> bool:
+        return bool(self.client.exists(self._key(session_id)))
+
+
+class _WriteBatch:
+    """A group of session writes committed in one SQLite transaction"""
     def __init__(self):
-        # In-memory storage for demo purposes
-        # In production, you'd use a database
-        self.sessions = {}
-        self.questions = self._initialize_questions()
-    
-    def _initialize_questions(self):
-        """Initialize the dynamic story questions"""
-        return [
-            Question(
-                id=1,
-                text="What was the life-changing moment you experienced?",
-                category="core_experience",
-                order=1
-            ),
-            Question(
-                id=2,
-                text="",  # Will be dynamically generated
-                category="contextual_setup",
-                order=2
-            ),
-            Question(
-                id=3,
-                text="",  # Will be dynamically generated
-                category="contextual_aftermath",
-                order=3
-            ),
-            Question(
-                id=4,
-                text="",  # Will be dynamically generated
-                category="contextual_transformation",
-                order=4
-            )
-        ]
+        self.done = threading.Event()
+        self.error = None
+
+
+class _Write:
+    """One queued session write; data None means delete"""
+    def __init__(self, session_id: str, data: Optional[str], version: int = 0):
+        self.session_id = session_id
+        self.data = data
+        self.version = version  # Version being written; the stored row must be at version - 1
+        self.conflict = False
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Persistent single-node session store on SQLite in WAL mode.
+
+    Reads use a per-thread connection and an indexed primary-key lookup.
+    Writes are group-committed: concurrent save() calls are collected by a
+    background writer thread and flushed in a single transaction, and each
+    caller returns once its batch is durable. Each write in the batch is
+    conditional on the row's version, so a stale write is rejected on its
+    own without failing the rest of the batch. The same thread sweeps rows
+    whose TTL has expired.
+    """
+    def __init__(self, path: str, ttl_seconds: int = 86400, sweep_interval: int = 60,
+                 batch_window: float = 0.005, write_timeout: float = 10.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self.batch_window = batch_window
+        self.write_timeout = write_timeout
+        
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._batch = _WriteBatch()
+        
+        self._initialize_schema()
+        
+        self._writer = threading.Thread(target=self._writer_loop, name='session-store-writer', daemon=True)
+        self._writer.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        return conn
+    
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+    
+    def _initialize_schema(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS story_sessions ('
+                    'session_id TEXT PRIMARY KEY, '
+                    'data TEXT NOT NULL, '
+                    'version INTEGER NOT NULL DEFAULT 0, '
+                    'updated_at REAL NOT NULL, '
+                    'expires_at REAL NOT NULL)'
+                )
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(story_sessions)')}
+                if 'version' not in columns:
+                    # Databases created before sessions were versioned
+                    conn.execute('ALTER TABLE story_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_story_sessions_expires_at '
+                    'ON story_sessions (expires_at)'
+                )
+        finally:
+            conn.close()
+    
+    def get(self, session_id: str) -> Optional[StorySession]:
+        row = self._reader().execute(
+            'SELECT data, version FROM story_sessions WHERE session_id = ? AND expires_at > ?',
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        session = deserialize_session(row[0])
+        session.version = row[1]
+        return session
+    
+    def exists(self, session_id: str) -> bool:
+        row = self._reader().execute(
+            'SELECT 1 FROM story_sessions WHERE session_id = ? AND expires_at > ?',
+            (session_id, time.time())
+        ).fetchone()
+        return row is not None
+    
+    def save(self, session: StorySession) -> None:
+        expected_version = session.version
+        session.version = expected_version + 1
+        try:
+            self._submit(_Write(session.session_id, serialize_session(session), session.version))
+        except Exception:
+            session.version = expected_version
+            raise
+    
+    def delete(self, session_id: str) -> None:
+        self._submit(_Write(session_id, None))
+    
+    def _submit(self, write: _Write):
+        """Queue a write and block until its batch is committed"""
+        with self._cond:
+            self._pending.append(write)
+            batch = self._batch
+            self._cond.notify()
+        
+        if not batch.done.wait(self.write_timeout):
+            raise TimeoutError(f"Timed out writing session {write.session_id} to SQLite")
+        if batch.error is not None:
+            raise batch.error
+        if write.conflict:
+            raise SessionConflictError(f"Session {write.session_id} was modified concurrently")
+    
+    def _writer_loop(self):
+        conn = self._connect()
+        next_sweep = time.time() + self.sweep_interval
+        
+        while True:
+            with self._cond:
+                while not self._pending and time.time() < next_sweep:
+                    self._cond.wait(timeout=max(0.0, next_sweep - time.time()))
+            
+            if self._pending and self.batch_window:
+                # Give concurrent writers a moment to join this batch
+                time.sleep(self.batch_window)
+            
+            with self._cond:
+                pending, self._pending = self._pending, []
+                batch, self._batch = self._batch, _WriteBatch()
+            
+            if pending:
+                self._flush(conn, pending, batch)
+            
+            if time.time() >= next_sweep:
+                self._sweep(conn)
+                next_sweep = time.time() + self.sweep_interval
+    
+    def _flush(self, conn: sqlite3.Connection, pending: list, batch: _WriteBatch):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        try:
+            with conn:
+                for write in pending:
+                    if write.data is None:
+                        conn.execute('DELETE FROM story_sessions WHERE session_id = ?', (write.session_id,))
+                    elif write.version == 1:
+                        # New session (or one whose row expired and is waiting for the sweeper)
+                        cursor = conn.execute(
+                            'INSERT INTO story_sessions (session_id, data, version, updated_at, expires_at) '
+                            'VALUES (?, ?, ?, ?, ?) '
+                            'ON CONFLICT(session_id) DO UPDATE SET '
+                            'data = excluded.data, version = excluded.version, '
+                            'updated_at = excluded.updated_at, expires_at = excluded.expires_at '
+                            'WHERE story_sessions.expires_at <= ? OR story_sessions.version = 0',
+                            (write.session_id, write.data, write.version, now, expires_at, now)
+                        )
+                        write.conflict = cursor.rowcount == 0
+                    else:
+                        cursor = conn.execute(
+                            'UPDATE story_sessions SET data = ?, version = ?, updated_at = ?, expires_at = ? '
+                            'WHERE session_id = ? AND version = ? AND expires_at > ?',
+                            (write.data, write.version, now, expires_at, write.session_id, write.version - 1, now)
+                        )
+                        write.conflict = cursor.rowcount == 0
+        except Exception as e:
+            print(f"Session store write failed: {e}")
+            batch.error = e
+        finally:
+            batch.done.set()
+    
+    def _sweep(self, conn: sqlite3.Connection):
+        try:
+            with conn:
+                cursor = conn.execute('DELETE FROM story_sessions WHERE expires_at <= ?', (time.time(),))
+            if cursor.rowcount:
+                print(f"Session store swept {cursor.rowcount} expired sessions")
+        except Exception as e:
+            print(f"Session store sweep failed: {e}")
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by the SESSION_STORE environment variable"""
+    backend = os.getenv('SESSION_STORE', 'sqlite').lower()
+    ttl_seconds = int(os.getenv('SESSION_TTL_SECONDS', '86400'))
+    
+    if backend == 'sqlite':
+        db_path = os.getenv('SESSION_DB_PATH', 'story_sessions.db')
+        sweep_interval = int(os.getenv('SESSION_SWEEP_INTERVAL_SECONDS', '60'))
+        print(f"Using SQLite session store at {db_path}")
+        return SqliteSessionStore(db_path, ttl_seconds=ttl_seconds, sweep_interval=sweep_interval)
+    if backend == 'redis':
+        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        print(f"Using Redis session store at {redis_url}")
+        return RedisSessionStore(redis_url, ttl_seconds=ttl_seconds)
+    if backend != 'memory':
+        raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
+    
+    return InMemorySessionStore(
+        max_entries=int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '5000')),
+        max_bytes=int(os.getenv('SESSION_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        ttl_seconds=ttl_seconds
+    )
+
+
+# The interview questions; empty text is filled in per session from CONTEXTUAL_QUESTIONS
+QUESTIONS = (
+    Question(
+        id=1,
+        text="What was the life-changing moment you experienced?",
+        category="core_experience",
+        order=1
+    ),
+    Question(
+        id=2,
+        text="",  # Will be dynamically generated
+        category="contextual_setup",
+        order=2
+    ),
+    Question(
+        id=3,
+        text="",  # Will be dynamically generated
+        category="contextual_aftermath",
+        order=3
+    ),
+    Question(
+        id=4,
+        text="",  # Will be dynamically generated
+        category="contextual_transformation",
+        order=4
+    )
+)
+QUESTIONS_BY_ID = MappingProxyType({question.id: question for question in QUESTIONS})
+
+# Follow-up question text by question number and story category (None: no category matched)
+CONTEXTUAL_QUESTIONS = {
+    2: {
+        'accident': "I can only imagine how frightening that must have been. Before we continue, I want you to know this is a safe space to share whatever feels right to you. What led up to that moment? Were you rushing somewhere, feeling distracted, or was it just an ordinary day that suddenly changed? Take your time with this.",
+        'loss': "Thank you for trusting me with something so deeply personal. Loss can be one of the most profound experiences we face. What led up to that moment? What was happening in your life before this loss occurred? I'm here to listen, and there's no rush.",
+        'career': "Career changes can be both exciting and terrifying. I can hear how significant this moment was for you. What led up to that moment? What was happening at work or in your career before this change? How are you feeling as you share this?",
+        'relationship': "Relationships touch the deepest parts of who we are. Thank you for sharing something so meaningful. What led up to that moment? What was happening in your relationship before this change? I'm here to listen with compassion.",
+        'move': "Life changes like moving can be both exciting and overwhelming. What led up to that moment? What circumstances led to this change in your life? Take your time to share whatever feels important to you.",
+        None: "Thank you for sharing that with me. I can hear how significant this moment was for you. What led up to that moment? What was happening in your life before this experience occurred? There's no right or wrong way to answer this."
+    },
+    3: {
+        'accident': "That must have been such a disorienting and jarring few moments. How are you feeling as you share this? What happened right after you fell? How did you feel — physically and emotionally — in those first moments? Did someone help you? It's okay if this brings up difficult emotions.",
+        'loss': "I can only imagine how overwhelming those first moments must have been. How are you doing as you share this? What happened right after you learned about this loss? How did you feel in those first moments? Who was there with you? Take breaks whenever you need to.",
+        'career': "Career changes can feel like your whole world is shifting. How are you feeling about sharing this? What happened right after this career change? How did you feel in those first moments? What did you do next? I'm here to listen without judgment.",
+        'relationship': "Relationship changes can feel like the ground is moving beneath you. How are you feeling as you share this? What happened right after this relationship change? How did you feel in those first moments? What did you do next? Your feelings are completely valid.",
+        'move': "Big life changes can be both exciting and overwhelming. How are you feeling about sharing this? What happened right after this change? How did you feel in those first moments? What was it like to be in this new situation? Take your time.",
+        None: "Thank you for continuing to share your story with me. How are you feeling as we explore this? What happened right after this experience? How did you feel in those first moments? What was going through your mind? There's no rush, and we can pause anytime."
+    },
+    4: {
+        'accident': "I can hear the strength it took to get through that experience. How are you feeling as we near the end of our conversation? How did this moment change you? Did it shift how you think, act, or feel in your daily life? Maybe it made you more careful or more aware of your surroundings? Your growth is beautiful to witness.",
+        'loss': "Thank you for trusting me with something so deeply personal. How are you feeling as we explore this? How did this loss change you? Did it shift how you think about life, relationships, or what matters most to you? Your courage in sharing this is inspiring.",
+        'career': "Career changes can be profound teachers. How are you feeling about sharing this journey? How did this career change transform you? Did it shift how you think about work, success, or your life priorities? Your resilience is evident.",
+        'relationship': "Relationship changes can teach us so much about ourselves. How are you feeling as we explore this? How did this relationship change transform you? Did it shift how you think about love, connection, or what you want in relationships? Your openness is beautiful.",
+        'move': "Life changes like moving can be incredible catalysts for growth. How are you feeling about sharing this? How did this change transform you? Did it shift how you think about home, belonging, or what you value in life? Your adaptability is inspiring.",
+        None: "Thank you for sharing your story with such openness and courage. How are you feeling as we explore this final question? How did this experience change you? Did it shift how you think, act, or feel in your daily life? What stayed with you after this moment? Your willingness to reflect deeply is beautiful."
+    }
+}
+
+# Feedback after each answer by answer position and the category of that answer
+CONTEXTUAL_FEEDBACK = {
+    1: {
+        'accident': "Thank you for sharing that with such courage. Falling down the stairs can be incredibly frightening, both physically and emotionally. I'm honored that you're willing to talk about it with me. You're safe now, and we're going to take this story gently, step by step. How are you feeling as you share this?",
+        'loss': "Thank you for trusting me with something so deeply personal. Loss can be one of the most profound experiences we face, and I'm honored that you're willing to talk about this moment with me. Your courage in sharing this is beautiful. How are you feeling as you share this?",
+        'career': "Thank you for sharing that experience with such openness. Career changes can be both exciting and terrifying, and I can hear how significant this moment was for you. Your willingness to reflect on this is inspiring. How are you feeling about sharing this?",
+        'relationship': "Thank you for sharing that with such vulnerability. Relationships touch the deepest parts of who we are, and I can hear how meaningful this moment was for you. Your openness is beautiful. How are you feeling as you share this?",
+        None: "Thank you for sharing that experience with such courage. I can hear how significant this moment was for you, and I'm honored that you're willing to explore it with me. How are you feeling about sharing this?"
+    },
+    2: {
+        'distracted': "Thank you for sharing those details — that adds so much emotional weight to the moment. Feeling distracted, being on your phone… it makes the experience even more relatable and human. I can hear how that context made everything feel more intense. How are you feeling as you share this?",
+        'ordinary': "Thank you for sharing that. Sometimes the most profound moments happen on the most ordinary days, and that contrast can make the experience even more powerful. I can hear how unexpected it all was. How are you feeling about sharing this?",
+        None: "Thank you for sharing those details with such thoughtfulness. Understanding what led up to the moment helps us see the full picture of your experience, and I can hear how important that context is. How are you feeling as you share this?"
+    },
+    3: {
+        'injury': "Thank you for sharing those details. That must've been such a disorienting and jarring few moments — a mix of pain, confusion, and sudden awareness. Those brief moments can feel like they stretch forever, and I can hear how intense that was for you. How are you feeling as you share this?",
+        'support': "Thank you for sharing that. It's so important to have people there for us in those difficult moments, and I'm glad you weren't alone. I can hear how much that support meant to you. How are you feeling about sharing this?",
+        None: "Thank you for sharing those details with such openness. Those first moments after something significant happens can be so intense and confusing, and I can hear how overwhelming that was. How are you feeling as you share this?"
+    }
+}
+
+# Shared by every session and thread, so only read-only views are exposed
+CONTEXTUAL_QUESTIONS = MappingProxyType({number: MappingProxyType(texts) for number, texts in CONTEXTUAL_QUESTIONS.items()})
+CONTEXTUAL_FEEDBACK = MappingProxyType({number: MappingProxyType(texts) for number, texts in CONTEXTUAL_FEEDBACK.items()})
+
+
+class StoryService:
+    def __init__(self, store: Optional[SessionStore] = None):
+        # Sessions live in a pluggable store so they can be shared between workers
+        self.store = store or create_session_store()
+        self.questions = QUESTIONS
+        self.questions_by_id = QUESTIONS_BY_ID
+        self.write_retries = int(os.getenv('SESSION_WRITE_RETRIES', '5'))
+    
+    def _update(self, session_id: str, mutate: Callable[[StorySession], None]) -> Optional[StorySession]:
+        """
+        Read a session, apply mutate to it and save it, re-reading and retrying
+        when another worker or thread saved the session in between.
+        
+        Returns:
+            StorySession: The saved session, or None if the session doesn't exist
+        """
+        for attempt in range(self.write_retries):
+            session = self.store.get(session_id)
+            if session is None:
+                return None
+            mutate(session)
+            try:
+                self.store.save(session)
+                return session
+            except SessionConflictError:
+                if attempt == self.write_retries - 1:
+                    raise
+        
+    def _save_cached_fields(self, session: StorySession):
+        """Persist derived data (rendered text, parsed storyboards); losing the race to a real write is fine"""
+        try:
+            self.store.save(session)
+        except SessionConflictError:
+            pass
     
     def create_new_session(self):
         """Create a new story session"""
@@ -48,127 +514,72 @@ class StoryService:
             current_question=1,
             is_complete=False
         )
-        self.sessions[session_id] = session
+        self.store.save(session)
         return session
     
     def get_next_question(self, session_id):
         """Get the next question for a session"""
-        if session_id not in self.sessions:
+        session = self.store.get(session_id)
+        if session is None:
             raise ValueError("Session not found")
         
-        session = self.sessions[session_id]
-        
         if session.current_question > len(self.questions):
             return None
         
         question = self.questions[session.current_question - 1]
         
-        # Generate contextual question if it's empty
-        if not question.text and session.current_question > 1:
-            question.text = self._generate_contextual_question(session.current_question, session.answers)
+        # Contextual questions are rendered once per session and kept on it
+        text = question.text
+        if not text and session.current_question > 1:
+            text = session.rendered_questions.get(question.id)
+            if text is None:
+                text = self._render_question(session, question)
+                self._save_cached_fields(session)
         
         return {
             'id': question.id,
-            'text': question.text,
+            'text': text,
             'category': question.category,
             'order': question.order
         }
     
-    def _generate_contextual_question(self, question_number, answers):
+    def _render_question(self, session, question):
+        """Render a contextual question for a session and remember it there"""
+        text = self._generate_contextual_question(question.id, session.answers, session.story_category)
+        if text:
+            session.rendered_questions[question.id] = text
+        return text
+    
+    def _generate_contextual_question(self, question_number, answers, category=None):
         """Generate contextual questions based on previous answers"""
         if not answers:
             return ""
         
-        first_answer = answers[0].answer_text.lower()
-        
-        # Question 2: What led up to that moment?
-        if question_number == 2:
-            if any(word in first_answer for word in ['fell', 'fall', 'accident', 'crash', 'collision']):
-                return "I can only imagine how frightening that must have been. Before we continue, I want you to know this is a safe space to share whatever feels right to you. What led up to that moment? Were you rushing somewhere, feeling distracted, or was it just an ordinary day that suddenly changed? Take your time with this."
-            elif any(word in first_answer for word in ['lost', 'death', 'died', 'passed away']):
-                return "Thank you for trusting me with something so deeply personal. Loss can be one of the most profound experiences we face. What led up to that moment? What was happening in your life before this loss occurred? I'm here to listen, and there's no rush."
-            elif any(word in first_answer for word in ['job', 'work', 'career', 'fired', 'quit', 'resigned']):
-                return "Career changes can be both exciting and terrifying. I can hear how significant this moment was for you. What led up to that moment? What was happening at work or in your career before this change? How are you feeling as you share this?"
-            elif any(word in first_answer for word in ['relationship', 'breakup', 'divorce', 'marriage', 'love']):
-                return "Relationships touch the deepest parts of who we are. Thank you for sharing something so meaningful. What led up to that moment? What was happening in your relationship before this change? I'm here to listen with compassion."
-            elif any(word in first_answer for word in ['move', 'moved', 'relocated', 'travel', 'journey']):
-                return "Life changes like moving can be both exciting and overwhelming. What led up to that moment? What circumstances led to this change in your life? Take your time to share whatever feels important to you."
-            else:
-                return "Thank you for sharing that with me. I can hear how significant this moment was for you. What led up to that moment? What was happening in your life before this experience occurred? There's no right or wrong way to answer this."
-        
-        # Question 3: What happened right after?
-        elif question_number == 3:
-            if any(word in first_answer for word in ['fell', 'fall', 'accident', 'crash', 'collision']):
-                return "That must have been such a disorienting and jarring few moments. How are you feeling as you share this? What happened right after you fell? How did you feel — physically and emotionally — in those first moments? Did someone help you? It's okay if this brings up difficult emotions."
-            elif any(word in first_answer for word in ['lost', 'death', 'died', 'passed away']):
-                return "I can only imagine how overwhelming those first moments must have been. How are you doing as you share this? What happened right after you learned about this loss? How did you feel in those first moments? Who was there with you? Take breaks whenever you need to."
-            elif any(word in first_answer for word in ['job', 'work', 'career', 'fired', 'quit', 'resigned']):
-                return "Career changes can feel like your whole world is shifting. How are you feeling about sharing this? What happened right after this career change? How did you feel in those first moments? What did you do next? I'm here to listen without judgment."
-            elif any(word in first_answer for word in ['relationship', 'breakup', 'divorce', 'marriage', 'love']):
-                return "Relationship changes can feel like the ground is moving beneath you. How are you feeling as you share this? What happened right after this relationship change? How did you feel in those first moments? What did you do next? Your feelings are completely valid."
-            elif any(word in first_answer for word in ['move', 'moved', 'relocated', 'travel', 'journey']):
-                return "Big life changes can be both exciting and overwhelming. How are you feeling about sharing this? What happened right after this change? How did you feel in those first moments? What was it like to be in this new situation? Take your time."
-            else:
-                return "Thank you for continuing to share your story with me. How are you feeling as we explore this? What happened right after this experience? How did you feel in those first moments? What was going through your mind? There's no rush, and we can pause anytime."
-        
-        # Question 4: How did this change you?
-        elif question_number == 4:
-            if any(word in first_answer for word in ['fell', 'fall', 'accident', 'crash', 'collision']):
-                return "I can hear the strength it took to get through that experience. How are you feeling as we near the end of our conversation? How did this moment change you? Did it shift how you think, act, or feel in your daily life? Maybe it made you more careful or more aware of your surroundings? Your growth is beautiful to witness."
-            elif any(word in first_answer for word in ['lost', 'death', 'died', 'passed away']):
-                return "Thank you for trusting me with something so deeply personal. How are you feeling as we explore this? How did this loss change you? Did it shift how you think about life, relationships, or what matters most to you? Your courage in sharing this is inspiring."
-            elif any(word in first_answer for word in ['job', 'work', 'career', 'fired', 'quit', 'resigned']):
-                return "Career changes can be profound teachers. How are you feeling about sharing this journey? How did this career change transform you? Did it shift how you think about work, success, or your life priorities? Your resilience is evident."
-            elif any(word in first_answer for word in ['relationship', 'breakup', 'divorce', 'marriage', 'love']):
-                return "Relationship changes can teach us so much about ourselves. How are you feeling as we explore this? How did this relationship change transform you? Did it shift how you think about love, connection, or what you want in relationships? Your openness is beautiful."
-            elif any(word in first_answer for word in ['move', 'moved', 'relocated', 'travel', 'journey']):
-                return "Life changes like moving can be incredible catalysts for growth. How are you feeling about sharing this? How did this change transform you? Did it shift how you think about home, belonging, or what you value in life? Your adaptability is inspiring."
-            else:
-                return "Thank you for sharing your story with such openness and courage. How are you feeling as we explore this final question? How did this experience change you? Did it shift how you think, act, or feel in your daily life? What stayed with you after this moment? Your willingness to reflect deeply is beautiful."
-        
-        return ""
-    
-    def _generate_contextual_feedback(self, question_number, answer_text):
-        """Generate contextual feedback based on the answer content"""
-        answer_lower = answer_text.lower()
-        
-        if question_number == 1:
-            if any(word in answer_lower for word in ['fell', 'fall', 'accident', 'crash', 'collision']):
-                return "Thank you for sharing that with such courage. Falling down the stairs can be incredibly frightening, both physically and emotionally. I'm honored that you're willing to talk about it with me. You're safe now, and we're going to take this story gently, step by step. How are you feeling as you share this?"
-            elif any(word in answer_lower for word in ['lost', 'death', 'died', 'passed away']):
-                return "Thank you for trusting me with something so deeply personal. Loss can be one of the most profound experiences we face, and I'm honored that you're willing to talk about this moment with me. Your courage in sharing this is beautiful. How are you feeling as you share this?"
-            elif any(word in answer_lower for word in ['job', 'work', 'career', 'fired', 'quit', 'resigned']):
-                return "Thank you for sharing that experience with such openness. Career changes can be both exciting and terrifying, and I can hear how significant this moment was for you. Your willingness to reflect on this is inspiring. How are you feeling about sharing this?"
-            elif any(word in answer_lower for word in ['relationship', 'breakup', 'divorce', 'marriage', 'love']):
-                return "Thank you for sharing that with such vulnerability. Relationships touch the deepest parts of who we are, and I can hear how meaningful this moment was for you. Your openness is beautiful. How are you feeling as you share this?"
-            else:
-                return "Thank you for sharing that experience with such courage. I can hear how significant this moment was for you, and I'm honored that you're willing to explore it with me. How are you feeling about sharing this?"
+        if category is None:
+            category = STORY_CATEGORIES.classify(answers[0].answer_text)
         
-        elif question_number == 2:
-            if any(word in answer_lower for word in ['phone', 'distracted', 'rushing', 'hurried']):
-                return "Thank you for sharing those details — that adds so much emotional weight to the moment. Feeling distracted, being on your phone… it makes the experience even more relatable and human. I can hear how that context made everything feel more intense. How are you feeling as you share this?"
-            elif any(word in answer_lower for word in ['ordinary', 'normal', 'regular', 'typical']):
-                return "Thank you for sharing that. Sometimes the most profound moments happen on the most ordinary days, and that contrast can make the experience even more powerful. I can hear how unexpected it all was. How are you feeling about sharing this?"
-            else:
-                return "Thank you for sharing those details with such thoughtfulness. Understanding what led up to the moment helps us see the full picture of your experience, and I can hear how important that context is. How are you feeling as you share this?"
+        templates = CONTEXTUAL_QUESTIONS.get(question_number)
+        if templates is None:
+            return ""
+        return templates.get(category, templates[None])
+    
+    def _generate_contextual_feedback(self, question_number, answer_text, category=None):
+        """
+        Generate contextual feedback based on the answer content
         
-        elif question_number == 3:
-            if any(word in answer_lower for word in ['hurt', 'pain', 'injured', 'bruised']):
-                return "Thank you for sharing those details. That must've been such a disorienting and jarring few moments — a mix of pain, confusion, and sudden awareness. Those brief moments can feel like they stretch forever, and I can hear how intense that was for you. How are you feeling as you share this?"
-            elif any(word in answer_lower for word in ['help', 'helped', 'someone', 'people']):
-                return "Thank you for sharing that. It's so important to have people there for us in those difficult moments, and I'm glad you weren't alone. I can hear how much that support meant to you. How are you feeling about sharing this?"
-            else:
-                return "Thank you for sharing those details with such openness. Those first moments after something significant happens can be so intense and confusing, and I can hear how overwhelming that was. How are you feeling as you share this?"
+        Pass the already-known category (e.g. the session's story_category
+        for answer 1) to skip classifying the answer again.
+        """
+        templates = CONTEXTUAL_FEEDBACK.get(question_number)
+        if templates is None:
+            return "Thank you for sharing that with me. How are you feeling about our conversation so far?"
         
-        return "Thank you for sharing that with me. How are you feeling about our conversation so far?"
+        if category is None:
+            category = ANSWER_CLASSIFIERS[question_number].classify(answer_text)
+        return templates.get(category, templates[None])
     
     def save_answer(self, session_id, question_number, answer_text):
-        """Save an answer to a question"""
-        if session_id not in self.sessions:
-            raise ValueError("Session not found")
-        
-        session = self.sessions[session_id]
-        
+        """Save an answer to a question and return the updated session"""
         # Create answer object
         answer = Answer(
             question_id=question_number,
@@ -176,45 +587,59 @@ class StoryService:
             timestamp=datetime.now()
         )
         
-        # Add answer to session
-        session.answers.append(answer)
-        
-        # Update current question
-        session.current_question = question_number + 1
+        def add_answer(session):
+            # Add answer to session
+            session.answers.append(answer)
+            
+            # Classify the first answer once; later questions and feedback reuse it
+            if len(session.answers) == 1:
+                session.story_category = STORY_CATEGORIES.classify(answer_text)
+            
+            # Update current question
+            session.current_question = question_number + 1
+            
+            # Check if session is complete
+            if len(session.answers) >= 4:
+                session.is_complete = True
         
-        # Check if session is complete
-        if len(session.answers) >= 4:
-            session.is_complete = True
+        session = self._update(session_id, add_answer)
+        if session is None:
+            raise ValueError("Session not found")
+        return session
     
     def get_session_data(self, session_id):
         """Get complete session data"""
-        if session_id not in self.sessions:
+        session = self.store.get(session_id)
+        if session is None:
             return None
         
-        session = self.sessions[session_id]
-        return session.to_dict()
+        data = session.to_dict()
+        if data['generated_story'] is None and session.parsed_storyboard is not None:
+            data['generated_story'] = session.parsed_storyboard.to_markdown()
+        return data
     
     def get_all_answers_for_story_generation(self, session_id):
         """Get formatted answers for story generation"""
-        if session_id not in self.sessions:
+        session = self.store.get(session_id)
+        if session is None:
             print(f"Session {session_id} not found in sessions")
             return None
         
-        session = self.sessions[session_id]
         print(f"Session has {len(session.answers)} answers")
         
         # Format answers with questions for context
         formatted_answers = []
         for answer in session.answers:
-            try:
-                question = next(q for q in self.questions if q.id == answer.question_id)
+            question = self.questions_by_id.get(answer.question_id)
+            if question is not None:
+                text = question.text or session.rendered_questions.get(question.id) or self._render_question(session, question)
                 formatted_answers.append({
-                    'question': question.text,
+                    'question': text,
                     'answer': answer.answer_text,
                     'category': question.category,
                     'session_id': session_id
                 })
-            except StopIteration:
+            else:
                 print(f"Question with ID {answer.question_id} not found")
                 # Fallback for missing questions
                 formatted_answers.append({
@@ -228,49 +653,75 @@ class StoryService:
         return formatted_answers
     
     def save_generated_storyboard(self, session_id, storyboard):
-        """Save the generated storyboard to the session"""
-        if session_id not in self.sessions:
+        """
+        Save the generated storyboard to the session
+        
+        Structured storyboards (Storyboard objects) are stored as they are;
+        markdown is rendered from them when asked for. Text storyboards are
+        kept as text and parsed here, once, for the image and video script
+        stages.
+        """
+        if isinstance(storyboard, Storyboard):
+            generated_story, parsed_storyboard = None, storyboard
+        else:
+            generated_story, parsed_storyboard = storyboard, parse_storyboard(storyboard)
+        
+        def set_storyboard(session):
+            session.generated_story = generated_story
+            session.parsed_storyboard = parsed_storyboard
+        
+        if self._update(session_id, set_storyboard) is None:
             print(f"Session {session_id} not found")
             return False
-        
-        session = self.sessions[session_id]
-        session.generated_story = storyboard
         print(f"Saved storyboard for session {session_id}")
         return True
     
     def get_generated_storyboard(self, session_id):
-        """Get the generated storyboard from the session"""
-        if session_id not in self.sessions:
+        """Get the generated storyboard from the session as markdown"""
+        session = self.store.get(session_id)
+        if session is None:
             print(f"Session {session_id} not found")
             return None
         
-        session = self.sessions[session_id]
+        if session.generated_story is None and session.parsed_storyboard is not None:
+            return session.parsed_storyboard.to_markdown()
         return session.generated_story
     
+    def get_parsed_storyboard(self, session_id):
+        """Get the session's storyboard in structured form (None if it has no storyboard)"""
+        session = self.store.get(session_id)
+        if session is None:
+            return None
+        
+        if session.parsed_storyboard is None and session.generated_story:
+            # Saved before storyboards were parsed on save
+            session.parsed_storyboard = parse_storyboard(session.generated_story)
+            self._save_cached_fields(session)
+        return session.parsed_storyboard
+    
     def save_user_email(self, session_id, email):
         """Save user email to the session"""
         print(f"Attempting to save email {email} for session {session_id}")
-        print(f"Available sessions: {list(self.sessions.keys())}")
         
-        if session_id not in self.sessions:
+        def set_email(session):
+            session.user_email = email
+        
+        if self._update(session_id, set_email) is None:
             print(f"Session {session_id} not found in sessions")
             return False
         
-        session = self.sessions[session_id]
-        session.user_email = email
         print(f"Successfully saved email {email} for session {session_id}")
         return True
     
     def save_to_supabase(self, session_id, video_url):
         """Save the completed story to Supabase"""
         print(f"Attempting to save to Supabase for session {session_id} with video {video_url}")
-        print(f"Available sessions: {list(self.sessions.keys())}")
         
-        if session_id not in self.sessions:
+        session = self.store.get(session_id)
+        if session is None:
             print(f"Session {session_id} not found in sessions")
             return False
         
-        session = self.sessions[session_id]
         print(f"Session found, user_email: {session.user_email}")
         
         if not session.user_email:
@@ -278,37 +729,35 @@ class StoryService:
             return False
         
         try:
-            import os
-            from supabase import create_client
-            
-            # Get Supabase client
-            supabase_url = os.getenv('SUPABASE_URL')
-            supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-            
-            print(f"Supabase URL: {supabase_url}")
-            print(f"Supabase Key: {supabase_key[:10]}..." if supabase_key else "None")
-            
-            if not supabase_url or not supabase_key:
-                print("Supabase credentials not found")
-                return False
-            
-            supabase = create_client(supabase_url, supabase_key)
+            # Shared client, reuses pooled connections to Supabase
+            supabase = get_supabase_client()
             
             # Prepare data for Supabase
             data_to_insert = {
+                'session_id': session_id,
                 'email': session.user_email,
                 'video_url': video_url,
                 'created_at': session.created_at.isoformat()
             }
             print(f"Data to insert: {data_to_insert}")
             
-            # Save to Supabase
-            response = supabase.table('story_submissions').insert([data_to_insert]).execute()
+            # Save to Supabase; keyed on session_id so the watcher and the frontend's
+            # save (possibly on another worker) store one row per session. A later
+            # render for the same session replaces video_url rather than being dropped.
+            response = supabase.table('story_submissions').upsert(
+                [data_to_insert], on_conflict='session_id', ignore_duplicates=False
+            ).execute()
             
             print(f"Supabase response: {response}")
-            print(f"Successfully saved story to Supabase for session {session_id}")
+            if not response.data:
+                print(f"Story for session {session_id} was already stored in Supabase")
+            else:
+                print(f"Successfully saved story to Supabase for session {session_id}")
             return True
             
         except Exception as e:
             print(f"Error saving to Supabase: {e}")
+            if getattr(e, 'code', None) in SUPABASE_SCHEMA_ERROR_CODES:
+                print("story_submissions has no unique session_id column; apply "
+                      "supabase/migrations/20261016000000_story_submissions_session_id.sql")
             return False
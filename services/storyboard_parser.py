@@ -0,0 +1,204 @@
+import json
+import re
+from typing import Dict, List, Optional
+from models.storyboard_models import SCENE_FIELDS, Scene, Storyboard
+
+# **Scene 3: "The Processing"** (number and quoted name)
+_SCENE_HEADER = re.compile(r'(\d+): "([^"]+)"')
+# • **Visual**: text  (also "- **Visual:** text")
+_SCENE_FIELD = re.compile(r'[•\-*]\s*\*\*([A-Za-z]+):?\*\*:?\s*(.*)')
+# "Title" – Subtitle
+_TITLE = re.compile(r'"([^"]+)"\s*(?:[–—-]\s*(.*))?$')
+
+# What the model is asked to return (OpenAI structured outputs, strict mode:
+# every property required, fields a scene doesn't use are empty strings)
+STORYBOARD_JSON_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': {'type': 'string'},
+        'subtitle': {'type': 'string'},
+        'scenes': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {name: {'type': 'string'} for name in ('name',) + SCENE_FIELDS},
+                'required': ['name', *SCENE_FIELDS],
+                'additionalProperties': False
+            }
+        }
+    },
+    'required': ['title', 'subtitle', 'scenes'],
+    'additionalProperties': False
+}
+
+# Characters that matter for finding object boundaries in JSON text
+_JSON_STRUCTURE = re.compile(r'[{}"\\]')
+
+
+class StoryboardParser:
+    """
+    Line tokenizer for markdown storyboards (the fallback templates and
+    storyboards clients send in as text).
+
+    Text can be fed in chunks as it streams in; each complete line is
+    classified once (title, scene header, scene field or free text) and
+    folded into the Storyboard being built, so the whole storyboard is
+    parsed in a single pass. finish() flushes the last partial line.
+    """
+    def __init__(self):
+        self.storyboard = Storyboard()
+        self._scene: Optional[Scene] = None
+        self._pending = ''
+
+    def feed(self, chunk: str) -> None:
+        lines = (self._pending + chunk).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self._parse_line(line)
+
+    def finish(self) -> Storyboard:
+        if self._pending:
+            self._parse_line(self._pending)
+            self._pending = ''
+        return self.storyboard
+
+    def _parse_line(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+
+        if line.startswith('**Scene'):
+            self._scene = Scene()
+            header = _SCENE_HEADER.search(line)
+            if header:
+                self._scene.number, self._scene.name = header.group(1), header.group(2)
+            self.storyboard.scenes.append(self._scene)
+            return
+
+        if '**Storyboard:' in line:
+            if self.storyboard.title is None:
+                title = line.replace('**Storyboard:', '').replace('**', '').strip()
+                match = _TITLE.match(title)
+                if match:
+                    self.storyboard.title, self.storyboard.subtitle = match.group(1), match.group(2) or None
+                else:
+                    self.storyboard.title = title
+            return
+
+        if self._scene is not None:
+            match = _SCENE_FIELD.match(line)
+            if match:
+                name = match.group(1).lower()
+                if name in SCENE_FIELDS:
+                    setattr(self._scene, name, match.group(2).strip())
+                return
+
+        if not line.startswith('**') and not line.startswith('•'):
+            self.storyboard.notes.append(line)
+
+
+def parse_storyboard(text: str) -> Storyboard:
+    """Parse a complete storyboard in one pass"""
+    parser = StoryboardParser()
+    parser.feed(text or '')
+    return parser.finish()
+
+
+def _scene_from_json(data, number: int) -> Scene:
+    if not isinstance(data, dict):
+        raise ValueError(f"Scene {number} is not an object")
+    values = {}
+    for name in ('name',) + SCENE_FIELDS:
+        value = data.get(name, '')
+        if not isinstance(value, str):
+            raise ValueError(f"Scene {number} field '{name}' is not a string")
+        values[name] = value.strip()
+    if not values['name'] or not values['visual']:
+        raise ValueError(f"Scene {number} has no name or visual")
+    return Scene(number=str(number), **values)
+
+
+def storyboard_from_json(data: Dict) -> Storyboard:
+    """
+    Validate a storyboard in STORYBOARD_JSON_SCHEMA form and build it
+
+    Raises:
+        ValueError: If the data doesn't match the schema or has no scenes
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Storyboard is not an object")
+    title = data.get('title')
+    subtitle = data.get('subtitle') or ''
+    if not isinstance(title, str) or not title.strip() or not isinstance(subtitle, str):
+        raise ValueError("Storyboard has no title")
+    scenes = data.get('scenes')
+    if not isinstance(scenes, list) or not scenes:
+        raise ValueError("Storyboard has no scenes")
+    return Storyboard(
+        title=title.strip(),
+        subtitle=subtitle.strip() or None,
+        scenes=[_scene_from_json(scene, number) for number, scene in enumerate(scenes, 1)]
+    )
+
+
+def parse_storyboard_json(text: str) -> Storyboard:
+    """
+    Parse and validate the model's JSON storyboard
+
+    Raises:
+        ValueError: If the text isn't valid JSON or doesn't match the schema
+    """
+    return storyboard_from_json(json.loads(text))
+
+
+class JsonSceneScanner:
+    """
+    Picks complete scene objects out of a storyboard JSON document as it streams in.
+
+    Only braces, quotes and backslashes are looked at, so each chunk is
+    scanned once. Scene objects are the only objects nested inside the
+    top-level one, so an object closing at depth two is a finished scene.
+    """
+    def __init__(self):
+        self.text = ''
+        self.scenes: List[Scene] = []
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._skip_to = 0  # Index after a backslash-escaped character
+        self._scene_start = None
+
+    def feed(self, chunk: str) -> List[Scene]:
+        """
+        Add streamed text; return the scenes completed by it
+
+        Raises:
+            ValueError: If a completed scene isn't valid
+        """
+        self.text += chunk
+        completed = []
+        for match in _JSON_STRUCTURE.finditer(self.text, self._position):
+            index = match.start()
+            if index < self._skip_to:
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == '\\':
+                    self._skip_to = index + 2
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+                if self._depth == 2:
+                    self._scene_start = index
+            elif char == '}':
+                if self._depth == 2 and self._scene_start is not None:
+                    scene = _scene_from_json(json.loads(self.text[self._scene_start:index + 1]), len(self.scenes) + 1)
+                    self.scenes.append(scene)
+                    completed.append(scene)
+                    self._scene_start = None
+                self._depth -= 1
+        self._position = len(self.text)
+        return completed
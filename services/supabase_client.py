@@ -0,0 +1,40 @@
+import os
+import threading
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_supabase_client() -> Client:
+    """
+    Return the process-wide Supabase client, creating it on first use.
+
+    The client (and the httpx connection pools behind its PostgREST and auth
+    sub-clients) is shared by every request and thread in the worker, so
+    keep-alive connections and TLS sessions to Supabase are reused instead
+    of being rebuilt per request.
+
+    Raises:
+        ValueError: If SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY is not set
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            supabase_url = os.getenv('SUPABASE_URL')
+            supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+            if not supabase_url or not supabase_key:
+                raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables must be set")
+
+            options = ClientOptions(
+                postgrest_client_timeout=int(os.getenv('SUPABASE_TIMEOUT_SECONDS', '10')),
+                auto_refresh_token=False,
+                persist_session=False
+            )
+            _client = create_client(supabase_url, supabase_key, options=options)
+            print("Supabase client initialized")
+    return _client
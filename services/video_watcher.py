@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from .bounded_cache import BoundedCache
+
+# VideoGen loadingState values that end a render
+TERMINAL_STATES = {'FULFILLED', 'REJECTED'}
+
+
+class VideoCompletionWatcher:
+    """
+    Tracks pending VideoGen renders server-side and polls them on one shared schedule.
+
+    Each tracked apiFileId is polled when its PollScheduler delay says so
+    (fast at first, densely around the learned render time, backing off
+    otherwise), with a bounded number of concurrent get-file calls, no
+    matter how many clients are asking about it. When a render is FULFILLED
+    and belongs to a session, the video is saved to Supabase from here, so
+    saving no longer depends on the frontend calling /video/save-to-supabase.
+    """
+    def __init__(self, videogen_service, story_service, max_concurrency: int = 4,
+                 give_up_after: float = 900, max_tracked: int = 5000):
+        self.videogen_service = videogen_service
+        self.story_service = story_service
+        self.scheduler = videogen_service.poll_scheduler
+        self.render_times = videogen_service.render_times
+        self.give_up_after = give_up_after
+
+        self._states = BoundedCache(max_entries=max_tracked, ttl_seconds=3600, name='video_renders')
+        self._pending = set()
+        self._saved_sessions = BoundedCache(max_entries=max_tracked, ttl_seconds=3600, name='saved_videos')
+        # Sessions whose insert is running right now, set when it finishes either way
+        self._saving: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='video-watcher')
+        self._thread = None
+
+        self.polls = 0
+        self.poll_errors = 0
+
+    def track(self, api_file_id: str, session_id: Optional[str] = None) -> Dict:
+        """Start watching a render; re-tracking an id only attaches a session to it"""
+        with self._lock:
+            state = self._states.get(api_file_id)
+            if state is None:
+                state = {
+                    'api_file_id': api_file_id,
+                    'session_id': session_id,
+                    'loading_state': 'PENDING',
+                    'result': None,
+                    'created_at': time.time(),
+                    'last_checked': None,
+                    'next_check_at': time.time() + self.scheduler.next_delay(0, 0),
+                    'eta_seconds': None,
+                    'checks': 0,
+                    'saved': False,
+                    'error': None
+                }
+                self._states.set(api_file_id, state)
+            elif session_id and not state['session_id']:
+                state['session_id'] = session_id
+
+            if state['loading_state'] not in TERMINAL_STATES:
+                self._pending.add(api_file_id)
+            snapshot = dict(state)
+        self._ensure_started()
+        self._wakeup.set()
+        return snapshot
+
+    def get_status(self, api_file_id: str) -> Optional[Dict]:
+        """
+        A copy of the render's state
+
+        The watcher's pool threads update states under self._lock; callers
+        get a consistent snapshot rather than the live dict.
+        """
+        with self._lock:
+            state = self._states.get(api_file_id)
+            if state is None:
+                return None
+            snapshot = dict(state)
+        if snapshot['loading_state'] not in TERMINAL_STATES:
+            snapshot['eta_seconds'] = self.render_times.eta(api_file_id)
+        return snapshot
+
+    def refresh(self, api_file_id: str) -> Dict:
+        """Poll one render right away (used the first time a client asks about an unseen id)"""
+        state = self.track(api_file_id)
+        if state['result'] is None:
+            self._poll(api_file_id)
+        return self.get_status(api_file_id) or state
+
+    def is_saved(self, session_id: str, video_url: Optional[str] = None) -> bool:
+        """Whether the session's video (this video_url, if given) was stored"""
+        saved_url = self._saved_sessions.get(session_id)
+        return bool(saved_url) and (video_url is None or saved_url == video_url)
+
+    def wait_for_save(self, session_id: str, timeout: float, video_url: Optional[str] = None) -> bool:
+        """Wait for an in-flight save of this session to finish; True only if the video was stored"""
+        with self._lock:
+            in_flight = self._saving.get(session_id)
+        if in_flight is not None:
+            in_flight.wait(timeout)
+        return self.is_saved(session_id, video_url)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='video-watcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # Cleared before the round so a track() during polling still wakes the next wait
+            self._wakeup.clear()
+            now = time.time()
+            with self._lock:
+                due = [api_file_id for api_file_id in self._pending if self._next_check_at(api_file_id) <= now]
+
+            if due:
+                # One shared round: every due render is polled once, at most max_concurrency at a time
+                list(self._pool.map(self._poll, due))
+
+            with self._lock:
+                next_checks = [self._next_check_at(api_file_id) for api_file_id in self._pending]
+            timeout = max(0.05, min(next_checks) - time.time()) if next_checks else None
+            self._wakeup.wait(timeout)
+
+    def _next_check_at(self, api_file_id: str) -> float:
+        state = self._states.get(api_file_id)
+        return state['next_check_at'] if state is not None else 0.0
+
+    def _poll(self, api_file_id: str):
+        # New field values are worked out outside the lock, then applied together under it
+        with self._lock:
+            state = self._states.get(api_file_id)
+            if state is None:
+                self._pending.discard(api_file_id)
+                return
+            created_at = state['created_at']
+            checks = state['checks'] + 1
+
+        if time.time() - created_at > self.give_up_after:
+            with self._lock:
+                state['error'] = f"Video generation timed out after {self.give_up_after} seconds"
+                self._pending.discard(api_file_id)
+            return
+
+        result = None
+        error = None
+        retry_after = None
+        try:
+            result = self.videogen_service.get_video_file(api_file_id)
+        except Exception as e:
+            # Leave it pending; a later round tries again
+            retry_after = getattr(e, 'retry_after', None)
+            if getattr(e, 'status_code', None) != 404:
+                error = str(e)
+                print(f"Video watcher poll error for {api_file_id}: {e}")
+
+        now = time.time()
+        started_at = self.render_times.started_at(api_file_id) or created_at
+        update = {
+            'checks': checks,
+            'last_checked': now,
+            'next_check_at': now + self.scheduler.next_delay(
+                now - started_at,
+                checks,
+                expected=self.render_times.expected_window(api_file_id),
+                retry_after=retry_after
+            ),
+            'eta_seconds': self.render_times.eta(api_file_id, now)
+        }
+
+        with self._lock:
+            self.polls += 1
+            if result is None:
+                if error is not None:
+                    self.poll_errors += 1
+                    update['error'] = error
+                state.update(update)
+                return
+
+            loading_state = result.get('loadingState') or state['loading_state']
+            update.update(result=result, error=None, loading_state=loading_state)
+            if loading_state in TERMINAL_STATES:
+                update['eta_seconds'] = None
+                self._pending.discard(api_file_id)
+            state.update(update)
+
+        if loading_state in TERMINAL_STATES:
+            if loading_state == 'FULFILLED':
+                self.render_times.finished(api_file_id)
+            print(f"Video {api_file_id} finished with state {loading_state}")
+
+        if loading_state == 'FULFILLED':
+            self._save(state)
+
+    def _save(self, state: Dict):
+        with self._lock:
+            session_id = state['session_id']
+            video_url = (state['result'] or {}).get('apiFileSignedUrl')
+            if not session_id or not video_url or state['saved']:
+                return
+            if self._saved_sessions.get(session_id) == video_url:
+                state['saved'] = True
+                return
+            if session_id in self._saving:
+                # A concurrent poll of the same render is already inserting it
+                return
+            in_flight = self._saving[session_id] = threading.Event()
+
+        try:
+            if self.story_service.save_to_supabase(session_id, video_url):
+                # Only reported as saved once the row is actually stored; a later
+                # render for the session has another URL and updates the row
+                self._saved_sessions.set(session_id, video_url)
+                with self._lock:
+                    state['saved'] = True
+        finally:
+            with self._lock:
+                self._saving.pop(session_id, None)
+            in_flight.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'tracked': len(self._states),
+            'polls': self.polls,
+            'poll_errors': self.poll_errors,
+            'schedule': self.scheduler.stats(),
+            'render_times': self.render_times.stats()
+        }
+
+
+def create_video_watcher(videogen_service, story_service) -> VideoCompletionWatcher:
+    return VideoCompletionWatcher(
+        videogen_service,
+        story_service,
+        max_concurrency=int(os.getenv('VIDEO_WATCH_MAX_CONCURRENCY', '4')),
+        give_up_after=float(os.getenv('VIDEO_WATCH_TIMEOUT_SECONDS', '900'))
+    )
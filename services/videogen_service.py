@@ -1,10 +1,61 @@
 import requests
+from requests.adapters import HTTPAdapter
+import random
+import threading
 import time
 import os
 import re
-from typing import Dict, Optional
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Union
+from models.storyboard_models import Scene, Storyboard
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker
+from .first_person import convert_to_first_person
+from .poll_scheduler import create_poll_scheduler, get_render_time_estimator
+from .rate_limiter import get_rate_limiter
+from .storyboard_parser import parse_storyboard
+
+# Status codes worth retrying for idempotent calls
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class VideoGenAPIError(Exception):
+    """
+    Error from the VideoGen API
+    
+    status_code is None for network errors and timeouts; retry_after is the
+    server's Retry-After in seconds when it sent one.
+    """
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+    
+    @property
+    def transient(self) -> bool:
+        """Whether the same call may succeed later"""
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (delta-seconds or HTTP date) as seconds from now"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 
 class VideoGenService:
+    # One pooled HTTP session shared by every VideoGenService instance in the process
+    _http_session = None
+    _http_lock = threading.Lock()
+    _http_stats = {'requests': 0, 'retries': 0, 'errors': 0}
+    _http_stats_lock = threading.Lock()
+    
     def __init__(self):
         self.api_key = os.getenv('VIDEOGEN_API_KEY', 'b45efa105372a3880ddc2f18464437182597c666')
         self.base_url = 'https://ext.videogen.io/v1'
@@ -12,6 +63,122 @@ class VideoGenService:
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
+        self.connect_timeout = float(os.getenv('VIDEOGEN_CONNECT_TIMEOUT_SECONDS', '5'))
+        self.max_retries = int(os.getenv('VIDEOGEN_MAX_RETRIES', '3'))
+        self.retry_backoff = float(os.getenv('VIDEOGEN_RETRY_BACKOFF_SECONDS', '0.5'))
+        self.retry_backoff_max = float(os.getenv('VIDEOGEN_RETRY_BACKOFF_MAX_SECONDS', '8'))
+        self.poll_scheduler = create_poll_scheduler()
+        self.render_times = get_render_time_estimator()
+        # Renders started per minute, shared by every worker on the host
+        self.render_limiter = get_rate_limiter('videogen_renders', float(os.getenv('VIDEOGEN_RENDERS_PER_MINUTE', '10')))
+        self.render_rate_wait = float(os.getenv('VIDEOGEN_RENDER_RATE_WAIT_SECONDS', '60'))
+        # Trips on connection errors, timeouts, 429/5xx and slow responses from VideoGen
+        self.circuit_breaker = get_circuit_breaker('videogen', float(os.getenv('VIDEOGEN_SLOW_CALL_SECONDS', '10')))
+    
+    @classmethod
+    def _get_http_session(cls) -> requests.Session:
+        """Lazily create the shared keep-alive session with a sized connection pool"""
+        if cls._http_session is None:
+            with cls._http_lock:
+                if cls._http_session is None:
+                    pool_size = int(os.getenv('VIDEOGEN_POOL_SIZE', '10'))
+                    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+                    session = requests.Session()
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    cls._http_session = session
+        return cls._http_session
+    
+    def _request(self, method: str, path: str, read_timeout: float, idempotent: bool = False, **kwargs) -> requests.Response:
+        """
+        Send a request to the VideoGen API over the shared session
+        
+        Idempotent calls are retried on connection errors, timeouts and
+        429/5xx responses with exponential backoff and full jitter; other
+        calls are sent exactly once. A Retry-After longer than the backoff
+        cap ends the retries so the caller can reschedule instead of sleeping.
+        Every call goes through the VideoGen circuit breaker.
+        
+        Args:
+            method (str): HTTP method
+            path (str): Path below the API base URL, e.g. '/get-file'
+            read_timeout (float): Read timeout in seconds (connect timeout is configured separately)
+            idempotent (bool): Whether the call is safe to repeat
+            
+        Returns:
+            requests.Response: The final response (not raised for status)
+            
+        Raises:
+            CircuitOpenError: If VideoGen's circuit breaker is open
+        """
+        self.circuit_breaker.before_call()
+        start = time.monotonic()
+        try:
+            response = self._send(method, path, read_timeout, idempotent, **kwargs)
+        except Exception:
+            self.circuit_breaker.record_failure(time.monotonic() - start)
+            raise
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self.circuit_breaker.record_failure(time.monotonic() - start)
+        else:
+            self.circuit_breaker.record_success(time.monotonic() - start)
+        return response
+    
+    def _send(self, method: str, path: str, read_timeout: float, idempotent: bool, **kwargs) -> requests.Response:
+        session = self._get_http_session()
+        url = f"{self.base_url}{path}"
+        attempts = self.max_retries + 1 if idempotent else 1
+        
+        for attempt in range(attempts):
+            self._count('requests')
+            retry_after = None
+            try:
+                response = session.request(
+                    method,
+                    url,
+                    headers=self.headers,
+                    timeout=(self.connect_timeout, read_timeout),
+                    **kwargs
+                )
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == attempts - 1:
+                    return response
+                retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None and retry_after > self.retry_backoff_max:
+                    return response
+                print(f"VideoGen {method} {path} returned {response.status_code}, retrying")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == attempts - 1:
+                    self._count('errors')
+                    raise
+                print(f"VideoGen {method} {path} failed ({e}), retrying")
+            
+            self._count('retries')
+            backoff = min(self.retry_backoff_max, self.retry_backoff * (2 ** attempt))
+            time.sleep(max(random.uniform(0, backoff), retry_after or 0))
+    
+    @classmethod
+    def _count(cls, name: str):
+        with cls._http_stats_lock:
+            cls._http_stats[name] += 1
+    
+    @classmethod
+    def get_http_stats(cls) -> Dict:
+        """Request/retry counters plus connection reuse figures from the urllib3 pools"""
+        with cls._http_stats_lock:
+            stats = dict(cls._http_stats)
+        connections_opened = 0
+        pool_requests = 0
+        if cls._http_session is not None:
+            adapter = cls._http_session.get_adapter('https://')
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+                    pool_requests += pool.num_requests
+        stats['connections_opened'] = connections_opened
+        stats['connections_reused'] = max(0, pool_requests - connections_opened)
+        return stats
     
     def generate_video_from_script(self, script: str) -> str:
         """
@@ -44,8 +211,12 @@ class VideoGenService:
             print(f"Sending request to VideoGen API: {url}")
             print(f"Payload: {payload}")
             
-            # Reduce timeout to prevent worker crashes
-            response = requests.post(url, headers=self.headers, json=payload, timeout=15)
+            # Fail fast while VideoGen is down, then queue for a render slot rather than getting rejected upstream
+            self.circuit_breaker.check()
+            self.render_limiter.acquire(timeout=self.render_rate_wait)
+            
+            # Not idempotent: a retry could start a second paid render
+            response = self._request('POST', '/script-to-video', read_timeout=15, json=payload)
             
             print(f"VideoGen API Response Status: {response.status_code}")
             print(f"VideoGen API Response Headers: {dict(response.headers)}")
@@ -66,8 +237,13 @@ class VideoGenService:
             if not api_file_id:
                 raise Exception("No apiFileId returned from VideoGen API")
             
+            # Start the clock for render-time estimates
+            self.render_times.started(api_file_id, len(truncated_script.split()))
+            
             return api_file_id
             
+        except CircuitOpenError:
+            raise
         except requests.exceptions.Timeout:
             print("VideoGen API request timed out")
             raise Exception("Video generation request timed out")
@@ -149,81 +325,111 @@ class VideoGenService:
             
         Returns:
             Dict: Video file information including signed URL and status
+            
+        Raises:
+            VideoGenAPIError: With the HTTP status and Retry-After of a failed call
         """
         try:
-            url = f"{self.base_url}/get-file"
             params = {
                 'apiFileId': api_file_id
             }
             
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
+            response = self._request('GET', '/get-file', read_timeout=10, idempotent=True, params=params)
+            if response.status_code >= 400:
+                raise VideoGenAPIError(
+                    f"VideoGen get-file failed with status {response.status_code}: {response.text[:200]}",
+                    status_code=response.status_code,
+                    retry_after=_parse_retry_after(response.headers.get('Retry-After'))
+                )
             
             result = response.json()
             return result
             
+        except (VideoGenAPIError, CircuitOpenError):
+            raise
         except requests.exceptions.RequestException as e:
-            raise Exception(f"VideoGen API request failed: {str(e)}")
+            raise VideoGenAPIError(f"VideoGen API request failed: {str(e)}")
         except Exception as e:
             raise Exception(f"Get video file error: {str(e)}")
     
-    def wait_for_video_completion(self, api_file_id: str, max_wait_time: int = 300, poll_interval: int = 10) -> Dict:
+    def wait_for_video_completion(self, api_file_id: str, max_wait_time: int = 300) -> Dict:
         """
         Poll the VideoGen API until the video is ready
         
+        Polls follow the shared PollScheduler: fast at first, then backing
+        off, and densely around the learned render time once there is one.
+        404s and transient errors keep polling (honouring Retry-After);
+        other client errors and REJECTED renders fail immediately.
+        
         Args:
             api_file_id (str): The apiFileId from the video generation
             max_wait_time (int): Maximum time to wait in seconds (default: 5 minutes)
-            poll_interval (int): Time between polls in seconds (default: 10 seconds)
             
         Returns:
             Dict: Final video file information
         """
         start_time = time.time()
+        submitted_at = self.render_times.started_at(api_file_id) or start_time
         poll_count = 0
+        consecutive_errors = 0
         
-        while time.time() - start_time < max_wait_time:
+        while True:
+            retry_after = None
             try:
                 poll_count += 1
                 print(f"Polling video status (attempt {poll_count}) for {api_file_id}")
                 
                 result = self.get_video_file(api_file_id)
                 loading_state = result.get('loadingState')
+                consecutive_errors = 0
                 
                 print(f"Video status: {loading_state}")
                 
                 if loading_state == 'FULFILLED':
+                    self.render_times.finished(api_file_id)
                     print(f"Video completed successfully: {result}")
                     return result
                 elif loading_state == 'REJECTED':
                     raise Exception("Video generation was rejected")
                 
-                # Still processing, wait and try again
-                print(f"Video still processing, waiting {poll_interval} seconds...")
-                time.sleep(poll_interval)
-                
-            except Exception as e:
-                print(f"Polling error (attempt {poll_count}): {str(e)}")
-                if "Failed to fetch video data" in str(e) or "404" in str(e):
-                    # Video might still be processing or API might be slow
-                    print(f"Video might still be processing, waiting {poll_interval} seconds...")
-                    time.sleep(poll_interval)
-                    continue
+            except CircuitOpenError as e:
+                # VideoGen is failing for everyone; wait for the breaker's next trial
+                retry_after = e.retry_after
+                print(f"Polling paused (attempt {poll_count}): {str(e)}")
+            except VideoGenAPIError as e:
+                retry_after = e.retry_after
+                if e.status_code == 404:
+                    # Not visible yet; the render is usually still being set up
+                    print(f"Video {api_file_id} not found yet, still processing")
+                elif e.transient:
+                    consecutive_errors += 1
+                    print(f"Polling error (attempt {poll_count}): {str(e)}")
+                    if consecutive_errors >= 5:
+                        raise
                 else:
-                    # For other errors, don't fail immediately, try a few more times
-                    if poll_count >= 3:
-                        raise e
-                    time.sleep(poll_interval)
-                    continue
+                    raise
+            
+            now = time.time()
+            remaining = max_wait_time - (now - start_time)
+            if remaining <= 0:
+                break
+            delay = self.poll_scheduler.next_delay(
+                now - submitted_at,
+                poll_count,
+                expected=self.render_times.expected_window(api_file_id),
+                retry_after=retry_after
+            )
+            print(f"Video still processing, next poll in {delay:.1f} seconds")
+            time.sleep(min(delay, remaining))
         
         raise Exception(f"Video generation timed out after {max_wait_time} seconds")
     
-    def generate_video_from_storyboard(self, storyboard: str) -> str:
+    def generate_video_from_storyboard(self, storyboard: Union[str, Storyboard]) -> str:
         """
         Generate a video from a storyboard by converting it to a script
         
         Args:
-            storyboard (str): The storyboard text
+            storyboard: The parsed storyboard, or its text
             
         Returns:
             str: The final video URL or apiFileId for later retrieval
@@ -243,70 +449,31 @@ class VideoGenService:
             # The frontend will poll for completion
             return f"videogen://{api_file_id}"
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Storyboard to video generation error: {str(e)}")
             raise Exception(f"Storyboard to video generation error: {str(e)}")
     
-    def _convert_storyboard_to_script(self, storyboard: str) -> str:
+    def _convert_storyboard_to_script(self, storyboard: Union[str, Storyboard]) -> str:
         """
         Convert a storyboard to a narrative script suitable for VideoGen voiceover
         
         Args:
-            storyboard (str): The storyboard text
+            storyboard: The parsed storyboard (raw text is parsed here)
             
         Returns:
             str: A narrative script suitable for video voiceover (optimized for 1-minute duration)
         """
-        # Extract the main narrative from the storyboard
-        lines = storyboard.split('\n')
-        scenes = []
-        
-        # Extract title if present - with better cleaning
-        title = None
-        for line in lines:
-            if '**Storyboard:' in line and '**' in line:
-                # Extract title with better cleaning
-                title_raw = line.replace('**Storyboard:', '').replace('**', '').strip()
-                # Clean the title by removing special characters and formatting
-                title = self._clean_title_for_voiceover(title_raw)
-                break
+        if not isinstance(storyboard, Storyboard):
+            storyboard = parse_storyboard(storyboard)
         
-        # Parse scenes
-        current_scene = {}
-        for line in lines:
-            line = line.strip()
-            
-            # Scene header
-            if line.startswith('**Scene') and ':' in line:
-                if current_scene:  # Save previous scene
-                    scenes.append(current_scene)
-                
-                # Extract scene name
-                scene_name_match = re.search(r'(\d+): "([^"]+)"', line)
-                if scene_name_match:
-                    current_scene = {
-                        'number': scene_name_match.group(1),
-                        'name': scene_name_match.group(2),
-                        'visual': '',
-                        'setting': '',
-                        'action': '',
-                        'mood': ''
-                    }
-            
-            # Extract scene details
-            elif current_scene:
-                if line.startswith('• **Visual**:'):
-                    current_scene['visual'] = line.replace('• **Visual**:', '').strip()
-                elif line.startswith('• **Setting**:'):
-                    current_scene['setting'] = line.replace('• **Setting**:', '').strip()
-                elif line.startswith('• **Action**:'):
-                    current_scene['action'] = line.replace('• **Action**:', '').strip()
-                elif line.startswith('• **Mood**:'):
-                    current_scene['mood'] = line.replace('• **Mood**:', '').strip()
-        
-        # Add the last scene
-        if current_scene:
-            scenes.append(current_scene)
+        # Clean the title by removing special characters and formatting
+        title = self._clean_title_for_voiceover(storyboard.heading) if storyboard.heading is not None else None
+        if title:
+            title = self._convert_to_first_person(title)
+        # Scenes whose header had no number and name are skipped, as before
+        scenes = [scene for scene in storyboard.scenes if scene.number]
         
         # If no structured content found, create a simple narrative
         if not scenes:
@@ -315,7 +482,7 @@ class VideoGenService:
         # Create a complete narrative that fits within 1-minute constraint
         return self._create_complete_narrative(scenes, title)
     
-    def _create_scene_narrative(self, scene: dict, scene_num: int, total_scenes: int) -> str:
+    def _create_scene_narrative(self, scene: Scene, scene_num: int, total_scenes: int) -> str:
         """Create a concise first-person narrative description for a single scene"""
         narrative_parts = []
         
@@ -328,14 +495,14 @@ class VideoGenService:
             narrative_parts.append("Then")
         
         # Setting context - concise and clean
-        if scene.get('setting'):
-            setting_desc = self._clean_text_for_voiceover(scene['setting'].lower())
+        if scene.setting:
+            setting_desc = self._clean_text_for_voiceover(scene.setting.lower())
             if setting_desc:
                 narrative_parts.append(setting_desc)
         
         # Visual description in first person - keep it short and clean
-        if scene.get('visual'):
-            visual_desc = self._clean_text_for_voiceover(scene['visual'])
+        if scene.visual:
+            visual_desc = self._clean_text_for_voiceover(scene.visual)
             if visual_desc:
                 # Make it first person and concise
                 if visual_desc.startswith('A '):
@@ -350,8 +517,8 @@ class VideoGenService:
                 narrative_parts.append(f"where {visual_desc}")
         
         # Action in first person - concise and clean
-        if scene.get('action'):
-            action_desc = self._clean_text_for_voiceover(scene['action'])
+        if scene.action:
+            action_desc = self._clean_text_for_voiceover(scene.action)
             if action_desc:
                 if action_desc.startswith('I '):
                     narrative_parts.append(f"Here, {action_desc.lower()}")
@@ -359,8 +526,8 @@ class VideoGenService:
                     narrative_parts.append(f"Here, I {action_desc.lower()}")
         
         # Mood - brief and clean
-        if scene.get('mood'):
-            mood_desc = self._clean_text_for_voiceover(scene['mood'])
+        if scene.mood:
+            mood_desc = self._clean_text_for_voiceover(scene.mood)
             if mood_desc:
                 narrative_parts.append(f"feeling {mood_desc.lower()}")
         
@@ -414,8 +581,8 @@ class VideoGenService:
         # Closing
         script_parts.append("This experience taught me that challenges can become opportunities for growth.")
         
-        # Join and clean
-        final_script = self._convert_to_first_person("\n".join(script_parts))
+        # Join and clean (scenes and title are already in first person)
+        final_script = "\n".join(script_parts)
         # Don't over-clean the final script - just basic cleanup
         final_script = self._basic_clean_text(final_script)
         
@@ -446,8 +613,8 @@ class VideoGenService:
         # Closing
         script_parts.append("This experience taught me that challenges can become opportunities for growth.")
         
-        # Join and clean
-        final_script = self._convert_to_first_person("\n".join(script_parts))
+        # Join and clean (scenes and title are already in first person)
+        final_script = "\n".join(script_parts)
         # Don't over-clean the final script - just basic cleanup
         final_script = self._basic_clean_text(final_script)
         
@@ -479,7 +646,7 @@ class VideoGenService:
         seen = set()
         unique_scenes = []
         for scene in key_scenes:
-            scene_id = scene.get('number', '')
+            scene_id = scene.number
             if scene_id not in seen:
                 seen.add(scene_id)
                 unique_scenes.append(scene)
@@ -494,8 +661,8 @@ class VideoGenService:
         # Closing
         script_parts.append("This experience taught me that challenges can become opportunities for growth.")
         
-        # Join and clean
-        final_script = self._convert_to_first_person("\n".join(script_parts))
+        # Join and clean (scenes and title are already in first person)
+        final_script = "\n".join(script_parts)
         # Don't over-clean the final script - just basic cleanup
         final_script = self._basic_clean_text(final_script)
         
@@ -529,61 +696,8 @@ class VideoGenService:
         return key_scenes
     
     def _convert_to_first_person(self, text: str) -> str:
-        """Convert third person pronouns to first person"""
-        # Common third person to first person conversions
-        conversions = {
-            'he ': 'I ',
-            'she ': 'I ',
-            'him ': 'me ',
-            'her ': 'my ',
-            'his ': 'my ',
-            'himself': 'myself',
-            'herself': 'myself',
-            'the person': 'I',
-            'the individual': 'I',
-            'the protagonist': 'I',
-            'the main character': 'I',
-            'they ': 'I ',
-            'them ': 'me ',
-            'their ': 'my ',
-            'themselves': 'myself',
-            'He ': 'I ',
-            'She ': 'I ',
-            'Him ': 'Me ',
-            'Her ': 'My ',
-            'His ': 'My ',
-            'Himself': 'Myself',
-            'Herself': 'Myself',
-            'They ': 'I ',
-            'Them ': 'Me ',
-            'Their ': 'My ',
-            'Themselves': 'Myself',
-        }
-        
-        # Apply conversions
-        result = text
-        for third_person, first_person in conversions.items():
-            result = result.replace(third_person, first_person)
-        
-        # Fix common patterns
-        result = re.sub(r'\bI I\b', 'I', result)  # Fix "I I" -> "I"
-        result = re.sub(r'\bme me\b', 'me', result)  # Fix "me me" -> "me"
-        result = re.sub(r'\bmy my\b', 'my', result)  # Fix "my my" -> "my"
-        
-        # Fix problematic patterns that might cause "TI" or similar issues
-        result = re.sub(r'\btmy\b', 'my', result)  # Fix "tmy" -> "my"
-        result = re.sub(r'\bti\b', '', result)  # Remove standalone "ti"
-        result = re.sub(r'\bt i\b', '', result)  # Remove "t i"
-        
-        # Fix "Tmy" -> "This" (common conversion error)
-        result = re.sub(r'\bTmy\b', 'This', result)
-        result = re.sub(r'\btmy\b', 'this', result)
-        
-        # Fix "tI" -> "the" (another common conversion error)
-        result = re.sub(r'\btI\b', 'the', result)
-        result = re.sub(r'\bti\b', 'the', result)
-        
-        return result
+        """Convert third person references to first person (see first_person.convert_to_first_person)"""
+        return convert_to_first_person(text)
     
     def _clean_title_for_voiceover(self, title: str) -> str:
         """
@@ -690,19 +804,16 @@ class VideoGenService:
         
         return cleaned
     
-    def _create_simple_narrative(self, storyboard: str) -> str:
+    def _create_simple_narrative(self, storyboard: Storyboard) -> str:
         """Create a simple narrative from unstructured storyboard content"""
         # Extract key phrases and create a basic narrative
-        lines = storyboard.split('\n')
         key_phrases = []
         
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('**') and not line.startswith('•'):
-                # Clean up the line
-                clean_line = re.sub(r'[^\w\s]', '', line)
-                if len(clean_line.split()) > 3:  # Only meaningful phrases
-                    key_phrases.append(clean_line)
+        for line in storyboard.notes:
+            # Clean up the line
+            clean_line = re.sub(r'[^\w\s]', '', line)
+            if len(clean_line.split()) > 3:  # Only meaningful phrases
+                key_phrases.append(clean_line)
         
         if key_phrases:
             narrative = "This is my personal story of transformation. " + " ".join(key_phrases[:3]) + ". "
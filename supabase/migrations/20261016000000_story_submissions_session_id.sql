@@ -0,0 +1,14 @@
+-- Story submissions are upserted on session_id (StoryService.save_to_supabase),
+-- so the video watcher and the frontend's save, possibly on different workers,
+-- store one row per session. PostgREST needs the column and a unique index on
+-- it for ON CONFLICT (session_id); rows saved before this have no session_id
+-- and stay as they are (NULLs don't conflict).
+
+alter table public.story_submissions
+    add column if not exists session_id text;
+
+create unique index if not exists story_submissions_session_id_key
+    on public.story_submissions (session_id);
+
+-- Pick up the new column without waiting for PostgREST's next schema reload
+notify pgrst, 'reload schema';
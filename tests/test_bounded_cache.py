@@ -0,0 +1,54 @@
+"""BoundedCache bounds: entry count, byte size, TTL and the oversize path."""
+from services import bounded_cache
+from services.bounded_cache import BoundedCache
+
+
+def test_oversize_update_keeps_existing_entry():
+    cache = BoundedCache(max_entries=10, max_bytes=100, sizeof=len)
+    cache.set('k', 'x' * 10)
+    cache.set('k', 'y' * 500)
+    assert cache.get('k') == 'x' * 10
+    assert cache.stats()['bytes'] == 10
+    assert cache.evictions == 1
+
+
+def test_oversize_value_is_not_stored():
+    cache = BoundedCache(max_entries=10, max_bytes=100, sizeof=len)
+    cache.set('small', 'x' * 10)
+    cache.set('big', 'y' * 500)
+    assert 'big' not in cache
+    assert cache.get('small') == 'x' * 10
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = BoundedCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_byte_bound_evicts_until_it_fits():
+    cache = BoundedCache(max_entries=0, max_bytes=25, sizeof=len)
+    cache.set('a', 'x' * 10)
+    cache.set('b', 'x' * 10)
+    cache.set('c', 'x' * 10)
+    assert 'a' not in cache
+    assert cache.stats()['bytes'] == 20
+
+
+def test_expired_entries_go_before_live_ones(monkeypatch, clock):
+    monkeypatch.setattr(bounded_cache, 'time', clock)
+    cache = BoundedCache(max_entries=2, ttl_seconds=60)
+    cache.set('old', 1)
+    cache.set('short', 2, ttl_seconds=1)
+    clock.advance(2)
+    cache.set('new', 3)
+    # 'short' had expired, so the least recently used 'old' is kept
+    assert cache.get('old') == 1
+    assert cache.expirations == 1 and cache.evictions == 0
+    clock.advance(60)
+    assert cache.get('old') is None
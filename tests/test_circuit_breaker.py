@@ -0,0 +1,95 @@
+"""CircuitBreaker transitions: closed -> open -> half-open -> closed or open again."""
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return CircuitBreaker('upstream', failure_rate_threshold=0.5, slow_call_seconds=10,
+                          slow_call_rate_threshold=0.8, window_size=4, min_calls=4, open_seconds=30)
+
+
+def trip(breaker):
+    for _ in range(4):
+        breaker.record_failure(0.1)
+
+
+def test_opens_once_failure_rate_reached_over_min_calls(breaker):
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    breaker.record_success(0.1)
+    assert breaker.state == CIRCUIT_CLOSED
+    breaker.record_success(0.1)
+    assert breaker.state == CIRCUIT_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_slow_calls_open_breaker(breaker):
+    for _ in range(4):
+        breaker.record_success(12)
+    assert breaker.state == CIRCUIT_OPEN
+
+
+def test_half_open_allows_one_trial(breaker, clock):
+    trip(breaker)
+    clock.advance(30)
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+    breaker.check()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_successful_trial_closes_breaker(breaker, clock):
+    trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.record_success(0.1)
+    assert breaker.state == CIRCUIT_CLOSED
+    # The window starts over after closing
+    breaker.record_failure(0.1)
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+@pytest.mark.parametrize('duration', [0.1, 12])
+def test_failed_or_slow_trial_reopens_breaker(breaker, clock, duration):
+    trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    if duration > 10:
+        breaker.record_success(duration)
+    else:
+        breaker.record_failure(duration)
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.times_opened == 2
+
+
+def test_cancelled_trial_frees_the_slot(breaker, clock):
+    trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.cancel()
+    breaker.before_call()
+
+
+def test_call_ignores_errors_that_are_not_upstream_failures(breaker):
+    def rejected():
+        raise ValueError('bad request')
+
+    for _ in range(4):
+        with pytest.raises(ValueError):
+            breaker.call(rejected, is_failure=lambda e: not isinstance(e, ValueError))
+    assert breaker.state == CIRCUIT_CLOSED
@@ -0,0 +1,84 @@
+"""@idempotent: replay, body mismatch (422), key in flight (409), 5xx not stored, per-caller scope."""
+import pytest
+from flask import Flask, jsonify, request
+
+from middleware import idempotency
+from services.idempotency_store import MemoryIdempotencyStore
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(idempotency, '_store', MemoryIdempotencyStore())
+    monkeypatch.setattr(idempotency, 'IN_FLIGHT_WAIT_SECONDS', 0)
+    app = Flask(__name__)
+    app.calls = []
+    app.status = 200
+
+    @app.route('/answers', methods=['POST'])
+    @idempotency.idempotent
+    def save_answer():
+        app.calls.append(request.get_json())
+        hook = getattr(app, 'during_request', None)
+        if hook:
+            hook()
+        return jsonify({'success': app.status < 500, 'call': len(app.calls)}), app.status
+
+    return app
+
+
+def post(client, body, key='key-1'):
+    return client.post('/answers', json=body, headers={'Idempotency-Key': key})
+
+
+def test_retry_replays_first_response(app):
+    client = app.test_client()
+    first = post(client, {'session_id': 's1', 'answer': 'a'})
+    second = post(client, {'session_id': 's1', 'answer': 'a'})
+
+    assert len(app.calls) == 1
+    assert second.get_json() == first.get_json()
+    assert second.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_same_key_with_different_body_is_rejected(app):
+    client = app.test_client()
+    post(client, {'session_id': 's1', 'answer': 'a'})
+    response = post(client, {'session_id': 's1', 'answer': 'b'})
+
+    assert response.status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_same_key_while_first_request_runs_is_a_conflict(app):
+    client = app.test_client()
+    nested = []
+    app.during_request = lambda: nested.append(post(app.test_client(), {'session_id': 's1', 'answer': 'a'}))
+
+    assert post(client, {'session_id': 's1', 'answer': 'a'}).status_code == 200
+    assert nested[0].status_code == 409
+    assert len(app.calls) == 1
+
+
+def test_server_errors_are_not_stored(app):
+    client = app.test_client()
+    app.status = 500
+    assert post(client, {'session_id': 's1', 'answer': 'a'}).status_code == 500
+    app.status = 200
+    assert post(client, {'session_id': 's1', 'answer': 'a'}).status_code == 200
+    assert len(app.calls) == 2
+
+
+def test_keys_are_scoped_to_the_caller(app):
+    client = app.test_client()
+    post(client, {'session_id': 's1', 'answer': 'a'})
+    response = post(client, {'session_id': 's2', 'answer': 'a'})
+
+    assert 'Idempotent-Replayed' not in response.headers
+    assert len(app.calls) == 2
+
+
+def test_requests_without_key_always_run(app):
+    client = app.test_client()
+    client.post('/answers', json={'session_id': 's1'})
+    client.post('/answers', json={'session_id': 's1'})
+    assert len(app.calls) == 2
@@ -0,0 +1,47 @@
+"""Idempotency-Key records: claim, complete, release and lease expiry per backend."""
+import pytest
+
+from services import idempotency_store
+from services.idempotency_store import MemoryIdempotencyStore, SqliteIdempotencyStore
+
+RECORD = {'fingerprint': 'abc', 'status': 200, 'body': b'{"success": true}', 'mimetype': 'application/json'}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(idempotency_store, 'time', clock)
+    if request.param == 'memory':
+        return MemoryIdempotencyStore()
+    return SqliteIdempotencyStore(str(tmp_path / 'idempotency.db'))
+
+
+def test_second_claim_waits_for_first(store):
+    assert store.claim('k', lease_seconds=60)
+    assert not store.claim('k', lease_seconds=60)
+    assert store.get('k') is None
+
+
+def test_completed_key_replays_and_cannot_be_claimed(store):
+    store.claim('k', lease_seconds=60)
+    store.complete('k', RECORD, ttl_seconds=3600)
+    assert store.get('k') == RECORD
+    assert not store.claim('k', lease_seconds=60)
+
+
+def test_release_lets_a_retry_claim(store):
+    store.claim('k', lease_seconds=60)
+    store.release('k')
+    assert store.claim('k', lease_seconds=60)
+
+
+def test_release_keeps_a_stored_response(store):
+    store.claim('k', lease_seconds=60)
+    store.complete('k', RECORD, ttl_seconds=3600)
+    store.release('k')
+    assert store.get('k') == RECORD
+
+
+def test_expired_lease_can_be_claimed(store, clock):
+    store.claim('k', lease_seconds=60)
+    clock.advance(61)
+    assert store.claim('k', lease_seconds=60)
@@ -0,0 +1,102 @@
+"""SqliteJobQueue leases, retries and attempt limits, and kind filtering in both queues."""
+import uuid
+
+import pytest
+
+from models.job_models import Job, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from services.job_service import JobQueueFullError, MemoryJobQueue, SqliteJobQueue
+
+
+def make_job(kind='storyboard', key=None, max_attempts=None):
+    return Job(job_id=str(uuid.uuid4()), kind=kind, payload={'n': 1}, key=key, max_attempts=max_attempts)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SqliteJobQueue(str(tmp_path / 'jobs.db'), max_size=2, visibility_timeout=60, retry_delay=0)
+
+
+def test_claim_leases_oldest_job_of_requested_kind(queue):
+    video = make_job('video')
+    storyboard = make_job('storyboard')
+    queue.put(video)
+    queue.put(storyboard)
+
+    job = queue.claim(0, kinds=['storyboard'])
+    assert job.job_id == storyboard.job_id
+    assert job.status == JOB_RUNNING and job.attempts == 1
+    # Leased: not handed out again while the lease runs
+    assert queue.claim(0, kinds=['storyboard']) is None
+    assert queue.claim(0, kinds=['video']).job_id == video.job_id
+
+
+def test_put_rejects_when_full(queue):
+    queue.put(make_job())
+    queue.put(make_job())
+    with pytest.raises(JobQueueFullError):
+        queue.put(make_job())
+
+
+def test_expired_lease_makes_job_claimable_again(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / 'jobs.db'), visibility_timeout=0, max_attempts=3)
+    job = make_job()
+    queue.put(job)
+
+    first = queue.claim(0, kinds=['storyboard'])
+    # The worker died without completing it
+    second = queue.claim(0, kinds=['storyboard'])
+    assert second.job_id == first.job_id
+    assert second.attempts == 2
+
+
+def test_expired_lease_on_last_attempt_fails_job(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / 'jobs.db'), visibility_timeout=0, max_attempts=3)
+    job = make_job('video', max_attempts=1)
+    queue.put(job)
+
+    assert queue.claim(0, kinds=['video']) is not None
+    assert queue.claim(0, kinds=['video']) is None
+    stored = queue.get(job.job_id)
+    assert stored.status == JOB_FAILED
+    assert stored.error == 'Worker lost while running job'
+
+
+def test_failed_attempt_is_retried_until_max_attempts(queue):
+    job = make_job(max_attempts=2)
+    queue.put(job)
+
+    claimed = queue.claim(0, kinds=['storyboard'])
+    queue.fail(claimed, 'first')
+    assert queue.get(job.job_id).status == JOB_QUEUED
+
+    claimed = queue.claim(0, kinds=['storyboard'])
+    assert claimed.attempts == 2
+    queue.fail(claimed, 'second')
+    stored = queue.get(job.job_id)
+    assert stored.status == JOB_FAILED and stored.error == 'second'
+    assert queue.claim(0, kinds=['storyboard']) is None
+
+
+def test_complete_stores_result_and_key_lookup_finds_latest(queue):
+    queue.put(make_job(key='storyboard:s1'))
+    claimed = queue.claim(0, kinds=['storyboard'])
+    queue.complete(claimed, {'storyboard': 'done'})
+    newer = make_job(key='storyboard:s1')
+    queue.put(newer)
+
+    assert queue.get(claimed.job_id).status == JOB_DONE
+    assert queue.get(claimed.job_id).result == {'storyboard': 'done'}
+    assert queue.find_by_key('storyboard:s1').job_id == newer.job_id
+
+
+def test_memory_queue_claims_only_requested_kinds():
+    queue = MemoryJobQueue(max_size=5)
+    video = make_job('video')
+    storyboard = make_job('storyboard')
+    queue.put(video)
+    queue.put(storyboard)
+
+    assert queue.claim(0, kinds=['storyboard']).job_id == storyboard.job_id
+    assert queue.claim(0, kinds=['storyboard']) is None
+    assert queue.depth() == 1
+    assert queue.claim(0, kinds=['video']).job_id == video.job_id
@@ -0,0 +1,145 @@
+"""
+Category parity between KeywordClassifier and the substring if/elif chains it replaced.
+
+legacy_* below are the chains from StoryService._generate_contextual_question
+and _generate_contextual_feedback before the classifier, reduced to the
+category they picked.
+"""
+import pytest
+
+from services.keyword_classifier import (
+    AFTERMATH_CATEGORIES,
+    LEAD_UP_CATEGORIES,
+    STORY_CATEGORIES,
+)
+
+
+def legacy_story_category(text):
+    text = text.lower()
+    if any(word in text for word in ['fell', 'fall', 'accident', 'crash', 'collision']):
+        return 'accident'
+    elif any(word in text for word in ['lost', 'death', 'died', 'passed away']):
+        return 'loss'
+    elif any(word in text for word in ['job', 'work', 'career', 'fired', 'quit', 'resigned']):
+        return 'career'
+    elif any(word in text for word in ['relationship', 'breakup', 'divorce', 'marriage', 'love']):
+        return 'relationship'
+    elif any(word in text for word in ['move', 'moved', 'relocated', 'travel', 'journey']):
+        return 'move'
+    return None
+
+
+def legacy_lead_up_category(text):
+    text = text.lower()
+    if any(word in text for word in ['phone', 'distracted', 'rushing', 'hurried']):
+        return 'distracted'
+    elif any(word in text for word in ['ordinary', 'normal', 'regular', 'typical']):
+        return 'ordinary'
+    return None
+
+
+def legacy_aftermath_category(text):
+    text = text.lower()
+    if any(word in text for word in ['hurt', 'pain', 'injured', 'bruised']):
+        return 'injury'
+    elif any(word in text for word in ['help', 'helped', 'someone', 'people']):
+        return 'support'
+    return None
+
+
+STORY_ANSWERS = [
+    "I fell down the stairs at my parents' house last winter.",
+    "My car was in a crash on the highway.",
+    "A collision at the intersection changed everything.",
+    "My grandmother passed away when I was twelve.",
+    "I lost my best friend to cancer.",
+    "The death of my father.",
+    "I got fired from my first job.",
+    "I quit my career in finance to become a teacher.",
+    "After years of work I finally resigned.",
+    "My divorce was finalized in the spring.",
+    "Our marriage fell apart.",
+    "The breakup with my partner of ten years.",
+    "I fell in love with my best friend.",
+    "We moved across the country for a fresh start.",
+    "I relocated to Berlin.",
+    "A journey through South America.",
+    "I decided to travel alone for the first time.",
+    "The day my daughter was born.",
+    "",
+    # Inflections the substring chains caught and the classifier still does
+    "Both of our marriages ended the same year.",
+    "Two breakups in one summer.",
+    "Meeting the lover I still live with.",
+    "The workers went on strike.",
+    "Travelers told me about the town.",
+]
+
+LEAD_UP_ANSWERS = [
+    "I was on my phone, texting my sister.",
+    "I felt distracted all morning.",
+    "I was rushing to catch the bus.",
+    "We hurried out the door.",
+    "It was just an ordinary Tuesday.",
+    "A normal day at the office.",
+    "Nothing special, my regular routine.",
+    "A typical weekend.",
+    "Normally I would have stayed home.",
+    "My phones kept buzzing.",
+    "I can't remember anything before it.",
+]
+
+AFTERMATH_ANSWERS = [
+    "My ankle hurt so much I couldn't stand.",
+    "The pain was unbearable.",
+    "I was badly injured and bruised.",
+    "A stranger helped me up.",
+    "Someone called an ambulance.",
+    "People gathered around me.",
+    "My neighbour was so helpful.",
+    "It hurts to think about.",
+    "I just sat there in silence.",
+]
+
+# Where the classifier deliberately disagrees: substring false positives
+# that no longer match, and inflections the substrings never caught
+INTENDED_DIFFERENCES = [
+    (STORY_CATEGORIES, legacy_story_category, "That argument was a fallacy.", 'accident', None),
+    (STORY_CATEGORIES, legacy_story_category, "I set up a network for my village.", 'career', None),
+    (STORY_CATEGORIES, legacy_story_category, "I finished my homework late.", 'career', None),
+    (STORY_CATEGORIES, legacy_story_category, "We were divorcing while I was pregnant.", None, 'relationship'),
+    (STORY_CATEGORIES, legacy_story_category, "Relocating for my partner.", None, 'move'),
+    (STORY_CATEGORIES, legacy_story_category, "We kept moving from city to city.", None, 'move'),
+    (AFTERMATH_CATEGORIES, legacy_aftermath_category, "I stared at the painting on the wall.", 'injury', None),
+]
+
+
+@pytest.mark.parametrize('text', STORY_ANSWERS)
+def test_story_category_matches_legacy_chain(text):
+    assert STORY_CATEGORIES.classify(text) == legacy_story_category(text)
+
+
+@pytest.mark.parametrize('text', LEAD_UP_ANSWERS)
+def test_lead_up_category_matches_legacy_chain(text):
+    assert LEAD_UP_CATEGORIES.classify(text) == legacy_lead_up_category(text)
+
+
+@pytest.mark.parametrize('text', AFTERMATH_ANSWERS)
+def test_aftermath_category_matches_legacy_chain(text):
+    assert AFTERMATH_CATEGORIES.classify(text) == legacy_aftermath_category(text)
+
+
+@pytest.mark.parametrize('classifier,legacy,text,old,new', INTENDED_DIFFERENCES)
+def test_intended_differences_from_legacy_chain(classifier, legacy, text, old, new):
+    assert legacy(text) == old
+    assert classifier.classify(text) == new
+
+
+def test_earlier_category_wins():
+    # Accident is listed before loss, as in the old chain
+    assert STORY_CATEGORIES.classify("I lost my balance and fell") == 'accident'
+
+
+def test_phrase_keywords_need_every_word():
+    assert STORY_CATEGORIES.classify("She passed away last year") == 'loss'
+    assert STORY_CATEGORIES.classify("We passed the test and went away") is None
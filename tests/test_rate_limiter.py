@@ -0,0 +1,25 @@
+"""SharedTokenBucket: buckets mapping the same file draw on one quota."""
+import pytest
+
+from services.rate_limiter import SharedTokenBucket, RateLimitTimeout, fcntl
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason='shared buckets need flock')
+
+
+def test_buckets_on_same_file_share_capacity(tmp_path):
+    first = SharedTokenBucket(1, capacity=2, name='images', directory=str(tmp_path))
+    second = SharedTokenBucket(1, capacity=2, name='images', directory=str(tmp_path))
+
+    first.acquire(timeout=0)
+    second.acquire(timeout=0)
+    with pytest.raises(RateLimitTimeout):
+        first.acquire(timeout=0)
+    assert first.timeouts == 1
+
+
+def test_buckets_with_other_names_are_independent(tmp_path):
+    images = SharedTokenBucket(1, capacity=1, name='images', directory=str(tmp_path))
+    requests = SharedTokenBucket(1, capacity=1, name='requests', directory=str(tmp_path))
+
+    images.acquire(timeout=0)
+    requests.acquire(timeout=0)
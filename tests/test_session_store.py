@@ -0,0 +1,80 @@
+"""SessionStore compare-and-set on StorySession.version, and StoryService retrying conflicts."""
+import threading
+from datetime import datetime
+
+import pytest
+
+from models.story_models import StorySession
+from services.story_service import InMemorySessionStore, SessionConflictError, SqliteSessionStore, StoryService
+
+
+def new_session(session_id='s1'):
+    return StorySession(session_id=session_id, created_at=datetime.now(), answers=[],
+                        current_question=1, is_complete=False)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return InMemorySessionStore()
+    return SqliteSessionStore(str(tmp_path / 'sessions.db'), batch_window=0)
+
+
+def test_save_bumps_version(store):
+    session = new_session()
+    store.save(session)
+    assert session.version == 1
+    assert store.get('s1').version == 1
+
+
+def test_new_session_does_not_overwrite_existing_one(store):
+    store.save(new_session())
+    with pytest.raises(SessionConflictError):
+        store.save(new_session())
+
+
+def test_stale_write_is_rejected(store):
+    store.save(new_session())
+    first = store.get('s1')
+    second = store.get('s1')
+
+    first.user_email = 'first@example.com'
+    store.save(first)
+    second.user_email = 'second@example.com'
+    with pytest.raises(SessionConflictError):
+        store.save(second)
+    # The failed write leaves the caller's copy at the version it read
+    assert second.version == 1
+    assert store.get('s1').user_email == 'first@example.com'
+
+
+def test_unversioned_stored_session_can_be_updated(tmp_path):
+    # Rows written before sessions carried a version read back as version 0
+    store = SqliteSessionStore(str(tmp_path / 'sessions.db'), batch_window=0)
+    session = new_session()
+    store.save(session)
+    conn = store._connect()
+    with conn:
+        conn.execute('UPDATE story_sessions SET version = 0')
+    legacy = store.get('s1')
+    assert legacy.version == 0
+    store.save(legacy)
+    assert store.get('s1').version == 1
+
+
+def test_concurrent_answers_are_all_kept(store):
+    service = StoryService(store=store)
+    session = service.create_new_session()
+
+    threads = [
+        threading.Thread(target=service.save_answer, args=(session.session_id, number, f"answer {number}"))
+        for number in range(1, 5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = store.get(session.session_id)
+    assert sorted(answer.answer_text for answer in stored.answers) == [f"answer {n}" for n in range(1, 5)]
+    assert stored.is_complete